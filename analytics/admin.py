@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
-from django.utils.html import format_html
-from .models import Conversation, Message, ConversationAnalysis
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.http import urlencode
+from . import dispatch, search
+from .models import AnalysisJob, Conversation, Message, ConversationAnalysis
 
 class MessageInline(admin.TabularInline):
     model = Message
@@ -14,28 +20,51 @@ class ConversationAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'status', 'message_count', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('title', 'messages__text')
-    readonly_fields = ('created_at', 'updated_at', 'message_count')
+    readonly_fields = ('created_at', 'updated_at', 'message_count', 'archived', 'archived_transcript')
     inlines = [MessageInline]
     fieldsets = (
         ('Basic Information', {'fields': ('title','status')}),
-        ('Metadata', {'fields':('created_at','updated_at','message_count')}),
+        ('Metadata', {'fields':('created_at','updated_at','message_count','archived')}),
+        ('Archived Transcript', {'fields':('archived_transcript',), 'classes':('collapse',)}),
     )
+    def archived_transcript(self, obj):
+        if not obj.archived:
+            return '-'
+        return format_html_join(
+            '', '<p><strong>#{} {}</strong> ({}): {}</p>',
+            ((m.sequence_number, m.sender, m.timestamp, m.text) for m in obj.transcript)
+        )
+    archived_transcript.short_description='Archived messages'
+    def get_search_results(self, request, queryset, search_term):
+        # Match message text through the full-text index instead of a join
+        # with icontains across the whole message table; archived
+        # transcripts are indexed (or scanned) too.
+        index = search.conversation_ids_sql(search_term) if search.tokens(search_term) else None
+        if index is None:
+            results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+            archived = list(search.scan_archives(search_term)) if search_term else []
+            if archived:
+                results = results | queryset.filter(id__in=archived)
+            return results, may_have_duplicates
+        return queryset.filter(Q(title__icontains=search_term) | Q(id__in=RawSQL(*index))), False
     actions = ['trigger_analysis','mark_as_pending']
+    def _queue_job(self, request, ids, verb):
+        job = dispatch.start_analysis_job(ids, created_by=request.user)
+        url = reverse('admin:analytics_analysisjob_change', args=[job.id])
+        self.message_user(request, format_html(
+            '{} {} conversations; analysis queued as <a href="{}">job #{}</a>', verb, len(ids), url, job.id
+        ))
     def trigger_analysis(self, request, queryset):
-        from .services import ConversationAnalyzer
-        success = 0
-        for conv in queryset:
-            try:
-                if conv.messages.count()>0:
-                    ConversationAnalyzer(conv).analyze()
-                    success +=1
-            except Exception:
-                pass
-        self.message_user(request, f"Successfully analyzed {success} conversations")
+        # Only ids leave the request; analysis runs in background chunks.
+        self._queue_job(request, list(queryset.order_by('id').values_list('id', flat=True)), 'Selected')
     trigger_analysis.short_description="Analyze selected conversations"
     def mark_as_pending(self, request, queryset):
-        count = queryset.update(status='pending')
-        self.message_user(request, f"Marked {count} conversations as pending")
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        count = Conversation.objects.filter(id__in=ids).update(status='pending')
+        if getattr(settings, 'ANALYTICS_ENQUEUE_ON_MARK_PENDING', False):
+            self._queue_job(request, ids, 'Marked pending')
+        else:
+            self.message_user(request, f"Marked {count} conversations as pending")
     mark_as_pending.short_description="Mark as pending analysis"
 
 @admin.register(Message)
@@ -44,6 +73,24 @@ class MessageAdmin(admin.ModelAdmin):
     list_filter = ('sender','timestamp')
     search_fields = ('text','conversation__title')
     readonly_fields = ('timestamp','sequence_number')
+    def get_search_results(self, request, queryset, search_term):
+        if search.tokens(search_term):
+            self._note_archived_matches(request, search_term)
+        index = search.message_ids_sql(search_term) if search.tokens(search_term) else None
+        if index is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(Q(conversation__title__icontains=search_term) | Q(id__in=RawSQL(*index))), False
+    def _note_archived_matches(self, request, search_term):
+        # Archived messages have no rows to list; point at their conversations.
+        index = search.conversation_ids_sql(search_term)
+        ids = RawSQL(*index) if index is not None else list(search.scan_archives(search_term))
+        count = Conversation.objects.filter(archived=True, id__in=ids).count()
+        if count:
+            url = reverse('admin:analytics_conversation_changelist') + '?' + urlencode({'q': search_term})
+            self.message_user(request, format_html(
+                '{} archived conversations also match; <a href="{}">search conversations</a> to see them.',
+                count, url
+            ))
     def text_preview(self, obj):
         return obj.text[:100] + '...' if len(obj.text)>100 else obj.text
     text_preview.short_description='Message'
@@ -75,3 +122,36 @@ class ConversationAnalysisAdmin(admin.ModelAdmin):
         color = 'green' if obj.overall_score>=7 else 'orange' if obj.overall_score>=5 else 'red'
         return format_html('<span style="color: {}; font-weight:bold;">{:.2f}/10</span>', color, obj.overall_score)
     overall_score_display.short_description='Score'
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id','status','progress_display','succeeded','failed','skipped','created_by','created_at','finished_at')
+    list_filter = ('status','created_at')
+    readonly_fields = (
+        'status','progress_display','total','processed','succeeded','failed','skipped',
+        'chunk_size','created_by','created_at','updated_at','started_at','finished_at','errors','conversation_ids'
+    )
+    fieldsets = (
+        ('Progress', {'fields':('status','progress_display','total','processed','succeeded','failed','skipped')}),
+        ('Errors', {'fields':('errors',)}),
+        ('Details', {'fields':('chunk_size','created_by','created_at','updated_at','started_at','finished_at','conversation_ids'),
+                     'classes':('collapse',)}),
+    )
+    def has_add_permission(self, request):
+        return False
+    def changelist_view(self, request, extra_context=None):
+        dispatch.fail_stale_jobs()
+        return super().changelist_view(request, extra_context)
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        # Stops the auto-refresh below for jobs whose chunks were lost.
+        dispatch.fail_stale_jobs()
+        response = super().change_view(request, object_id, form_url, extra_context)
+        job = self.get_object(request, object_id)
+        if job is not None and job.status in ('queued', 'running'):
+            # Refresh the page until the job finishes.
+            response['Refresh'] = '5'
+        return response
+    def progress_display(self, obj):
+        return format_html('<progress value="{}" max="100"></progress> {}% ({}/{})',
+                           obj.progress, obj.progress, obj.processed, obj.total)
+    progress_display.short_description='Progress'
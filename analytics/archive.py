@@ -0,0 +1,82 @@
+"""Compact, compressed encoding of a conversation's messages for cold storage.
+
+Messages are serialized as length-prefixed binary records and compressed
+with zlib, or zstd when the optional ``zstandard`` package is installed. The
+layout is a ``(format_version, count)`` header followed by one record per
+message: ``id, sequence_number, timestamp (µs since epoch, UTC),
+len(sender), len(text)`` and then the UTF-8 sender and text bytes.
+"""
+import struct
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<BI')
+_RECORD = struct.Struct('<qiqBI')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+ArchivedMessage = namedtuple('ArchivedMessage', ['id', 'sender', 'text', 'timestamp', 'sequence_number'])
+
+
+def available_codecs():
+    return ['zlib', 'zstd'] if zstandard is not None else ['zlib']
+
+
+def compress(raw, codec='zlib'):
+    if codec == 'zlib':
+        return zlib.compress(raw, 9)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("The 'zstd' codec requires the zstandard package")
+        return zstandard.ZstdCompressor(level=19).compress(raw)
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+def decompress(data, codec):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Reading a 'zstd' archive requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+def encode(messages):
+    """Serialize ``ArchivedMessage``-shaped tuples (uncompressed)."""
+    messages = list(messages)
+    parts = [_HEADER.pack(FORMAT_VERSION, len(messages))]
+    for message_id, sender, text, timestamp, sequence_number in messages:
+        sender_bytes = sender.encode('utf-8')
+        text_bytes = text.encode('utf-8')
+        parts.append(_RECORD.pack(message_id, sequence_number, (timestamp - _EPOCH) // _MICROSECOND,
+                                  len(sender_bytes), len(text_bytes)))
+        parts.append(sender_bytes)
+        parts.append(text_bytes)
+    return b''.join(parts)
+
+
+def decode(raw):
+    """Inverse of :func:`encode`; returns a list of ``ArchivedMessage``."""
+    raw = memoryview(raw)
+    version, count = _HEADER.unpack_from(raw, 0)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive format version {version}")
+    offset = _HEADER.size
+    messages = []
+    for _ in range(count):
+        message_id, sequence_number, micros, sender_len, text_len = _RECORD.unpack_from(raw, offset)
+        offset += _RECORD.size
+        sender = str(raw[offset:offset + sender_len], 'utf-8')
+        offset += sender_len
+        text = str(raw[offset:offset + text_len], 'utf-8')
+        offset += text_len
+        messages.append(ArchivedMessage(message_id, sender, text, _EPOCH + micros * _MICROSECOND, sequence_number))
+    return messages
@@ -0,0 +1,149 @@
+"""Async ingestion endpoints, served without holding a worker under ASGI.
+
+Conversation create, message append and analyze use Django's async ORM
+interfaces, and scoring runs on :func:`scoring_executor` so a large
+transcript never blocks the event loop. Request and response bodies match
+the DRF endpoints under ``/api/conversations/``.
+"""
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+
+from . import instrumentation
+from .models import Conversation, Message
+from .scheduling import schedule_analysis
+from .scoring import MESSAGE_ROW_FIELDS, MessageRow, score_rows
+from .serializers import (
+    ConversationAnalysisSerializer, ConversationCreateSerializer,
+    ConversationSerializer, MessageSerializer,
+)
+from .services import add_conversation_message, get_score_weights, load_message_rows, save_analysis
+
+_executor = None
+
+
+def scoring_executor():
+    """Shared pool for scoring; processes when ``ANALYTICS_ASYNC_SCORING_PROCESSES``."""
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'ANALYTICS_ASYNC_SCORING_WORKERS', None)
+        if getattr(settings, 'ANALYTICS_ASYNC_SCORING_PROCESSES', False):
+            _executor = ProcessPoolExecutor(workers)
+        else:
+            _executor = ThreadPoolExecutor(workers, thread_name_prefix='analytics-scoring')
+    return _executor
+
+
+def _api(*methods):
+    def decorator(view):
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        # Set directly: csrf_exempt() only wraps coroutine views from Django 5.0.
+        wrapped.csrf_exempt = True
+        wrapped.__name__ = view.__name__
+        wrapped.__doc__ = view.__doc__
+        return wrapped
+    return decorator
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}'), None
+    except ValueError:
+        return None, JsonResponse({'error': 'Request body must be valid JSON'}, status=400)
+
+
+async def _get_conversation(pk):
+    try:
+        return await Conversation.objects.aget(pk=pk), None
+    except Conversation.DoesNotExist:
+        return None, JsonResponse({'detail': 'No Conversation matches the given query.'}, status=404)
+
+
+def _create_conversation(title, messages):
+    # The async ORM methods each run in their own transaction; create the
+    # conversation and its messages together so a failure leaves neither.
+    with transaction.atomic():
+        conversation = Conversation.objects.create(title=title)
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=msg['sender'], text=msg['message'], sequence_number=idx)
+            for idx, msg in enumerate(messages, start=1)
+        ])
+    return conversation
+
+
+@_api('POST')
+async def create_conversation(request):
+    data, error = _json_body(request)
+    if error:
+        return error
+    serializer = ConversationCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    validated = serializer.validated_data
+    title = validated.get('title', f"Conversation {timezone.now().strftime('%Y-%m-%d %H:%M')}")
+    conversation = await sync_to_async(_create_conversation)(title, validated['messages'])
+    await sync_to_async(schedule_analysis)([conversation.id])
+    data = await sync_to_async(lambda: ConversationSerializer(conversation).data)()
+    return JsonResponse(data, status=201)
+
+
+@_api('POST')
+async def append_message(request, pk):
+    conversation, error = await _get_conversation(pk)
+    if error:
+        return error
+    data, error = _json_body(request)
+    if error:
+        return error
+    sender, text = data.get('sender'), data.get('message')
+    if sender not in ('user', 'ai'):
+        return JsonResponse({'sender': ["sender must be 'user' or 'ai'"]}, status=400)
+    if not isinstance(text, str) or not text.strip():
+        return JsonResponse({'message': ["'message' must be a non-empty string"]}, status=400)
+    # Locks the conversation so concurrent appends get distinct sequence
+    # numbers; rehydrates archived transcripts first (see Message.save).
+    message = await sync_to_async(add_conversation_message)(pk, sender, text)
+    if message is None:
+        return JsonResponse({'detail': 'No Conversation matches the given query.'}, status=404)
+    await sync_to_async(schedule_analysis)([pk])
+    return JsonResponse(MessageSerializer(message).data, status=201)
+
+
+@_api('POST')
+async def analyze_conversation(request, pk):
+    conversation, error = await _get_conversation(pk)
+    if error:
+        return error
+    loaded_at = timezone.now()
+    if conversation.archived:
+        rows = await sync_to_async(load_message_rows)(conversation)
+    else:
+        rows = [MessageRow._make(row) async for row in
+                conversation.messages.order_by('sequence_number').values_list(*MESSAGE_ROW_FIELDS)]
+    if not rows:
+        return JsonResponse({'error': 'Cannot analyze conversation with no messages'}, status=400)
+    weights = get_score_weights()
+    loop = asyncio.get_running_loop()
+    metrics, failure = await loop.run_in_executor(scoring_executor(), partial(score_rows, rows, weights=weights))
+    if failure is not None:
+        if instrumentation.is_enabled():
+            instrumentation.FAILURES.inc()
+        return JsonResponse({'error': f'Analysis failed: {failure}'}, status=500)
+
+    def save():
+        analysis = save_analysis(conversation, metrics, weights, loaded_at=loaded_at)
+        return ConversationAnalysisSerializer(analysis).data
+    data = await sync_to_async(save)()
+    if instrumentation.is_enabled():
+        instrumentation.ANALYSES.inc()
+    return JsonResponse({'message': 'Analysis completed successfully', 'analysis': data})
@@ -1,21 +1,29 @@
 import logging
 from django.utils import timezone
+from . import dispatch, instrumentation
 from .models import Conversation
-from .services import ConversationAnalyzer
+from .services import StreamingConversationAnalyzer
 
 logger = logging.getLogger(__name__)
 
 def run_daily_analysis():
     logger.info(f"Starting daily analysis task at {timezone.now()}")
-    pending_conversations = Conversation.objects.filter(status='pending').exclude(messages__isnull=True)
+    dispatch.fail_stale_jobs()
+    # Sweeper for conversations the debounced scheduler missed; those still in
+    # their quiet period are left to it.
+    pending_conversations = (Conversation.objects.filter(status='pending')
+                             .exclude(messages__isnull=True, archived=False)
+                             .exclude(analysis_due_at__gt=timezone.now()))
     total = pending_conversations.count()
+    if instrumentation.is_enabled():
+        instrumentation.BATCH_SIZE.observe(total)
     success_count = error_count = 0
     for conversation in pending_conversations:
         try:
-            if conversation.messages.count() == 0:
+            if conversation.message_count == 0:
                 logger.warning(f"Skipping conversation {conversation.id} – no messages")
                 continue
-            analyzer = ConversationAnalyzer(conversation)
+            analyzer = StreamingConversationAnalyzer(conversation)
             analyzer.analyze()
             success_count += 1
             logger.info(f"Successfully analyzed conversation {conversation.id}")
@@ -24,5 +32,6 @@ def run_daily_analysis():
             logger.error(f"Failed to analyze conversation {conversation.id}: {str(e)}")
             conversation.status = 'error'
             conversation.save()
+    instrumentation.flush_after_work()
     logger.info(f"Daily analysis completed. Total: {total}, Success: {success_count}, Errors: {error_count}")
     return {'total': total, 'success': success_count, 'errors': error_count, 'timestamp': timezone.now()}
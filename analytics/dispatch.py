@@ -0,0 +1,142 @@
+"""Hand background work to Celery or to an in-process fallback queue.
+
+``ANALYTICS_TASK_QUEUE = 'celery'`` publishes tasks to the broker (with
+``CELERY_TASK_ALWAYS_EAGER`` they run inline instead). ``'local'`` runs
+them on a single daemon thread in the web process, which needs no broker
+but loses queued work on restart. Analysis jobs therefore mark their
+conversations pending before queueing them, so the daily sweeper picks
+up whatever a lost chunk left behind, and :func:`fail_stale_jobs` fails
+jobs that stop making progress.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class LocalQueue:
+    """One background thread running submitted callables in ETA order."""
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = 0
+        self._thread = None
+
+    def submit(self, fn, args=(), countdown=0):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + max(countdown, 0), next(self._counter), fn, args))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='analytics-local-queue', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until nothing is queued or running; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._heap or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, fn, args = heapq.heappop(self._heap)
+                self._running += 1
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception(f"Background task {getattr(fn, 'name', fn)} failed")
+            finally:
+                instrumentation.flush_after_work()
+                close_old_connections()
+                with self._condition:
+                    self._running -= 1
+                    self._condition.notify_all()
+
+
+LOCAL_QUEUE = LocalQueue()
+
+
+def runs_inline():
+    """Whether enqueued tasks execute immediately (Celery eager mode), ignoring countdowns."""
+    if getattr(settings, 'ANALYTICS_TASK_QUEUE', 'local') != 'celery':
+        return False
+    from celery import current_app
+    return bool(current_app.conf.task_always_eager)
+
+
+def enqueue(task, *args, countdown=0):
+    """Run Celery ``task`` with ``args`` in the background after ``countdown`` seconds.
+
+    Dispatch waits for the surrounding transaction to commit, so the task
+    always sees the rows that triggered it.
+    """
+    if getattr(settings, 'ANALYTICS_TASK_QUEUE', 'local') == 'celery':
+        transaction.on_commit(lambda: task.apply_async(args, countdown=countdown or None))
+    else:
+        transaction.on_commit(lambda: LOCAL_QUEUE.submit(task, args, countdown))
+
+
+def start_analysis_job(conversation_ids, created_by=None, chunk_size=None):
+    """Create an ``AnalysisJob`` for ``conversation_ids`` and enqueue its chunks.
+
+    The conversations are marked pending first, so if a chunk is lost they
+    are still analyzed by the sweeper.
+    """
+    from .models import AnalysisJob, Conversation
+    from .tasks import analyze_job_chunk
+    chunk_size = chunk_size or getattr(settings, 'ANALYTICS_JOB_CHUNK_SIZE', 200)
+    conversation_ids = list(conversation_ids)
+    job = AnalysisJob.objects.create(
+        conversation_ids=conversation_ids, total=len(conversation_ids), chunk_size=chunk_size,
+        created_by=created_by if created_by is not None and created_by.is_authenticated else None,
+    )
+    if not conversation_ids:
+        AnalysisJob.objects.filter(pk=job.pk).update(status='completed', finished_at=job.created_at)
+        job.refresh_from_db()
+    for start in range(0, len(conversation_ids), chunk_size):
+        chunk = conversation_ids[start:start + chunk_size]
+        Conversation.objects.filter(id__in=chunk).update(status='pending')
+        enqueue(analyze_job_chunk, job.id, chunk)
+    return job
+
+
+def fail_stale_jobs():
+    """Fail queued or running jobs with no progress for ``ANALYTICS_JOB_STALE_SECONDS``.
+
+    Their remaining chunks were lost, e.g. with the process running the
+    local queue; the conversations stay pending for the sweeper. Returns the
+    number of jobs failed.
+    """
+    from .models import AnalysisJob
+    seconds = getattr(settings, 'ANALYTICS_JOB_STALE_SECONDS', 1800)
+    stale = AnalysisJob.objects.filter(
+        status__in=['queued', 'running'], updated_at__lt=timezone.now() - timedelta(seconds=seconds)
+    )
+    count = 0
+    for job in stale:
+        job.status = 'failed'
+        job.finished_at = timezone.now()
+        job.errors = job.errors + [{'id': None, 'error': f'No progress for {seconds}s; remaining chunks were '
+                                                        'lost and their conversations left pending'}]
+        job.save(update_fields=['status', 'finished_at', 'errors', 'updated_at'])
+        count += 1
+    return count
@@ -0,0 +1,266 @@
+"""Analysis-completed events: a bounded log in the database plus in-process fan-out.
+
+Saving an analysis appends an :class:`~analytics.models.AnalysisEvent` in the
+same transaction; after commit the events are published to
+:data:`BROKER`, which wakes every open ``/api/stream/analyses/`` response
+in this process. The last ``ANALYTICS_EVENT_LOG_SIZE`` events stay in the
+table so a reconnecting client can resume from ``Last-Event-ID``.
+
+Analyses saved by another process (a Celery worker, another web worker)
+never reach this process's broker; open streams read them from the log
+every ``ANALYTICS_STREAM_POLL_SECONDS`` instead.
+
+Event ids are allocated when a transaction inserts, not when it commits,
+so an event can appear below ids a stream has already sent. Each stream
+remembers the ids it skipped over for ``GAP_SECONDS`` and re-reads them
+with every log query.
+
+Every open stream holds a thread for up to ``ANALYTICS_STREAM_MAX_SECONDS``;
+serve it over ASGI, where that is a cheap thread rather than a WSGI worker.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .models import AnalysisEvent
+
+PAYLOAD_FIELDS = ['overall_score', 'sentiment', 'resolution', 'escalation_needed']
+CATCH_UP_BATCH = 500
+# How long a skipped event id may still turn up (a slow transaction
+# committing late), and how many such ids one stream tracks (kept well
+# under SQLite's limit on query parameters).
+GAP_SECONDS = 60
+MAX_GAPS = 500
+
+
+def payload(analysis):
+    """Compact event body for a saved ``ConversationAnalysis``."""
+    data = {'conversation_id': analysis.conversation_id}
+    data.update((field, getattr(analysis, field)) for field in PAYLOAD_FIELDS)
+    data['needs_attention'] = bool(analysis.needs_attention)
+    return data
+
+
+def record_analyses(analyses):
+    """Log an event per saved analysis and publish them once the transaction commits.
+
+    Call inside the transaction that saves ``analyses``. Events older than
+    the newest ``ANALYTICS_EVENT_LOG_SIZE`` are trimmed.
+    """
+    events = AnalysisEvent.objects.bulk_create([
+        AnalysisEvent(conversation_id=analysis.conversation_id, payload=payload(analysis))
+        for analysis in analyses
+    ])
+    if not events:
+        return events
+    last_id = events[-1].pk or AnalysisEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    AnalysisEvent.objects.filter(id__lte=last_id - getattr(settings, 'ANALYTICS_EVENT_LOG_SIZE', 10000)).delete()
+    transaction.on_commit(lambda: BROKER.publish(events))
+    return events
+
+
+class Subscription:
+    """Events published since subscribing, buffered up to ``limit``."""
+
+    def __init__(self, broker, limit):
+        self._broker = broker
+        self._limit = limit
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._overflowed = False
+
+    def push(self, events):
+        with self._condition:
+            # Without ids the events cannot be ordered against the log, so
+            # treat them like an overflow and let the reader re-query.
+            if (self._overflowed or len(self._events) + len(events) > self._limit
+                    or any(event.pk is None for event in events)):
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.extend(events)
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Wait up to ``timeout`` seconds for events; returns ``(events, overflowed)``.
+
+        ``overflowed`` means events were dropped and the caller should read
+        the log instead.
+        """
+        with self._condition:
+            if not self._events and not self._overflowed:
+                self._condition.wait(timeout)
+            events, overflowed = list(self._events), self._overflowed
+            self._events.clear()
+            self._overflowed = False
+        return events, overflowed
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalBroker:
+    """Fans published events out to the subscriptions open in this process."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, limit=1000):
+        subscription = Subscription(self, limit)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.push(events)
+
+
+BROKER = LocalBroker()
+
+
+def format_event(event=None, data=None, id=None, retry=None):
+    """One Server-Sent Events frame."""
+    lines = []
+    if id is not None:
+        lines.append(f'id: {id}')
+    if event:
+        lines.append(f'event: {event}')
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    if data is not None:
+        lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def events_after(last_id, conversation_ids=None, limit=CATCH_UP_BATCH, gaps=()):
+    """Events after ``last_id``, plus any of the earlier ids in ``gaps`` committed since."""
+    condition = Q(id__gt=last_id)
+    if gaps:
+        condition |= Q(id__in=list(gaps))
+    queryset = AnalysisEvent.objects.filter(condition).order_by('id')
+    if conversation_ids:
+        queryset = queryset.filter(conversation_id__in=conversation_ids)
+    return list(queryset[:limit])
+
+
+def stream(last_event_id=None, conversation_ids=None, dashboard=None):
+    """Yield SSE frames: events missed since ``last_event_id``, then live ones.
+
+    Without ``last_event_id`` only new events are sent. If the log no longer
+    reaches back that far a ``reset`` event tells the client to refetch
+    before continuing. ``dashboard`` is a callable returning the dashboard
+    summary; it is checked every ``ANALYTICS_STREAM_DASHBOARD_SECONDS`` and
+    only the sections that changed are sent. The response ends after
+    ``ANALYTICS_STREAM_MAX_SECONDS`` so a worker is not held forever;
+    EventSource reconnects on its own and resumes from the last id.
+    """
+    poll = getattr(settings, 'ANALYTICS_STREAM_POLL_SECONDS', 5)
+    dashboard_every = getattr(settings, 'ANALYTICS_STREAM_DASHBOARD_SECONDS', 30)
+    deadline = time.monotonic() + getattr(settings, 'ANALYTICS_STREAM_MAX_SECONDS', 60)
+    wanted = set(conversation_ids or ())
+
+    # Subscribe before reading the log so nothing committed in between is lost.
+    with BROKER.subscribe() as subscription:
+        yield format_event(retry=getattr(settings, 'ANALYTICS_STREAM_RETRY_MS', 3000))
+        if last_event_id is None:
+            last = AnalysisEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        else:
+            last = last_event_id
+            oldest = AnalysisEvent.objects.order_by('id').values_list('id', flat=True).first()
+            if oldest is not None and last < oldest - 1:
+                yield format_event('reset', {'last_event_id': last, 'oldest_event_id': oldest})
+        # Skipped ids an open transaction may still commit, with their expiry;
+        # seeded with the ids just below the starting point not yet in the log.
+        seen = set(AnalysisEvent.objects.filter(id__gt=last - MAX_GAPS, id__lte=last).values_list('id', flat=True))
+        expiry = time.monotonic() + GAP_SECONDS
+        gaps = {gap: expiry for gap in range(max(last - MAX_GAPS, 0) + 1, last + 1) if gap not in seen}
+        events = events_after(last, wanted, gaps=gaps)
+        previous, next_dashboard = {}, time.monotonic()
+        while True:
+            now = time.monotonic()
+            for event in events:
+                if event.pk > last:
+                    for missing in range(max(last + 1, event.pk - MAX_GAPS), event.pk):
+                        gaps[missing] = now + GAP_SECONDS
+                    last = event.pk
+                elif gaps.pop(event.pk, None) is None:
+                    continue
+                if not wanted or event.conversation_id in wanted:
+                    yield format_event('analysis', event.payload, id=event.pk)
+            # Ids were added in ascending order, so the oldest come first.
+            stale = [gap for gap, expiry in gaps.items() if expiry <= now]
+            for missing in stale + list(gaps)[len(stale):len(gaps) - MAX_GAPS]:
+                del gaps[missing]
+            if len(events) == CATCH_UP_BATCH:
+                events = events_after(last, wanted, gaps=gaps)
+                continue
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if dashboard is not None and now >= next_dashboard:
+                summary = dashboard()
+                delta = {key: value for key, value in summary.items() if previous.get(key) != value}
+                if delta:
+                    yield format_event('dashboard', delta)
+                previous, next_dashboard = summary, now + dashboard_every
+            timeout = min(poll, deadline - now)
+            if dashboard is not None:
+                timeout = min(timeout, next_dashboard - now)
+            events, overflowed = subscription.get(max(timeout, 0))
+            if not events and not overflowed:
+                # Idle: keep proxies from timing out, and pick up events
+                # recorded by other processes.
+                yield ': keepalive\n\n'
+                events = events_after(last, wanted, gaps=gaps)
+            elif overflowed:
+                events = events_after(last, wanted, gaps=gaps)
+
+
+async def astream(*args, **kwargs):
+    """:func:`stream` as an async iterator, for responses served over ASGI.
+
+    Django would buffer a synchronous iterator whole under ASGI, so the
+    blocking generator is driven from its own thread, which also keeps its
+    database connection, and is closed there when the client goes away.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics-stream')
+    frames = stream(*args, **kwargs)
+
+    def close():
+        frames.close()
+        connections.close_all()
+
+    try:
+        while True:
+            frame = await loop.run_in_executor(executor, next, frames, None)
+            if frame is None:
+                return
+            yield frame
+    finally:
+        await loop.run_in_executor(executor, close)
+        executor.shutdown(wait=False)
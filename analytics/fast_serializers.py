@@ -0,0 +1,140 @@
+"""Read-path serialization from ``values()`` rows, bypassing DRF field machinery.
+
+Produces exactly the dictionaries :class:`~analytics.serializers.ConversationSerializer`
+and :class:`~analytics.serializers.ConversationAnalysisSerializer` would,
+with the same key order (taken from their ``Meta.fields``) and the same
+value formatting, but without instantiating models or serializer fields per
+row. Used by :class:`~analytics.views.ConversationViewSet` when
+``ANALYTICS_FAST_SERIALIZATION`` is enabled.
+"""
+from itertools import groupby
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from . import archive
+from .models import ArchivedTranscript, Conversation, ConversationAnalysis, Message
+from .serializers import ConversationAnalysisSerializer, ConversationSerializer, MessageSerializer
+
+MESSAGE_FIELDS = list(MessageSerializer.Meta.fields)
+CONVERSATION_COLUMNS = ['id', 'title', 'created_at', 'updated_at', 'status', 'archived']
+ANALYSIS_FIELDS = list(ConversationAnalysisSerializer.Meta.fields)
+# Columns read for an analysis; the other ANALYSIS_FIELDS are derived from them.
+ANALYSIS_COLUMNS = [
+    f for f in ANALYSIS_FIELDS
+    if f not in ('conversation_id', 'conversation_title', 'quality_average', 'needs_attention')
+]
+_FLOAT_COLUMNS = {
+    f.name for f in ConversationAnalysis._meta.concrete_fields if isinstance(f, models.FloatField)
+}
+
+
+def _datetime_formatter():
+    """DRF ``DateTimeField.to_representation`` with the format and time zone resolved once.
+
+    Looking up the current time zone per value dominates serializing long
+    transcripts; aware ISO 8601 output is formatted inline and anything
+    else goes through the DRF field itself.
+    """
+    field = serializers.DateTimeField().to_representation
+    output_format = api_settings.DATETIME_FORMAT
+    if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+        return field
+    tz = timezone.get_current_timezone()
+
+    def to_representation(value):
+        if value is None or value.tzinfo is None:
+            return field(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return to_representation
+
+
+def _message(datetime, id, sender, text, timestamp, sequence_number):
+    return {
+        'id': id, 'sender': sender, 'text': text,
+        'timestamp': datetime(timestamp), 'sequence_number': sequence_number,
+    }
+
+
+def _message_rows(conversation_ids, datetime):
+    """``{conversation_id: [message dict, ...]}`` in the model's default ordering."""
+    qs = (Message.objects.filter(conversation_id__in=conversation_ids)
+          .order_by('conversation_id', *Message._meta.ordering)
+          .values_list('conversation_id', *MESSAGE_FIELDS))
+    return {
+        conversation_id: [_message(datetime, *row[1:]) for row in group]
+        for conversation_id, group in groupby(qs.iterator(), key=lambda row: row[0])
+    }
+
+
+def serialize_conversation_rows(rows):
+    """``ConversationSerializer`` output for ``values(*CONVERSATION_COLUMNS)`` rows.
+
+    Messages are fetched with one query, plus one when any conversation is
+    archived.
+    """
+    rows = list(rows)
+    datetime = _datetime_formatter()
+    messages = _message_rows([row['id'] for row in rows], datetime)
+    archived = [row['id'] for row in rows if row['archived']]
+    if archived:
+        for cid, codec, blob in ArchivedTranscript.objects.filter(conversation_id__in=archived).values_list(
+                'conversation_id', 'codec', 'data'):
+            messages[cid] = [_message(datetime, *m) for m in archive.decode(archive.decompress(bytes(blob), codec))]
+    data = []
+    for row in rows:
+        transcript = messages.get(row['id'], [])
+        data.append({
+            'id': row['id'], 'title': row['title'],
+            'created_at': datetime(row['created_at']), 'updated_at': datetime(row['updated_at']),
+            'status': row['status'], 'messages': transcript, 'message_count': len(transcript),
+        })
+    return data
+
+
+def serialize_conversations(conversation_ids):
+    """``ConversationSerializer`` output for ``conversation_ids``, in that order; missing ids are left out."""
+    conversation_ids = list(conversation_ids)
+    rows = {
+        row['id']: row for row in Conversation.objects.filter(id__in=conversation_ids).values(*CONVERSATION_COLUMNS)
+    }
+    return serialize_conversation_rows(rows[cid] for cid in conversation_ids if cid in rows)
+
+
+def analysis_values(conversation_ids):
+    """``{conversation_id: SimpleNamespace}`` of analysis columns plus the title.
+
+    The namespaces stand in for ``ConversationAnalysis`` instances wherever
+    only attributes are read (report insights, :func:`serialize_analysis`).
+    """
+    qs = ConversationAnalysis.objects.filter(conversation_id__in=list(conversation_ids)).values(
+        'conversation_id', 'conversation__title', *ANALYSIS_COLUMNS
+    )
+    return {row['conversation_id']: SimpleNamespace(**row) for row in qs}
+
+
+def serialize_analysis(analysis):
+    """``ConversationAnalysisSerializer`` output for an :func:`analysis_values` namespace."""
+    data = {}
+    datetime = _datetime_formatter()
+    for field in ANALYSIS_FIELDS:
+        if field == 'conversation_id':
+            data[field] = analysis.conversation_id
+        elif field == 'conversation_title':
+            data[field] = analysis.conversation__title
+        elif field == 'quality_average':
+            data[field] = float(ConversationAnalysis.quality_average.fget(analysis))
+        elif field == 'needs_attention':
+            data[field] = bool(ConversationAnalysis.needs_attention.fget(analysis))
+        elif field in ('created_at', 'updated_at'):
+            data[field] = datetime(getattr(analysis, field))
+        elif field in _FLOAT_COLUMNS:
+            data[field] = float(getattr(analysis, field))
+        else:
+            data[field] = getattr(analysis, field)
+    return data
@@ -0,0 +1,309 @@
+"""Dependency-free Prometheus metrics for the analysis pipeline.
+
+Metrics are recorded in process memory and rendered in the Prometheus text
+exposition format by the ``/metrics`` view. Recording is guarded by
+``is_enabled()`` at each call site, so with ``ANALYTICS_METRICS_ENABLED =
+False`` the hot paths skip timing entirely.
+
+Analyses run in Celery workers, the local queue thread, cron and every web
+worker, so each process folds what it recorded since its last flush into
+shared ``MetricTotal`` rows after each request, Celery task, local queue
+job, cron run or ``reanalyze`` chunk that recorded anything. ``/metrics``
+flushes its own process and renders those totals, so any web worker
+reports the whole deployment. The ``analytics_pending_conversations``
+gauge reads the database at scrape time.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from copy import deepcopy
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def is_enabled():
+    return getattr(settings, 'ANALYTICS_METRICS_ENABLED', True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _load(data):
+    """Stored ``[[label_pairs, value], ...]`` rows as a dict keyed like ``Metric._values``."""
+    return {tuple(tuple(pair) for pair in labels): value for labels, value in data}
+
+
+def _dump(values):
+    return [[[list(pair) for pair in key], value] for key, value in values.items()]
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        # Only what was recorded since this process last flushed
+        self._values = {}
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def _key(self, labels):
+        # Label values are compared after a JSON round trip, so keep them strings
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def merge(self, total, delta):
+        """Combine a stored ``total`` (None if absent) with a later ``delta``."""
+        raise NotImplementedError
+
+    def drain(self):
+        """Take the values recorded since the last flush, leaving none behind."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def restore(self, values):
+        """Put back drained values whose flush failed, so the next flush retries them."""
+        with self._lock:
+            for key, value in values.items():
+                current = self._values.get(key)
+                self._values[key] = value if current is None else self.merge(value, current)
+
+    def pending(self):
+        with self._lock:
+            return deepcopy(self._values)
+
+    def samples(self, values):
+        """Yield ``(suffix, label_pairs, value)`` tuples for exposition."""
+        raise NotImplementedError
+
+    def render(self, values):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self.samples(values):
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonic counter; by convention ``name`` ends in ``_total``."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, total, delta):
+        return (total or 0) + delta
+
+    def value(self, **labels):
+        """The shared total across processes, including this one's unflushed part."""
+        return self.registry.totals()[self.name].get(self._key(labels), 0)
+
+    def samples(self, values):
+        for key, value in values.items():
+            yield '', key, value
+
+
+class Gauge(Metric):
+    """A gauge that is either set directly or computed by ``callback`` at scrape time.
+
+    Set gauges are shared too; the most recently flushed value wins.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback=None, registry=None):
+        super().__init__(name, documentation, registry)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def merge(self, total, delta):
+        return delta
+
+    def samples(self, values):
+        if self.callback is not None:
+            yield '', (), self.callback()
+            return
+        for key, value in values.items():
+            yield '', key, value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def merge(self, total, delta):
+        if total is None or len(total[0]) != len(delta[0]):
+            # Nothing stored yet, or stored under different buckets before a deploy
+            return deepcopy(delta)
+        return [[a + b for a, b in zip(total[0], delta[0])], total[1] + delta[1], total[2] + delta[2]]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self, values):
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                yield '_bucket', (*key, ('le', _format_value(float(bound)))), cumulative
+            yield '_sum', key, total
+            yield '_count', key, count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    @property
+    def dirty(self):
+        return any(metric._values for metric in self._metrics)
+
+    def flush(self):
+        """Fold everything recorded since the last flush into the shared ``MetricTotal`` rows.
+
+        On a database error the values are kept and retried by the next flush.
+        """
+        from .models import MetricTotal
+        deltas = {}
+        for metric in self._metrics:
+            values = metric.drain()
+            if values:
+                deltas[metric.name] = (metric, values)
+        if not deltas:
+            return
+        try:
+            with transaction.atomic():
+                # Inserting first takes SQLite's write lock before the rows are read
+                MetricTotal.objects.bulk_create([MetricTotal(name=name) for name in sorted(deltas)],
+                                                ignore_conflicts=True)
+                rows = list(MetricTotal.objects.select_for_update().filter(name__in=deltas).order_by('name'))
+                for row in rows:
+                    metric, values = deltas[row.name]
+                    totals = _load(row.data)
+                    for key, value in values.items():
+                        totals[key] = metric.merge(totals.get(key), value)
+                    row.data = _dump(totals)
+                MetricTotal.objects.bulk_update(rows, ['data'])
+        except DatabaseError:
+            logger.warning('Could not flush metrics; keeping them for the next flush', exc_info=True)
+            for metric, values in deltas.values():
+                metric.restore(values)
+
+    def totals(self):
+        """Shared totals plus this process's unflushed values, keyed by metric name."""
+        from .models import MetricTotal
+        stored = dict(MetricTotal.objects.filter(name__in=[m.name for m in self._metrics])
+                      .values_list('name', 'data'))
+        totals = {}
+        for metric in self._metrics:
+            values = _load(stored.get(metric.name, []))
+            for key, value in metric.pending().items():
+                values[key] = metric.merge(values.get(key), value)
+            totals[metric.name] = values
+        return totals
+
+    def render(self):
+        self.flush()
+        totals = self.totals()
+        return '\n'.join(metric.render(totals[metric.name]) for metric in self._metrics) + '\n'
+
+    def discard(self):
+        """Drop unflushed values.
+
+        Runs in forked children (e.g. Celery prefork workers), which inherit
+        values the parent flushes itself and possibly a lock held by another
+        parent thread.
+        """
+        for metric in self._metrics:
+            metric._lock = threading.Lock()
+            metric._values = {}
+
+
+REGISTRY = Registry()
+
+METRIC_SECONDS = Histogram(
+    'analytics_metric_seconds', 'Time spent computing each metric inside analyze().')
+DB_SECONDS = Histogram(
+    'analytics_db_seconds', 'Time spent loading messages and writing analyses.')
+ANALYSIS_SECONDS = Histogram(
+    'analytics_analysis_seconds', 'End-to-end latency of analyzing one conversation.')
+BATCH_SIZE = Histogram(
+    'analytics_batch_size', 'Conversations per batch analysis run.', buckets=SIZE_BUCKETS)
+ANALYSES = Counter(
+    'analytics_analyses_total', 'Conversations analyzed successfully.')
+FAILURES = Counter(
+    'analytics_analysis_failures_total', 'Conversations whose analysis raised an error.')
+
+
+def _pending_count():
+    from .models import Conversation
+    return Conversation.objects.filter(status='pending').count()
+
+
+PENDING = Gauge(
+    'analytics_pending_conversations', 'Conversations waiting for analysis.', callback=_pending_count)
+
+
+def flush_after_work(**kwargs):
+    """Signal receiver flushing this process's metrics once the current transaction commits."""
+    if is_enabled() and REGISTRY.dirty:
+        transaction.on_commit(REGISTRY.flush)
+
+
+request_finished.connect(flush_after_work, dispatch_uid='analytics.instrumentation.flush_after_work')
+os.register_at_fork(after_in_child=REGISTRY.discard)
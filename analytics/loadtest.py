@@ -0,0 +1,241 @@
+"""Load-test driver for the REST API.
+
+Requests go either through Django's test client inside this process or over
+HTTP to a running server (``base_url``), from a pool of threads. Payloads
+come from ``analytics.synthetic`` so runs are reproducible for a seed.
+In-process runs use :func:`scratch_database`, never the real database.
+"""
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from contextlib import contextmanager
+
+from .synthetic import TranscriptGenerator
+
+TITLE_PREFIX = 'loadtest'
+
+SCENARIOS = {
+    # endpoint -> relative weight
+    'ingest': {'create': 1},
+    'read': {'dashboard': 2, 'report': 2, 'list': 1},
+    'mixed': {'create': 2, 'dashboard': 3, 'report': 3, 'list': 2},
+}
+
+
+def sqlite_concurrency_options():
+    """SQLite connection OPTIONS for many writer threads.
+
+    A busy timeout, and on Django 5.1+ ``transaction_mode=IMMEDIATE`` so the
+    write lock is taken at BEGIN: concurrent writers then wait for it instead
+    of failing with "database is locked" when a read transaction upgrades.
+    """
+    import django
+    options = {'timeout': 20}
+    if django.VERSION >= (5, 1):
+        options['transaction_mode'] = 'IMMEDIATE'
+    return options
+
+
+@contextmanager
+def scratch_database():
+    """Point the default database at a freshly migrated throwaway copy for the duration.
+
+    Uses Django's test database machinery; on SQLite the copy is a temporary
+    file (not in-memory, so threads share it) opened with
+    :func:`sqlite_concurrency_options`.
+    """
+    from django.db import DEFAULT_DB_ALIAS, connections
+    from django.test.utils import setup_databases, teardown_databases
+    db = connections.settings[DEFAULT_DB_ALIAS]
+    original_options = db.get('OPTIONS', {})
+    if db['ENGINE'] == 'django.db.backends.sqlite3':
+        db['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), f'analytics-loadtest-{os.getpid()}.sqlite3')
+        db['OPTIONS'] = {**original_options, **sqlite_concurrency_options()}
+    connections.close_all()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS})
+    try:
+        yield
+    finally:
+        connections.close_all()
+        teardown_databases(old_config, verbosity=0)
+        db['OPTIONS'] = original_options
+
+
+class InProcessTransport:
+    """Drive the app through ``django.test.Client``, one client per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            from django.test import Client
+            client = self._local.client = Client(SERVER_NAME='localhost')
+        return client
+
+    def request(self, method, path, payload=None, headers=None):
+        client = self._client()
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()}
+        if method == 'POST':
+            response = client.post(path, json.dumps(payload or {}), content_type='application/json', **extra)
+        else:
+            response = client.get(path, **extra)
+        return response.status_code, response.content
+
+    def close_thread(self):
+        from django.db import connections
+        connections.close_all()
+
+
+class HttpTransport:
+    """Drive a running server over HTTP with ``urllib``."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None, headers=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json', **(headers or {})})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def close_thread(self):
+        pass
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LoadTest:
+    def __init__(self, transport, scenario='mixed', concurrency=4, duration=10.0, max_requests=None,
+                 seed=0, turns=(4, 40), analyze_on_create=True):
+        if scenario not in SCENARIOS:
+            raise ValueError(f"scenario must be one of {', '.join(SCENARIOS)}")
+        self.transport = transport
+        self.weights = SCENARIOS[scenario]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.seed = seed
+        self.turns = turns
+        self.analyze_on_create = analyze_on_create
+        self.conversation_ids = []
+        self._issued = 0
+        self._lock = threading.Lock()
+
+    def _payload(self, generator):
+        transcript = generator.transcript()
+        return {
+            'title': f"{TITLE_PREFIX} {transcript['title']}",
+            'messages': [{'sender': m['sender'], 'message': m['message']} for m in transcript['messages']],
+        }
+
+    def _timed(self, samples, endpoint, method, path, payload=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, payload, headers)
+        except Exception:
+            status, body = 0, b''
+        samples[endpoint].append((time.perf_counter() - start, 200 <= status < 300))
+        return status, body
+
+    def _step(self, endpoint, rng, generator, samples):
+        if endpoint == 'create':
+            status, body = self._timed(samples, 'create', 'POST', '/api/conversations/', self._payload(generator))
+            if status == 201:
+                conversation_id = json.loads(body)['id']
+                if self.analyze_on_create:
+                    self._timed(samples, 'analyze', 'POST', f'/api/conversations/{conversation_id}/analyze/')
+                self.conversation_ids.append(conversation_id)
+        elif endpoint == 'dashboard':
+            self._timed(samples, 'dashboard', 'GET', '/dashboard/', headers={'Accept': 'application/json'})
+        elif endpoint == 'list':
+            self._timed(samples, 'list', 'GET', '/api/conversations/')
+        elif endpoint == 'report' and self.conversation_ids:
+            conversation_id = rng.choice(self.conversation_ids)
+            self._timed(samples, 'report', 'GET', f'/api/conversations/{conversation_id}/report/')
+
+    def _claim(self):
+        if self.max_requests is None:
+            return True
+        with self._lock:
+            if self._issued >= self.max_requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _worker(self, index, deadline, results):
+        rng = random.Random(self.seed * 1000 + index)
+        generator = TranscriptGenerator(seed=self.seed * 1000 + index, turns=self.turns)
+        endpoints, weights = zip(*self.weights.items())
+        samples = defaultdict(list)
+        try:
+            while time.monotonic() < deadline and self._claim():
+                self._step(rng.choices(endpoints, weights)[0], rng, generator, samples)
+        finally:
+            results[index] = samples
+            self.transport.close_thread()
+
+    def warm_up(self, conversations=5):
+        """Create a few analyzed conversations so read endpoints have targets."""
+        generator = TranscriptGenerator(seed=self.seed, turns=self.turns)
+        samples = defaultdict(list)
+        for _ in range(conversations):
+            self._step('create', random.Random(self.seed), generator, samples)
+
+    def run(self):
+        results = [None] * self.concurrency
+        deadline = time.monotonic() + self.duration
+        threads = [threading.Thread(target=self._worker, args=(i, deadline, results), daemon=True)
+                   for i in range(self.concurrency)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        merged = defaultdict(list)
+        for samples in results:
+            for endpoint, values in (samples or {}).items():
+                merged[endpoint].extend(values)
+        return self.summarize(merged, elapsed)
+
+    def summarize(self, samples, elapsed):
+        report = {'elapsed_seconds': elapsed, 'concurrency': self.concurrency, 'endpoints': {}}
+        total = 0
+        for endpoint, values in sorted(samples.items()):
+            latencies = sorted(v[0] * 1000 for v in values)
+            errors = sum(1 for v in values if not v[1])
+            total += len(values)
+            report['endpoints'][endpoint] = {
+                'requests': len(values),
+                'errors': errors,
+                'throughput_rps': len(values) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': latencies[-1] if latencies else 0.0,
+            }
+        report['total_requests'] = total
+        report['throughput_rps'] = total / elapsed if elapsed else 0.0
+        created = report['endpoints'].get('create', {}).get('requests', 0)
+        report['conversations_per_second'] = created / elapsed if elapsed else 0.0
+        return report
@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from analytics.offline import analyze_files, build_parser
+
+
+class Command(BaseCommand):
+    help = 'Score JSONL transcript files in parallel and write NDJSON results, without touching the database.'
+    requires_system_checks = []
+    requires_migrations_checks = False
+
+    def add_arguments(self, parser):
+        build_parser(parser)
+
+    def handle(self, *args, **options):
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            scored, failed = analyze_files(
+                options['paths'], out, workers=options['workers'], chunksize=options['chunksize'],
+            )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stderr.write(style(f"Scored {scored} transcript(s), {failed} failed"))
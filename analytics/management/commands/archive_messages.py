@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.archive import available_codecs
+from analytics.models import Conversation
+from analytics.services import archive_conversations, rehydrate_conversations
+
+
+class Command(BaseCommand):
+    help = ('Move the messages of old, analyzed conversations into compressed '
+            'per-conversation archives, or restore them with --rehydrate.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int,
+                            default=getattr(settings, 'ANALYTICS_ARCHIVE_AFTER_DAYS', 90),
+                            help='Archive conversations created more than this many days ago')
+        parser.add_argument('--codec', default=getattr(settings, 'ANALYTICS_ARCHIVE_CODEC', 'zlib'),
+                            help=f"Compression codec (available: {', '.join(available_codecs())})")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Conversations archived per transaction (default: 200)')
+        parser.add_argument('--rehydrate', action='store_true',
+                            help='Restore archived messages to the message table instead')
+        parser.add_argument('--ids', type=int, nargs='+',
+                            help='Only these conversation ids (ignores --older-than)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many conversations would be processed')
+
+    def handle(self, *args, **options):
+        if options['codec'] not in available_codecs():
+            raise CommandError(f"Codec '{options['codec']}' is not available; "
+                               f"choose from {', '.join(available_codecs())}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        queryset = Conversation.objects.filter(archived=options['rehydrate'])
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        elif not options['rehydrate']:
+            cutoff = timezone.now() - timedelta(days=options['older_than'])
+            queryset = queryset.filter(status='analyzed', created_at__lt=cutoff)
+        action = 'rehydrate' if options['rehydrate'] else 'archive'
+        if options['dry_run']:
+            self.stdout.write(f"Would {action} {queryset.count()} conversations")
+            return
+
+        started = time.monotonic()
+        done = raw_bytes = compressed_bytes = 0
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by('id')
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            if options['rehydrate']:
+                done += rehydrate_conversations(ids)
+            else:
+                count, raw, compressed = archive_conversations(ids, codec=options['codec'])
+                done += count
+                raw_bytes += raw
+                compressed_bytes += compressed
+            self.stdout.write(f"  {action}d {done} conversations (through id {last_id})")
+
+        summary = f"{action.capitalize()}d {done} conversations in {time.monotonic() - started:.2f}s"
+        if raw_bytes:
+            summary += (f"; {raw_bytes:,} bytes packed into {compressed_bytes:,} "
+                        f"({compressed_bytes / raw_bytes:.1%})")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from analytics.loadtest import SCENARIOS, HttpTransport, InProcessTransport, LoadTest, scratch_database
+
+
+class Command(BaseCommand):
+    help = ('Load-test the REST API in-process or against a running server and report '
+            'throughput and p50/p95/p99 latency per endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+        parser.add_argument('--concurrency', type=int, default=4, help='Worker threads (default: 4)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+        parser.add_argument('--requests', type=int, help='Stop after this many operations instead')
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8000 '
+                                          '(default: drive the app in-process against a scratch database)')
+        parser.add_argument('--turns', type=int, default=20, help='Messages per synthetic conversation')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-analyze', action='store_true',
+                            help='Do not call analyze after each create')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            report = self._run(HttpTransport(options['url']), options)
+        else:
+            with scratch_database():
+                report = self._run(InProcessTransport(), options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{options['scenario']} scenario, {report['concurrency']} threads, "
+                          f"{report['elapsed_seconds']:.1f}s")
+        self.stdout.write(f"{'endpoint':12} {'reqs':>7} {'errs':>5} {'rps':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for endpoint, row in report['endpoints'].items():
+            self.stdout.write(f"{endpoint:12} {row['requests']:7d} {row['errors']:5d} "
+                              f"{row['throughput_rps']:8.1f} {row['p50_ms']:8.1f} "
+                              f"{row['p95_ms']:8.1f} {row['p99_ms']:8.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['throughput_rps']:.1f} req/s overall, "
+            f"{report['conversations_per_second']:.1f} conversations/s ingested"))
+
+    def _run(self, transport, options):
+        test = LoadTest(
+            transport, scenario=options['scenario'], concurrency=options['concurrency'],
+            duration=options['duration'] if options['requests'] is None else float('inf'),
+            max_requests=options['requests'], seed=options['seed'], turns=options['turns'],
+            analyze_on_create=not options['no_analyze'],
+        )
+        test.warm_up()
+        return test.run()
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.models import Conversation
+from analytics.services import PURGE_TABLES, purge_conversations
+
+
+class Command(BaseCommand):
+    help = ('Permanently delete conversations older than a retention period, with '
+            'their messages, analyses, similarity bands and archives, in '
+            'keyset-ordered batches of set-based deletes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True,
+                            help='Delete conversations created more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Conversations deleted per transaction (default: 500)')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Maximum conversations deleted per second (default: unthrottled)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError('--older-than must not be negative')
+        if not 1 <= options['batch_size'] <= 900:
+            # Ids are bound as parameters; stay under SQLite's variable limit.
+            raise CommandError('--batch-size must be between 1 and 900')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        queryset = Conversation.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            ids = queryset.values('id')
+            for model, column in PURGE_TABLES:
+                count = model.objects.filter(**{f'{column}__in': ids}).count()
+                self.stdout.write(f"  {model._meta.db_table}: {count} rows")
+            self.stdout.write(f"Would purge {queryset.count()} conversations created before {cutoff:%Y-%m-%d %H:%M}")
+            return
+
+        rate = options['rate']
+        totals = {}
+        done = last_id = 0
+        started = time.monotonic()
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by('id')
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            for table, count in purge_conversations(ids).items():
+                totals[table] = totals.get(table, 0) + count
+            done += len(ids)
+            elapsed = time.monotonic() - started
+            if rate and done / rate > elapsed:
+                # Pausing between batches leaves the write lock free for ingest.
+                time.sleep(done / rate - elapsed)
+            self.stdout.write(f"  purged {done} conversations (through id {last_id})")
+
+        for table, count in totals.items():
+            self.stdout.write(f"  {table}: {count} rows deleted")
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {done} conversations in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,138 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from analytics import instrumentation
+from analytics.models import Conversation
+from analytics.scoring import ANALYZER_VERSION
+from analytics.services import analyze_conversations
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours:d}:{rest // 60:02d}:{rest % 60:02d}"
+
+
+class Command(BaseCommand):
+    help = ('Re-score stored analyses in keyset-paginated chunks with a resumable '
+            'checkpoint, optional throttling and parallel scoring.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Conversations loaded and written per chunk (default: 500)')
+        parser.add_argument('--since', help='Only conversations created on or after YYYY-MM-DD')
+        parser.add_argument('--until', help='Only conversations created before YYYY-MM-DD')
+        version = parser.add_mutually_exclusive_group()
+        version.add_argument('--analyzer-version', type=int,
+                             help='Only analyses produced by this analyzer version')
+        version.add_argument('--stale', action='store_true',
+                             help=f'Only analyses older than the current analyzer version ({ANALYZER_VERSION})')
+        parser.add_argument('--include-pending', action='store_true',
+                            help='Also analyze conversations that have never been analyzed')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Maximum conversations per second (default: unthrottled)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes used for scoring (default: 1, in-process)')
+        parser.add_argument('--checkpoint', default='.reanalyze_checkpoint.json',
+                            help='Checkpoint file used to resume after interruption')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start from the beginning')
+
+    def handle(self, *args, **options):
+        filters = {
+            'since': options['since'], 'until': options['until'],
+            'analyzer_version': options['analyzer_version'], 'stale': options['stale'],
+            'include_pending': options['include_pending'],
+        }
+        queryset = self._build_queryset(filters)
+        checkpoint_path = options['checkpoint']
+        state = self._load_checkpoint(checkpoint_path, filters, options['restart'])
+        if state['last_id']:
+            self.stdout.write(f"Resuming after conversation {state['last_id']} "
+                              f"({state['processed']} already processed)")
+
+        remaining = queryset.filter(id__gt=state['last_id']).count()
+        self.stdout.write(f"{remaining} conversation(s) to re-analyze")
+        executor = ProcessPoolExecutor(options['workers']) if options['workers'] > 1 else None
+        map_fn = executor.map if executor else map
+        chunk_size, rate = options['chunk_size'], options['rate']
+        done = failed = 0
+        started = time.monotonic()
+        try:
+            while True:
+                ids = list(queryset.filter(id__gt=state['last_id'])
+                           .order_by('id').values_list('id', flat=True)[:chunk_size])
+                if not ids:
+                    break
+                results = analyze_conversations(ids, map_fn=map_fn)
+                failed += len(results['failed'])
+                for failure in results['failed']:
+                    self.stderr.write(f"Conversation {failure['id']} failed: {failure['error']}")
+                done += len(ids)
+                state['last_id'] = ids[-1]
+                state['processed'] += len(ids)
+                self._save_checkpoint(checkpoint_path, state)
+                instrumentation.flush_after_work()
+
+                elapsed = time.monotonic() - started
+                if rate and done / rate > elapsed:
+                    time.sleep(done / rate - elapsed)
+                    elapsed = time.monotonic() - started
+                throughput = done / elapsed if elapsed else 0.0
+                eta = (remaining - done) / throughput if throughput else 0.0
+                self.stdout.write(f"{done}/{remaining} re-analyzed ({throughput:.1f}/s, "
+                                  f"ETA {_format_duration(max(eta, 0))})")
+        finally:
+            if executor:
+                executor.shutdown()
+            connections.close_all()
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Re-analyzed {done - failed} conversation(s), {failed} failed "
+                                f"in {_format_duration(time.monotonic() - started)}"))
+
+    def _build_queryset(self, filters):
+        queryset = Conversation.objects.exclude(messages__isnull=True, archived=False)
+        if not filters['include_pending']:
+            queryset = queryset.filter(analysis__isnull=False)
+        if filters['since']:
+            queryset = queryset.filter(created_at__gte=_parse_date(filters['since']))
+        if filters['until']:
+            queryset = queryset.filter(created_at__lt=_parse_date(filters['until']))
+        if filters['analyzer_version'] is not None:
+            queryset = queryset.filter(analysis__analyzer_version=filters['analyzer_version'])
+        if filters['stale']:
+            queryset = queryset.filter(analysis__analyzer_version__lt=ANALYZER_VERSION)
+        return queryset
+
+    def _load_checkpoint(self, path, filters, restart):
+        if restart or not os.path.exists(path):
+            return {'last_id': 0, 'processed': 0, 'filters': filters}
+        with open(path) as fh:
+            state = json.load(fh)
+        if state.get('filters') != filters:
+            raise CommandError(f"Checkpoint {path} was written with different filters "
+                               f"({state.get('filters')}); use --restart to discard it")
+        return state
+
+    def _save_checkpoint(self, path, state):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, path)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.models import ConversationAnalysis
+from analytics.services import get_score_weights, recompute_overall_scores
+
+
+class Command(BaseCommand):
+    help = ('Recompute overall_score for stored analyses from their component '
+            'columns with a single UPDATE, using the active score weights.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true',
+                            help='Only rows scored with a different weights version')
+
+    def handle(self, *args, **options):
+        weights = get_score_weights()
+        queryset = ConversationAnalysis.objects.all()
+        if options['stale']:
+            queryset = queryset.exclude(score_weights_version=weights['version'])
+        started = time.monotonic()
+        updated = recompute_overall_scores(queryset, weights)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed overall_score for {updated} analyses with weights "
+            f"version {weights['version']} in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,188 @@
+import random
+import re
+import threading
+from collections import Counter, deque
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import routers
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def fingerprint(sql):
+    """Normalize SQL so repeats of the same statement with different values match."""
+    sql = _LITERALS.sub('?', sql)
+    return _IN_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    """Collects the queries run on any connection during one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.fingerprints = Counter()
+        self.render_start = None
+        # Only DRF and template responses render after the view returns;
+        # JsonResponse/HttpResponse serialize inside it and stay None.
+        self.render_seconds = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=5):
+        return [{'sql': sql, 'count': count}
+                for sql, count in self.fingerprints.most_common(limit) if count > 1]
+
+
+class ProfileStore:
+    """Rolling per-endpoint timings, bounded to ``window`` samples each."""
+
+    def __init__(self, window=100):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, total_seconds, profile):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'samples': deque(maxlen=self.window), 'requests': 0, 'duplicates': [],
+                }
+            stats['samples'].append((total_seconds, profile.sql_seconds, profile.queries, profile.render_seconds))
+            stats['requests'] += 1
+            duplicates = profile.duplicates()
+            if duplicates:
+                stats['duplicates'] = duplicates
+
+    def top(self, n=20):
+        """Return the ``n`` endpoints with the highest mean latency in the window."""
+        with self._lock:
+            snapshot = [(endpoint, list(stats['samples']), stats['requests'], stats['duplicates'])
+                        for endpoint, stats in self._endpoints.items()]
+        report = []
+        for endpoint, samples, requests, duplicates in snapshot:
+            totals = sorted(s[0] for s in samples)
+            count = len(samples)
+            rendered = [s[3] for s in samples if s[3] is not None]
+            report.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'window': count,
+                'mean_ms': sum(totals) / count * 1000,
+                'p95_ms': totals[min(count - 1, int(count * 0.95))] * 1000,
+                'max_ms': totals[-1] * 1000,
+                'mean_queries': sum(s[2] for s in samples) / count,
+                'mean_sql_ms': sum(s[1] for s in samples) / count * 1000,
+                'mean_serialize_ms': sum(rendered) / len(rendered) * 1000 if rendered else None,
+                'duplicate_queries': duplicates,
+            })
+        report.sort(key=lambda row: row['mean_ms'], reverse=True)
+        return report[:n]
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+PROFILE_STORE = ProfileStore(window=getattr(settings, 'ANALYTICS_PROFILING_WINDOW', 100))
+
+
+class QueryProfilingMiddleware:
+    """Opt-in per-request query and latency profiling.
+
+    For a sampled fraction of requests (``ANALYTICS_PROFILING_SAMPLE_RATE``)
+    this counts queries and SQL time across all connections, fingerprints
+    repeated statements to expose N+1 patterns, times response rendering
+    and adds a ``Server-Timing`` header. Rendering is only measurable for
+    DRF and template responses, which render after the view returns;
+    ``JsonResponse`` and plain responses serialize inside the view, so
+    their time counts towards the total and ``mean_serialize_ms`` is
+    ``None`` for such endpoints. Results feed ``PROFILE_STORE``, reported by the staff-only
+    profiling view. Unused unless ``ANALYTICS_PROFILING_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ANALYTICS_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'ANALYTICS_PROFILING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = request._query_profile = RequestProfile()
+        start = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        total = perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        # Key by route, never by raw path or method: 404s from scanners
+        # would otherwise add a store entry per URL.
+        method = request.method if request.method in HTTP_METHODS else 'OTHER'
+        endpoint = f"{method} {match.view_name if match and match.view_name else '<unresolved>'}"
+        PROFILE_STORE.record(endpoint, total, profile)
+        timings = [f'db;dur={profile.sql_seconds * 1000:.2f};desc="{profile.queries} queries"']
+        if profile.render_seconds is not None:
+            timings.append(f'serialize;dur={profile.render_seconds * 1000:.2f}')
+        timings.append(f'total;dur={total * 1000:.2f}')
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ', '.join(([existing] if existing else []) + timings)
+        return response
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, '_query_profile', None)
+        if profile is not None:
+            profile.render_start = perf_counter()
+
+            def finished(rendered):
+                profile.render_seconds = perf_counter() - profile.render_start
+            response.add_post_render_callback(finished)
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes for clients of a replica-backed deployment.
+
+    Each request starts unpinned unless it carries the pin cookie. If the
+    request writes (see :class:`~analytics.routers.ReplicaRouter`), the
+    response sets a cookie that pins that client's reads to ``default`` for
+    ``ANALYTICS_REPLICA_PIN_SECONDS``, long enough for the replica to catch
+    up. Unused when no replica is configured.
+    """
+
+    cookie_name = 'analytics_primary_pin'
+
+    def __init__(self, get_response):
+        if routers.replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'ANALYTICS_REPLICA_PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        tokens = routers.begin_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if routers.has_written():
+                response.set_cookie(self.cookie_name, '1', max_age=self.pin_seconds,
+                                    httponly=True, samesite='Lax')
+        finally:
+            routers.end_request(tokens)
+        return response
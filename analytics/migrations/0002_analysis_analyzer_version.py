@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationanalysis",
+            name="analyzer_version",
+            field=models.PositiveIntegerField(db_index=True, default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_analysis_analyzer_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationanalysis",
+            name="score_weights_version",
+            field=models.PositiveIntegerField(db_index=True, default=1),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE analytics_message_fts USING fts5(
+        text, content='analytics_message', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER analytics_message_fts_ai AFTER INSERT ON analytics_message BEGIN
+        INSERT INTO analytics_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER analytics_message_fts_ad AFTER DELETE ON analytics_message BEGIN
+        INSERT INTO analytics_message_fts(analytics_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER analytics_message_fts_au AFTER UPDATE OF text ON analytics_message BEGIN
+        INSERT INTO analytics_message_fts(analytics_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO analytics_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO analytics_message_fts(analytics_message_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS analytics_message_fts_au",
+    "DROP TRIGGER IF EXISTS analytics_message_fts_ad",
+    "DROP TRIGGER IF EXISTS analytics_message_fts_ai",
+    "DROP TABLE IF EXISTS analytics_message_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX analytics_message_text_fts ON analytics_message USING GIN (to_tsvector('english', text))",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS analytics_message_text_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        statements = statements_by_vendor.get(connection.vendor, [])
+        if connection.vendor == "sqlite" and statements is SQLITE_FORWARD:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+                if not cursor.fetchone()[0]:
+                    # Search falls back to icontains without FTS5.
+                    return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_analysis_score_weights_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}),
+            _run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRESQL_REVERSE}),
+        ),
+    ]
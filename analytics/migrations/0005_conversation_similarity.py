@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_message_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationanalysis",
+            name="minhash",
+            field=models.BinaryField(blank=True, help_text="Packed MinHash signature of the transcript's content words", null=True),
+        ),
+        migrations.CreateModel(
+            name="ConversationSimilarityBand",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("band", models.PositiveSmallIntegerField()),
+                ("bucket", models.BigIntegerField()),
+                ("conversation", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="similarity_bands", to="analytics.conversation")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["band", "bucket"], name="analytics_c_band_275133_idx")],
+                "unique_together": {("conversation", "band")},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0005_conversation_similarity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTranscript",
+            fields=[
+                ("conversation", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="archive", serialize=False, to="analytics.conversation")),
+                ("codec", models.CharField(choices=[("zlib", "zlib"), ("zstd", "zstd")], default="zlib", max_length=10)),
+                ("data", models.BinaryField()),
+                ("message_count", models.PositiveIntegerField()),
+                ("user_message_count", models.PositiveIntegerField()),
+                ("ai_message_count", models.PositiveIntegerField()),
+                ("raw_size", models.PositiveIntegerField(help_text="Uncompressed size in bytes")),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="archived",
+            field=models.BooleanField(default=False, help_text="Messages live compressed in ArchivedTranscript instead of the message table"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0007_analysis_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="analysis_due_at",
+            field=models.DateTimeField(blank=True, db_index=True, help_text="When the debounced scheduler will analyze this conversation", null=True),
+        ),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+
+from analytics import archive
+
+# Archived messages leave the message table (and its index), so their text is
+# indexed separately when a conversation is archived; see analytics.search.
+# SQLite keeps a contentless FTS5 index whose rowids pack the conversation id
+# with the message's position in the archive; PostgreSQL keeps the tsvector
+# alone. Neither stores the text itself again.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE analytics_archived_message_fts USING fts5(
+        text, content='', tokenize='porter unicode61'
+    )
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS analytics_archived_message_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE analytics_archived_message_fts (
+        conversation_id bigint NOT NULL REFERENCES analytics_conversation (id)
+            ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        position integer NOT NULL,
+        document tsvector NOT NULL,
+        PRIMARY KEY (conversation_id, position)
+    )
+    """,
+    "CREATE INDEX analytics_archived_message_fts_document ON analytics_archived_message_fts USING GIN (document)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TABLE IF EXISTS analytics_archived_message_fts",
+]
+
+# Must match analytics.search.ARCHIVE_ROWID_SHIFT
+ARCHIVE_ROWID_SHIFT = 32
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        statements = statements_by_vendor.get(connection.vendor, [])
+        if connection.vendor == "sqlite" and statements is SQLITE_FORWARD:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+                if not cursor.fetchone()[0]:
+                    # Search falls back to scanning archives without FTS5.
+                    return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def index_existing_archives(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        if "analytics_archived_message_fts" not in connection.introspection.table_names():
+            return
+        sql = "INSERT INTO analytics_archived_message_fts(rowid, text) VALUES (%s, %s)"
+    elif connection.vendor == "postgresql":
+        sql = ("INSERT INTO analytics_archived_message_fts(conversation_id, position, document) "
+               "VALUES (%s, %s, to_tsvector('english', %s))")
+    else:
+        return
+    ArchivedTranscript = apps.get_model("analytics", "ArchivedTranscript")
+    with connection.cursor() as cursor:
+        for conversation_id, codec, data in ArchivedTranscript.objects.values_list("conversation_id", "codec", "data").iterator():
+            texts = [m.text for m in archive.decode(archive.decompress(bytes(data), codec))]
+            if connection.vendor == "sqlite":
+                params = [((conversation_id << ARCHIVE_ROWID_SHIFT) | position, text) for position, text in enumerate(texts)]
+            else:
+                params = [(conversation_id, position, text) for position, text in enumerate(texts)]
+            cursor.executemany(sql, params)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0010_analysis_job_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}),
+            _run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRESQL_REVERSE}),
+        ),
+        migrations.RunPython(index_existing_archives, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0011_archived_message_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MetricTotal",
+            fields=[
+                ("name", models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ("data", models.JSONField(default=list)),
+            ],
+        ),
+    ]
@@ -15,6 +15,16 @@ class Conversation(models.Model):
         ],
         default='pending'
     )
+    archived = models.BooleanField(
+        default=False,
+        help_text="Messages live compressed in ArchivedTranscript instead of the message table"
+    )
+    analysis_due_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When the debounced scheduler will analyze this conversation"
+    )
     
     class Meta:
         ordering = ['-created_at']
@@ -25,15 +35,28 @@ class Conversation(models.Model):
     
     @property
     def message_count(self):
+        if self.archived:
+            return self.archive.message_count
         return self.messages.count()
     
     @property
     def user_message_count(self):
+        if self.archived:
+            return self.archive.user_message_count
         return self.messages.filter(sender='user').count()
     
     @property
     def ai_message_count(self):
+        if self.archived:
+            return self.archive.ai_message_count
         return self.messages.filter(sender='ai').count()
+    
+    @property
+    def transcript(self):
+        """Messages in sequence order, decompressed from the archive when archived."""
+        if self.archived:
+            return self.archive.get_messages()
+        return self.messages.all()
 
 class Message(models.Model):
     conversation = models.ForeignKey(
@@ -56,6 +79,12 @@ class Message(models.Model):
         return f"{self.sender}: {self.text[:50]}..."
     
     def save(self, *args, **kwargs):
+        if self._state.adding and self.conversation.archived:
+            # New turns go to the live table; restore the archived ones first
+            # so sequence numbers and analysis see the whole transcript.
+            from .services import rehydrate_conversations
+            rehydrate_conversations([self.conversation_id])
+            self.conversation.archived = False
         if not self.sequence_number:
             last_msg = Message.objects.filter(
                 conversation=self.conversation
@@ -85,6 +114,10 @@ class ConversationAnalysis(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     analysis_notes = models.TextField(blank=True)
+    analyzer_version = models.PositiveIntegerField(default=1, db_index=True)
+    score_weights_version = models.PositiveIntegerField(default=1, db_index=True)
+    minhash = models.BinaryField(null=True, blank=True, editable=False,
+                                 help_text="Packed MinHash signature of the transcript's content words")
     
     class Meta:
         verbose_name_plural = 'Conversation Analyses'
@@ -99,3 +132,118 @@ class ConversationAnalysis(models.Model):
     @property
     def needs_attention(self):
         return self.overall_score < 5.0 or self.escalation_needed
+
+class ConversationSimilarityBand(models.Model):
+    """One LSH band bucket of a conversation's MinHash signature."""
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='similarity_bands'
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        unique_together = [('conversation', 'band')]
+        indexes = [models.Index(fields=['band', 'bucket'])]
+    
+    def __str__(self):
+        return f"Conversation {self.conversation_id} band {self.band}"
+
+class ArchivedTranscript(models.Model):
+    """Compressed cold-storage copy of an archived conversation's messages."""
+    conversation = models.OneToOneField(
+        Conversation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='archive'
+    )
+    codec = models.CharField(max_length=10, choices=[('zlib', 'zlib'), ('zstd', 'zstd')], default='zlib')
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField()
+    user_message_count = models.PositiveIntegerField()
+    ai_message_count = models.PositiveIntegerField()
+    raw_size = models.PositiveIntegerField(help_text="Uncompressed size in bytes")
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Archive of conversation {self.conversation_id} ({self.message_count} messages)"
+    
+    def get_messages(self):
+        """Return unsaved ``Message`` instances rebuilt from the archive."""
+        from .archive import decode, decompress
+        if not hasattr(self, '_messages'):
+            conversation = self.conversation
+            self._messages = [
+                Message(id=m.id, conversation=conversation, sender=m.sender, text=m.text,
+                        timestamp=m.timestamp, sequence_number=m.sequence_number)
+                for m in decode(decompress(bytes(self.data), self.codec))
+            ]
+        return self._messages
+
+class AnalysisJob(models.Model):
+    """Background analysis of a set of conversations, processed in chunks."""
+    conversation_ids = models.JSONField(help_text="Conversations to analyze, in processing order")
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('queued', 'Queued'),
+            ('running', 'Running'),
+            ('completed', 'Completed'),
+            ('failed', 'Failed')
+        ],
+        default='queued'
+    )
+    chunk_size = models.PositiveIntegerField(default=200)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='analysis_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every finished chunk; jobs idle too long are failed as stale.
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Analysis job {self.id} ({self.processed}/{self.total})"
+    
+    @property
+    def progress(self):
+        return round(self.processed / self.total * 100, 1) if self.total else 100.0
+
+
+class AnalysisEvent(models.Model):
+    """Completed analysis, kept in a bounded log for stream resume (``Last-Event-ID``)."""
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='analysis_events'
+    )
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Analysis event {self.id} for conversation {self.conversation_id}"
+
+
+class MetricTotal(models.Model):
+    """Prometheus metric values summed over every process; see analytics.instrumentation."""
+    name = models.CharField(max_length=200, primary_key=True)
+    # [[label_pairs, value], ...] in the metric's own value shape
+    data = models.JSONField(default=list)
+    
+    def __str__(self):
+        return self.name
@@ -0,0 +1,123 @@
+"""Score JSONL transcript files without Django or a database.
+
+Each input line is one transcript in the same shape the REST API accepts::
+
+    {"id": "abc", "title": "...", "messages": [
+        {"sender": "user", "message": "Hi", "timestamp": "2025-01-01T10:00:00Z"},
+        {"sender": "ai", "message": "Hello!"}]}
+
+``text`` is accepted as an alias of ``message`` and ``timestamp`` is
+optional. One NDJSON result is written per input line, in input order.
+Run directly with ``python -m analytics.offline`` or via
+``manage.py analyze_file``.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from multiprocessing import Pool
+
+from .scoring import MetricAccumulator
+
+
+def _parse_timestamp(value):
+    """Aware UTC datetime from epoch seconds or ISO 8601; naive strings are taken as UTC."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def score_transcript(transcript):
+    """Return the metrics dict for one decoded transcript object."""
+    messages = transcript.get('messages')
+    if not isinstance(messages, list) or not messages:
+        raise ValueError("'messages' must be a non-empty list")
+    accumulator = MetricAccumulator()
+    for idx, msg in enumerate(messages):
+        text = msg.get('message', msg.get('text'))
+        if 'sender' not in msg or not isinstance(text, str):
+            raise ValueError(f"Message at index {idx} must contain 'sender' and 'message'")
+        accumulator.add(msg['sender'], text, _parse_timestamp(msg.get('timestamp')))
+    return accumulator.score()
+
+
+def score_line(line):
+    """Score one JSONL line, returning a result dict (never raises)."""
+    transcript_id = None
+    try:
+        transcript = json.loads(line)
+        transcript_id = transcript.get('id')
+        return {'id': transcript_id, **score_transcript(transcript)}
+    except (ValueError, TypeError, AttributeError, OverflowError, OSError) as e:
+        # OverflowError/OSError: epoch timestamps outside the platform's range
+        return {'id': transcript_id, 'error': str(e)}
+
+
+def _iter_lines(paths):
+    for path in paths:
+        handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            for line in handle:
+                if line.strip():
+                    yield line
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+
+def analyze_files(paths, out, workers=None, chunksize=64):
+    """Score every transcript in ``paths`` and write NDJSON to ``out``.
+
+    Lines are fanned out over ``workers`` processes (default: all cores).
+    Returns ``(scored, failed)`` counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    scored = failed = 0
+    lines = _iter_lines(paths)
+    if workers == 1:
+        results = map(score_line, lines)
+        pool = None
+    else:
+        pool = Pool(workers)
+        results = pool.imap(score_line, lines, chunksize=chunksize)
+    try:
+        for result in results:
+            if 'error' in result:
+                failed += 1
+            else:
+                scored += 1
+            out.write(json.dumps(result) + '\n')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return scored, failed
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description='Score JSONL transcripts offline.')
+    parser.add_argument('paths', nargs='+', help="JSONL transcript files ('-' for stdin)")
+    parser.add_argument('-o', '--output', help='NDJSON output file (default: stdout)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=64, help='Transcripts handed to a worker at a time')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        scored, failed = analyze_files(args.paths, out, workers=args.workers, chunksize=args.chunksize)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Scored {scored} transcript(s), {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` backed by orjson for the default compact UTF-8 output.
+
+    Output matches ``JSONRenderer`` except that floats below 1e-4 or from
+    1e16 up are written in orjson's notation (``1e-6`` rather than
+    ``1e-06``), which parses to the same values. Indented output,
+    non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings, types orjson
+    cannot encode, or a missing orjson all fall back to ``JSONRenderer``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safe escaping of U+2028/U+2029 as JSONRenderer.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,77 @@
+"""Route opted-in, read-only analytic queries to a replica database.
+
+Reads go to ``settings.ANALYTICS_REPLICA_DATABASE`` only inside
+:func:`use_replica` (a decorator or context manager applied to the
+dashboard, report and listing views), so everything else keeps reading
+from ``default``. Writes always go to ``default``. Once a request writes,
+its remaining reads are pinned to ``default``, and
+:class:`~analytics.middleware.ReplicaPinningMiddleware` carries that pin
+over to the client's next requests so they read their own writes despite
+replication lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_replica = ContextVar('analytics_use_replica', default=False)
+_pinned = ContextVar('analytics_pinned_to_primary', default=False)
+_wrote = ContextVar('analytics_wrote', default=False)
+
+
+def replica_alias():
+    """The configured replica alias, or ``None`` when there is no replica."""
+    alias = getattr(settings, 'ANALYTICS_REPLICA_DATABASE', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def begin_request(pinned=False):
+    """Start a fresh routing scope; returns tokens for :func:`end_request`."""
+    return _pinned.set(pinned), _wrote.set(False)
+
+
+def end_request(tokens):
+    _pinned.reset(tokens[0])
+    _wrote.reset(tokens[1])
+
+
+def has_written():
+    """Whether the current scope has routed a write to ``default``."""
+    return _wrote.get()
+
+
+@contextmanager
+def use_replica():
+    """Allow reads inside the block to use the replica.
+
+    Also usable as a view decorator: ``@use_replica()``.
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = replica_alias()
+        if replica is None or not _use_replica.get() or _pinned.get() or _wrote.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads inside a write transaction must see its uncommitted rows.
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        # Explicitly default, so saving an instance read from the replica
+        # does not follow its _state.db there.
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,124 @@
+"""Debounced, rate-limited analysis of conversations as they change.
+
+Creating a conversation or appending a message calls
+:func:`schedule_analysis`, which marks it pending and pushes its
+``analysis_due_at`` to ``ANALYTICS_ANALYSIS_DEBOUNCE_SECONDS`` from now, so a
+burst of messages leads to one analysis once the conversation goes quiet.
+The ``analyze_due_conversations`` task drains due conversations through the
+bulk path, at most ``ANALYTICS_SCHEDULER_BATCH_SIZE`` every
+``ANALYTICS_SCHEDULER_INTERVAL`` seconds, and re-enqueues itself while work
+remains. The daily job only sweeps up whatever this misses.
+
+At most one drain chain runs at a time. Arming a chain stores a fresh
+token under ``DRAIN_LOCK_KEY`` and passes it to the task; a drain whose
+token is no longer the stored one exits without work, and only the
+current holder re-arms. The lock must live in a cache shared by every
+process that schedules or runs drains (the settings use Redis when
+``ANALYTICS_TASK_QUEUE = 'celery'``).
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from . import dispatch
+from .models import Conversation
+from .services import analyze_conversations
+
+DRAIN_LOCK_KEY = 'analytics:analyze-due-scheduled'
+
+
+def is_enabled():
+    return getattr(settings, 'ANALYTICS_AUTO_ANALYZE', False)
+
+
+def quiet_seconds():
+    """How far past a change its conversation's ``analysis_due_at`` is set."""
+    return 0 if dispatch.runs_inline() else getattr(settings, 'ANALYTICS_ANALYSIS_DEBOUNCE_SECONDS', 300)
+
+
+def schedule_analysis(conversation_ids):
+    """Debounce analysis of ``conversation_ids``; a no-op when auto-analysis is off."""
+    if not is_enabled():
+        return
+    quiet = quiet_seconds()
+    Conversation.objects.filter(id__in=list(conversation_ids)).update(
+        status='pending', analysis_due_at=timezone.now() + timedelta(seconds=quiet)
+    )
+    schedule_drain(quiet)
+
+
+def _lock_timeout(countdown):
+    # Outlives the wait plus a slow run; if the chain's task is lost the
+    # lock expires and the next schedule_drain() arms a new chain.
+    return int(countdown) + max(60, 6 * getattr(settings, 'ANALYTICS_SCHEDULER_INTERVAL', 10))
+
+
+def _arm(countdown, replace=False):
+    """Enqueue a drain holding a new token; unless ``replace``, only if no chain holds the lock."""
+    token = uuid.uuid4().hex
+    if replace:
+        cache.set(DRAIN_LOCK_KEY, token, timeout=_lock_timeout(countdown))
+    elif not cache.add(DRAIN_LOCK_KEY, token, timeout=_lock_timeout(countdown)):
+        return False
+    from .tasks import analyze_due_conversations
+    dispatch.enqueue(analyze_due_conversations, token, countdown=countdown)
+    return True
+
+
+def schedule_drain(countdown):
+    """Enqueue the drain task unless a drain chain is already scheduled or running.
+
+    Bursts of updates therefore enqueue a single task; a drain that finds
+    nothing due yet chains itself to the earliest deadline. Returns whether
+    a drain was enqueued.
+    """
+    return _arm(countdown)
+
+
+def ensure_drain():
+    """Arm a drain for the earliest due conversation if no chain is scheduled.
+
+    Run periodically by Celery beat as a safety net; it never starts a
+    second chain next to a live one.
+    """
+    next_due = Conversation.objects.aggregate(next=Min('analysis_due_at'))['next']
+    if next_due is None:
+        return False
+    return schedule_drain(max((next_due - timezone.now()).total_seconds(), 0))
+
+
+def analyze_due(batch_size=None, token=None):
+    """Analyze up to ``batch_size`` conversations whose quiet period is over.
+
+    ``token`` identifies the drain chain calling this; a stale chain (its
+    token replaced after the lock expired) returns without work. Returns
+    the :func:`~analytics.services.analyze_conversations` results and
+    schedules the next drain if more work is due now or later.
+    """
+    empty = {'success': [], 'failed': [], 'skipped': []}
+    if token is not None and cache.get(DRAIN_LOCK_KEY) != token:
+        return empty
+    batch_size = batch_size or getattr(settings, 'ANALYTICS_SCHEDULER_BATCH_SIZE', 100)
+    now = timezone.now()
+    ids = list(Conversation.objects.filter(analysis_due_at__lte=now)
+               .order_by('analysis_due_at').values_list('id', flat=True)[:batch_size])
+    # Conversations updated since the select keep their new deadline and
+    # are analyzed again after it.
+    Conversation.objects.filter(id__in=ids, analysis_due_at__lte=now).update(analysis_due_at=None)
+    results = analyze_conversations(ids) if ids else empty
+    if results['failed']:
+        Conversation.objects.filter(id__in=[f['id'] for f in results['failed']]).update(status='error')
+
+    next_due = Conversation.objects.aggregate(next=Min('analysis_due_at'))['next']
+    # Inline (eager) tasks ignore countdowns, so only chain when progress was made.
+    if next_due is not None and (ids or not dispatch.runs_inline()):
+        interval = getattr(settings, 'ANALYTICS_SCHEDULER_INTERVAL', 10)
+        countdown = max((next_due - timezone.now()).total_seconds(), interval if ids else 0)
+        _arm(countdown, replace=token is not None)
+    elif token is not None and cache.get(DRAIN_LOCK_KEY) == token:
+        cache.delete(DRAIN_LOCK_KEY)
+    return results
@@ -0,0 +1,483 @@
+"""Conversation quality metrics over plain Python data.
+
+Nothing here imports Django, so the scoring logic can run in offline tools,
+worker processes and notebooks without configuring settings or a database.
+``analytics.services`` wraps these classes with ORM loading and persistence.
+"""
+import re
+from collections import namedtuple
+from time import perf_counter
+
+from .similarity import MinHasher, minhash, pack
+
+# The only message fields the metrics read; loading these instead of model
+# instances skips per-row Model.__init__ and keeps each row to three slots.
+MESSAGE_ROW_FIELDS = ('sender', 'text', 'timestamp')
+MessageRow = namedtuple('MessageRow', MESSAGE_ROW_FIELDS)
+
+# Content words compared by relevance scoring and hashed for similarity
+WORD_PATTERN = re.compile(r'\b\w{4,}\b')
+
+# Recently hashed words MetricAccumulator skips re-hashing. Re-hashing a word
+# never changes a MinHash, so this only trades bounded memory for speed.
+SIGNATURE_WORD_CACHE = 2048
+
+# Bump whenever a metric or lexicon changes so stored analyses can be found
+# and re-scored (see ``manage.py reanalyze --stale``).
+ANALYZER_VERSION = 2
+
+# Weights behind ``overall_score``. Stored analyses record the ``version``
+# they were scored with, so any change here must bump it.
+SCORE_WEIGHTS = {
+    'version': 1,
+    'components': {
+        'clarity_score':0.15,
+        'relevance_score':0.15,
+        'accuracy_score':0.15,
+        'completeness_score':0.15,
+        'empathy_score':0.10,
+        'coherence_score':0.10,
+        'professionalism_score':0.10,
+    },
+    'resolution_bonus': 0.05,
+    'escalation_penalty': 0.05,
+    'fallback_penalty': 0.05,
+    'fallback_threshold': 2,
+}
+
+def merge_weights(overrides):
+    """Return ``SCORE_WEIGHTS`` updated with a (possibly partial) ``overrides`` dict."""
+    overrides = dict(overrides or {})
+    components = {**SCORE_WEIGHTS['components'], **overrides.pop('components', {})}
+    unknown = set(overrides) - set(SCORE_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown score weight keys: {', '.join(sorted(unknown))}")
+    return {**SCORE_WEIGHTS, **overrides, 'components': components}
+
+def overall_score(m, weights=SCORE_WEIGHTS):
+    """Combine component metrics into the 0-10 ``overall_score``."""
+    components = weights['components']
+    total = sum(m[k]*components[k] for k in components)
+    if m['resolution']:
+        total += weights['resolution_bonus']
+    if m['escalation_needed']:
+        total -= weights['escalation_penalty']
+    if m['fallback_count']>weights['fallback_threshold']:
+        total -= weights['fallback_penalty']
+    return round(min(total * 10, 10.0), 2)
+
+class TranscriptScorer:
+    """Metrics for one transcript held in memory as a list of rows."""
+    FALLBACK_PHRASES = [
+        "i don't know", "i'm not sure", "i can't help", "unable to assist",
+        "don't have information", "not certain", "apologize"
+    ]
+    NEGATIVE_WORDS = ["bad","terrible","worst","horrible","awful","disappointed","frustrated","angry","upset","annoyed","useless","waste"]
+    POSITIVE_WORDS = ["good","great","excellent","amazing","perfect","wonderful","thanks","thank you","helpful","appreciate","love","best"]
+    EMPATHY_INDICATORS = ["understand","sorry","apologize","appreciate","frustrating","help you","here for you","i see","that must"]
+    HEDGE_WORDS = ['maybe','might','possibly','perhaps']
+    CONFIDENT_WORDS = ['definitely','certainly','absolutely']
+    RESOLUTION_INDICATORS = ['thank','thanks','solved','fixed','resolved','perfect','worked','got it','understood']
+    ESCALATION_WORDS = ['manager','supervisor','human','agent','speak to']
+    INFORMAL_WORDS = ['gonna','wanna','yeah','nope','dunno']
+    
+    def __init__(self, rows, weights=None):
+        """``rows`` is a sequence of objects with ``sender``, ``text`` and
+        ``timestamp`` attributes (``MessageRow`` tuples, ``Message`` instances)
+        in sequence order. ``weights`` defaults to ``SCORE_WEIGHTS``.
+        """
+        self.weights = weights or SCORE_WEIGHTS
+        self.messages = rows if isinstance(rows, list) else list(rows)
+        self.user_messages = [m for m in self.messages if m.sender == 'user']
+        self.ai_messages = [m for m in self.messages if m.sender == 'ai']
+        self._word_sets = None
+    
+    def word_sets(self):
+        """Content-word set of each message, computed once and shared."""
+        if self._word_sets is None:
+            self._word_sets = [set(WORD_PATTERN.findall(m.text.lower())) for m in self.messages]
+        return self._word_sets
+    
+    def signature(self):
+        """MinHash signature of the transcript's content words (``None`` if it has none)."""
+        return minhash(set().union(*self.word_sets()))
+    
+    @classmethod
+    def from_columns(cls, senders, texts, timestamps, **kwargs):
+        """Build a scorer from parallel ``senders``/``texts``/``timestamps`` arrays."""
+        return cls(rows=list(map(MessageRow, senders, texts, timestamps)), **kwargs)
+    
+    def score(self, timings=None):
+        """Return the metrics plus ``overall_score``."""
+        metrics = self.compute_metrics(timings)
+        metrics['overall_score'] = self._calc_overall_score(metrics)
+        return metrics
+    
+    # (result key, method) pairs in the order ``compute_metrics`` evaluates them
+    METRICS = [
+        ('clarity_score', '_calc_clarity'),
+        ('relevance_score', '_calc_relevance'),
+        ('accuracy_score', '_calc_accuracy'),
+        ('completeness_score', '_calc_completeness'),
+        ('sentiment', '_determine_sentiment'),
+        ('empathy_score', '_calc_empathy'),
+        ('avg_response_time', '_calc_avg_response_time'),
+        ('resolution', '_check_resolution'),
+        ('escalation_needed', '_check_escalation'),
+        ('fallback_count', '_count_fallbacks'),
+        ('coherence_score', '_calc_coherence'),
+        ('professionalism_score', '_calc_professionalism'),
+    ]
+    
+    def compute_metrics(self, timings=None):
+        """Return the metric dict; if ``timings`` is a dict, also fill it with
+        the seconds spent on each metric."""
+        if timings is None:
+            return {key: getattr(self, method)() for key, method in self.METRICS}
+        metrics = {}
+        for key, method in self.METRICS:
+            start = perf_counter()
+            metrics[key] = getattr(self, method)()
+            timings[key] = perf_counter() - start
+        return metrics
+    
+    def _calc_clarity(self):
+        if not self.ai_messages:
+            return 0.5
+        total_score = 0.0
+        for msg in self.ai_messages:
+            text = msg.text.lower()
+            word_count = len(text.split())
+            score = 0.8
+            if word_count < 5:
+                score -= 0.05
+            elif word_count > 150:
+                score -= 0.05
+            if '?' in text:
+                score += 0.02
+            if text and text[0].isupper():
+                score += 0.01
+            total_score += max(0.0, min(1.0, score))
+        return max(0.0, min(1.0, total_score / len(self.ai_messages)))
+    
+    def _calc_relevance(self):
+        if len(self.messages) < 2:
+            return 0.7
+        relevance_sum = 0
+        pairs = 0
+        word_sets = self.word_sets()
+        for i in range(len(self.messages)-1):
+            if self.messages[i].sender == 'user' and self.messages[i+1].sender == 'ai':
+                user_words = word_sets[i]
+                ai_words = word_sets[i+1]
+                if user_words:
+                    overlap = len(user_words & ai_words)/len(user_words)
+                    relevance_sum += min(overlap*2,1.0)
+                    pairs +=1
+        return relevance_sum/pairs if pairs>0 else 0.7
+    
+    def _calc_accuracy(self):
+        score = 0.75
+        for msg in self.ai_messages:
+            text = msg.text.lower()
+            if any(word in text for word in self.HEDGE_WORDS):
+                score -= 0.03
+            if any(word in text for word in self.CONFIDENT_WORDS):
+                score += 0.02
+        return max(0.0, min(1.0, score))
+    
+    def _calc_completeness(self):
+        if not self.user_messages:
+            return 0.5
+        question_count = sum(1 for m in self.user_messages if '?' in m.text)
+        if question_count == 0:
+            return 0.8
+        avg_len = sum(len(m.text.split()) for m in self.ai_messages)/len(self.ai_messages) if self.ai_messages else 0
+        if avg_len < 10:
+            return 0.4
+        elif avg_len < 30:
+            return 0.6
+        else:
+            return 0.85
+    
+    def _determine_sentiment(self):
+        pos = neg = 0
+        for msg in self.user_messages:
+            text = msg.text.lower()
+            pos += sum(1 for w in self.POSITIVE_WORDS if w in text)
+            neg += sum(1 for w in self.NEGATIVE_WORDS if w in text)
+        if pos > neg * 1.5:
+            return 'positive'
+        elif neg > pos * 1.5:
+            return 'negative'
+        elif pos>0 and neg>0:
+            return 'mixed'
+        else:
+            return 'neutral'
+    
+    def _calc_empathy(self):
+        if not self.ai_messages:
+            return 0.5
+        count = 0
+        for msg in self.ai_messages:
+            text = msg.text.lower()
+            count += sum(1 for phrase in self.EMPATHY_INDICATORS if phrase in text)
+        score = min(count/len(self.ai_messages)*0.5,1.0)
+        return max(0.3, score)
+    
+    def _calc_avg_response_time(self):
+        times = []
+        for i in range(len(self.messages)-1):
+            if self.messages[i].sender=='user' and self.messages[i+1].sender=='ai':
+                if self.messages[i].timestamp is None or self.messages[i+1].timestamp is None:
+                    continue
+                diff = (self.messages[i+1].timestamp - self.messages[i].timestamp).total_seconds()
+                times.append(diff)
+        return sum(times)/len(times) if times else 3.5
+    
+    def _check_resolution(self):
+        if not self.user_messages:
+            return False
+        last = self.user_messages[-1].text.lower()
+        return any(ind in last for ind in self.RESOLUTION_INDICATORS)
+    
+    def _check_escalation(self):
+        if not self._check_resolution() and len(self.user_messages)>5:
+            return True
+        if self._determine_sentiment() == 'negative':
+            return True
+        for m in self.user_messages:
+            text = m.text.lower()
+            if any(word in text for word in self.ESCALATION_WORDS):
+                return True
+        return False
+    
+    def _count_fallbacks(self):
+        count = 0
+        for msg in self.ai_messages:
+            text = msg.text.lower()
+            count += sum(1 for phrase in self.FALLBACK_PHRASES if phrase in text)
+        return count
+    
+    def _calc_coherence(self):
+        if len(self.messages)<3:
+            return 0.7
+        proper = 0
+        for i in range(len(self.messages)-1):
+            if self.messages[i].sender != self.messages[i+1].sender:
+                proper +=1
+        return proper/(len(self.messages)-1)
+    
+    def _calc_professionalism(self):
+        if not self.ai_messages:
+            return 0.85
+        score = 0.85
+        for msg in self.ai_messages:
+            text = msg.text or ""
+            if text and text[0].isupper():
+                score += 0.01
+            if text.count('!') > 2 or text.count('?') > 3:
+                score -= 0.05
+            if any(word in text.lower() for word in self.INFORMAL_WORDS):
+                score -= 0.1
+        return max(0.0, min(1.0, score))
+    
+    def _calc_overall_score(self, m):
+        return overall_score(m, self.weights)
+
+
+class MetricAccumulator:
+    """One-pass equivalent of the ``TranscriptScorer`` metrics.
+
+    Messages are fed in sequence order through :meth:`add`; only running
+    totals, the previous message and the running MinHash minima (plus at
+    most ``SIGNATURE_WORD_CACHE`` recently hashed words) are kept, so memory
+    stays bounded however long or varied the conversation. :meth:`metrics`
+    and :meth:`signature` return exactly what ``TranscriptScorer``'s
+    ``compute_metrics`` and ``signature`` would for the same messages.
+    """
+    lexicon = TranscriptScorer
+    
+    def __init__(self):
+        self.message_count = 0
+        self.user_count = 0
+        self.ai_count = 0
+        self.prev_sender = None
+        self.prev_words = None
+        self.prev_timestamp = None
+        self.hasher = MinHasher()
+        self.hashed_words = set()
+        self.sender_changes = 0
+        self.clarity_total = 0.0
+        self.relevance_sum = 0
+        self.relevance_pairs = 0
+        self.accuracy = 0.75
+        self.question_count = 0
+        self.ai_word_count = 0
+        self.positive = 0
+        self.negative = 0
+        self.empathy_count = 0
+        self.response_time_total = 0
+        self.response_pairs = 0
+        self.last_user_text = None
+        self.escalation_word_seen = False
+        self.fallback_count = 0
+        self.professionalism = 0.85
+    
+    def add(self, sender, text, timestamp):
+        lex = self.lexicon
+        lowered = text.lower()
+        words = set(WORD_PATTERN.findall(lowered))
+        new_words = words - self.hashed_words
+        if new_words:
+            if len(self.hashed_words) + len(new_words) > SIGNATURE_WORD_CACHE:
+                self.hashed_words = set()
+            self.hashed_words |= new_words
+            self.hasher.update(new_words)
+        if self.message_count:
+            if sender != self.prev_sender:
+                self.sender_changes += 1
+            if self.prev_sender == 'user' and sender == 'ai':
+                user_words = self.prev_words
+                ai_words = words
+                if user_words:
+                    overlap = len(user_words & ai_words)/len(user_words)
+                    self.relevance_sum += min(overlap*2,1.0)
+                    self.relevance_pairs += 1
+                if timestamp is not None and self.prev_timestamp is not None:
+                    self.response_time_total += (timestamp - self.prev_timestamp).total_seconds()
+                    self.response_pairs += 1
+        if sender == 'user':
+            self.user_count += 1
+            if '?' in text:
+                self.question_count += 1
+            self.positive += sum(1 for w in lex.POSITIVE_WORDS if w in lowered)
+            self.negative += sum(1 for w in lex.NEGATIVE_WORDS if w in lowered)
+            if not self.escalation_word_seen:
+                self.escalation_word_seen = any(word in lowered for word in lex.ESCALATION_WORDS)
+            self.last_user_text = lowered
+        elif sender == 'ai':
+            self.ai_count += 1
+            self._add_ai(text, lowered)
+        self.message_count += 1
+        self.prev_sender = sender
+        self.prev_words = words
+        self.prev_timestamp = timestamp
+    
+    def _add_ai(self, text, lowered):
+        lex = self.lexicon
+        word_count = len(lowered.split())
+        self.ai_word_count += len(text.split())
+        score = 0.8
+        if word_count < 5:
+            score -= 0.05
+        elif word_count > 150:
+            score -= 0.05
+        if '?' in lowered:
+            score += 0.02
+        if lowered and lowered[0].isupper():
+            score += 0.01
+        self.clarity_total += max(0.0, min(1.0, score))
+        if any(word in lowered for word in lex.HEDGE_WORDS):
+            self.accuracy -= 0.03
+        if any(word in lowered for word in lex.CONFIDENT_WORDS):
+            self.accuracy += 0.02
+        self.empathy_count += sum(1 for phrase in lex.EMPATHY_INDICATORS if phrase in lowered)
+        self.fallback_count += sum(1 for phrase in lex.FALLBACK_PHRASES if phrase in lowered)
+        raw = text or ""
+        if raw and raw[0].isupper():
+            self.professionalism += 0.01
+        if raw.count('!') > 2 or raw.count('?') > 3:
+            self.professionalism -= 0.05
+        if any(word in raw.lower() for word in lex.INFORMAL_WORDS):
+            self.professionalism -= 0.1
+    
+    def metrics(self):
+        resolution = self._resolution()
+        sentiment = self._sentiment()
+        return {
+            'clarity_score': self._clarity(),
+            'relevance_score': self.relevance_sum/self.relevance_pairs if self.relevance_pairs>0 else 0.7,
+            'accuracy_score': max(0.0, min(1.0, self.accuracy)),
+            'completeness_score': self._completeness(),
+            'sentiment': sentiment,
+            'empathy_score': self._empathy(),
+            'avg_response_time': self.response_time_total/self.response_pairs if self.response_pairs else 3.5,
+            'resolution': resolution,
+            'escalation_needed': self._escalation(resolution, sentiment),
+            'fallback_count': self.fallback_count,
+            'coherence_score': self.sender_changes/(self.message_count-1) if self.message_count>=3 else 0.7,
+            'professionalism_score': max(0.0, min(1.0, self.professionalism)) if self.ai_count else 0.85,
+        }
+    
+    def _clarity(self):
+        if not self.ai_count:
+            return 0.5
+        return max(0.0, min(1.0, self.clarity_total / self.ai_count))
+    
+    def _completeness(self):
+        if not self.user_count:
+            return 0.5
+        if self.question_count == 0:
+            return 0.8
+        avg_len = self.ai_word_count/self.ai_count if self.ai_count else 0
+        if avg_len < 10:
+            return 0.4
+        elif avg_len < 30:
+            return 0.6
+        else:
+            return 0.85
+    
+    def _sentiment(self):
+        pos, neg = self.positive, self.negative
+        if pos > neg * 1.5:
+            return 'positive'
+        elif neg > pos * 1.5:
+            return 'negative'
+        elif pos>0 and neg>0:
+            return 'mixed'
+        else:
+            return 'neutral'
+    
+    def _empathy(self):
+        if not self.ai_count:
+            return 0.5
+        score = min(self.empathy_count/self.ai_count*0.5,1.0)
+        return max(0.3, score)
+    
+    def _resolution(self):
+        if self.last_user_text is None:
+            return False
+        return any(ind in self.last_user_text for ind in self.lexicon.RESOLUTION_INDICATORS)
+    
+    def _escalation(self, resolution, sentiment):
+        if not resolution and self.user_count>5:
+            return True
+        if sentiment == 'negative':
+            return True
+        return self.escalation_word_seen
+    
+    def signature(self):
+        """MinHash signature of the content words fed so far (``None`` if none)."""
+        return self.hasher.digest()
+    
+    def score(self, weights=None):
+        """Return the metrics plus ``overall_score``."""
+        metrics = self.metrics()
+        metrics['overall_score'] = overall_score(metrics, weights or SCORE_WEIGHTS)
+        return metrics
+
+
+def score_rows(rows, weights=None):
+    """Score one transcript's rows, returning ``(metrics, None)`` or ``(None, error)``.
+
+    ``metrics`` also carries the packed MinHash signature under ``'minhash'``
+    (``None`` for transcripts without content words). Never raises, so it is
+    safe to map over a process pool.
+    """
+    try:
+        scorer = TranscriptScorer(rows, weights)
+        signature = scorer.signature()
+        return {**scorer.score(), 'minhash': pack(signature) if signature else None}, None
+    except Exception as e:
+        return None, str(e)
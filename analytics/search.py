@@ -0,0 +1,201 @@
+"""Full-text search over message text.
+
+SQLite uses the ``analytics_message_fts`` FTS5 table and PostgreSQL a GIN
+index on ``to_tsvector('english', text)``, both created by migration 0004
+and kept in sync by the database itself. Other backends, or SQLite builds
+without FTS5, fall back to ``icontains``.
+
+Archived messages are no longer in the message table, so
+``analytics.services`` indexes their text in ``analytics_archived_message_fts``
+(migration 0011) when archiving and removes it when rehydrating or
+purging. On SQLite that is a contentless FTS5 table whose rowid packs the
+conversation id above ``ARCHIVE_ROWID_SHIFT`` bits with the message's
+position in the archive; on PostgreSQL it holds one tsvector per message.
+Neither stores the text again. Without an index the archives are decoded
+and scanned.
+"""
+import re
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+
+from . import archive
+from .models import ArchivedTranscript, Conversation, Message
+
+FTS_TABLE = 'analytics_message_fts'
+ARCHIVE_FTS_TABLE = 'analytics_archived_message_fts'
+ARCHIVE_ROWID_SHIFT = 32
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_fts_tables = {}
+
+
+def backend(using=DEFAULT_DB_ALIAS):
+    """Return ``'sqlite'``, ``'postgresql'`` or ``None`` (no index available)."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if using not in _fts_tables:
+            _fts_tables[using] = FTS_TABLE in connection.introspection.table_names()
+        return 'sqlite' if _fts_tables[using] else None
+    return None
+
+
+def tokens(term):
+    return _TOKEN.findall(term or '')
+
+
+def _sqlite_match(term):
+    # Quote every token so user input can never be parsed as FTS5 syntax;
+    # adjacent quoted strings are ANDed.
+    return ' '.join('"%s"' % token for token in tokens(term))
+
+
+def _message_table(using):
+    return connections[using].ops.quote_name(Message._meta.db_table)
+
+
+def index_archived(transcripts, using=DEFAULT_DB_ALIAS):
+    """Index archived message text, given ``{conversation_id: [text, ...]}`` in archive order."""
+    kind = backend(using)
+    if kind == 'sqlite':
+        sql = f"INSERT INTO {ARCHIVE_FTS_TABLE}(rowid, text) VALUES (%s, %s)"
+        params = [((cid << ARCHIVE_ROWID_SHIFT) | position, text)
+                  for cid, texts in transcripts.items() for position, text in enumerate(texts)]
+    elif kind == 'postgresql':
+        sql = (f"INSERT INTO {ARCHIVE_FTS_TABLE}(conversation_id, position, document) "
+               "VALUES (%s, %s, to_tsvector('english', %s))")
+        params = [(cid, position, text) for cid, texts in transcripts.items() for position, text in enumerate(texts)]
+    else:
+        return
+    if params:
+        with connections[using].cursor() as cursor:
+            cursor.executemany(sql, params)
+
+
+def unindex_archived(transcripts, using=DEFAULT_DB_ALIAS):
+    """Undo :func:`index_archived` for the same ``{conversation_id: [text, ...]}``.
+
+    A contentless FTS5 table can only remove a row given its original text,
+    hence the texts.
+    """
+    kind = backend(using)
+    if kind == 'sqlite':
+        sql = f"INSERT INTO {ARCHIVE_FTS_TABLE}({ARCHIVE_FTS_TABLE}, rowid, text) VALUES ('delete', %s, %s)"
+        params = [((cid << ARCHIVE_ROWID_SHIFT) | position, text)
+                  for cid, texts in transcripts.items() for position, text in enumerate(texts)]
+        if params:
+            with connections[using].cursor() as cursor:
+                cursor.executemany(sql, params)
+    elif kind == 'postgresql' and transcripts:
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {ARCHIVE_FTS_TABLE} WHERE conversation_id = ANY(%s)", [list(transcripts)])
+
+
+def scan_archives(term, using=DEFAULT_DB_ALIAS):
+    """Return ``{conversation_id: matching_messages}`` by decoding every archive.
+
+    The no-index counterpart of the archive index, with ``icontains``
+    semantics.
+    """
+    needle = (term or '').lower()
+    matches = Counter()
+    for cid, codec, data in ArchivedTranscript.objects.using(using).values_list(
+            'conversation_id', 'codec', 'data').iterator():
+        for message in archive.decode(archive.decompress(bytes(data), codec)):
+            if needle in message.text.lower():
+                matches[cid] += 1
+    return matches
+
+
+def conversation_ids_sql(term, using=DEFAULT_DB_ALIAS):
+    """Return ``(sql, params)`` selecting ids of conversations whose messages
+    match ``term``, for use with ``RawSQL``; ``None`` without an index."""
+    kind = backend(using)
+    messages = _message_table(using)
+    if kind == 'sqlite':
+        return (f"SELECT m.conversation_id FROM {FTS_TABLE} f "
+                f"JOIN {messages} m ON m.id = f.rowid WHERE {FTS_TABLE} MATCH %s "
+                f"UNION ALL SELECT rowid >> {ARCHIVE_ROWID_SHIFT} FROM {ARCHIVE_FTS_TABLE} "
+                f"WHERE {ARCHIVE_FTS_TABLE} MATCH %s",
+                [_sqlite_match(term)] * 2)
+    if kind == 'postgresql':
+        return (f"SELECT conversation_id FROM {messages} "
+                "WHERE to_tsvector('english', text) @@ plainto_tsquery('english', %s) "
+                f"UNION ALL SELECT conversation_id FROM {ARCHIVE_FTS_TABLE} "
+                "WHERE document @@ plainto_tsquery('english', %s)", [term, term])
+    return None
+
+
+def message_ids_sql(term, using=DEFAULT_DB_ALIAS):
+    """Like :func:`conversation_ids_sql` but selecting matching message ids.
+
+    Archived messages have no rows to select, so only live ones match.
+    """
+    kind = backend(using)
+    if kind == 'sqlite':
+        return f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_sqlite_match(term)]
+    if kind == 'postgresql':
+        return (f"SELECT id FROM {_message_table(using)} "
+                "WHERE to_tsvector('english', text) @@ plainto_tsquery('english', %s)", [term])
+    return None
+
+
+def _ranked_ids(term, limit, using):
+    kind = backend(using)
+    messages = _message_table(using)
+    if kind == 'sqlite':
+        # FTS5's rank (bm25 by default) is lower-is-better; negate it so a
+        # higher rank means more relevant, as on PostgreSQL.
+        sql = (f"SELECT conversation_id, -MIN(score), COUNT(*) FROM ("
+               f"  SELECT m.conversation_id, hits.score FROM ("
+               f"    SELECT rowid AS id, rank AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+               f"  ) hits JOIN {messages} m ON m.id = hits.id"
+               f"  UNION ALL SELECT rowid >> {ARCHIVE_ROWID_SHIFT}, rank FROM {ARCHIVE_FTS_TABLE}"
+               f"  WHERE {ARCHIVE_FTS_TABLE} MATCH %s"
+               f") GROUP BY conversation_id ORDER BY MIN(score) LIMIT %s")
+        params = [_sqlite_match(term), _sqlite_match(term), limit]
+    elif kind == 'postgresql':
+        sql = ("SELECT conversation_id, MAX(score), COUNT(*) FROM ("
+               "  SELECT conversation_id, ts_rank(to_tsvector('english', text), q) AS score "
+               f"  FROM {messages}, plainto_tsquery('english', %s) q WHERE to_tsvector('english', text) @@ q"
+               "  UNION ALL SELECT conversation_id, ts_rank(document, q) "
+               f"  FROM {ARCHIVE_FTS_TABLE}, plainto_tsquery('english', %s) q WHERE document @@ q"
+               ") hits GROUP BY conversation_id ORDER BY 2 DESC LIMIT %s")
+        params = [term, term, limit]
+    else:
+        matches = scan_archives(term, using)
+        matches.update({
+            row['conversation_id']: row['matches']
+            for row in Message.objects.using(using).filter(text__icontains=term)
+            .values('conversation_id').annotate(matches=Count('id'))
+        })
+        return [(cid, float(count), count) for cid, count in matches.most_common(limit)]
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_conversations(term, limit=20, using=DEFAULT_DB_ALIAS):
+    """Return conversations whose messages match ``term``, best first.
+
+    Each hit is ``{'conversation_id', 'title', 'status', 'rank',
+    'matching_messages'}``, archived conversations included. With an index
+    this is two queries regardless of result size.
+    """
+    if not tokens(term):
+        return []
+    ranked = _ranked_ids(term, limit, using)
+    conversations = Conversation.objects.using(using).in_bulk([row[0] for row in ranked])
+    return [
+        {
+            'conversation_id': conversation_id,
+            'title': conversations[conversation_id].title,
+            'status': conversations[conversation_id].status,
+            'rank': round(rank, 6),
+            'matching_messages': matches,
+        }
+        for conversation_id, rank, matches in ranked
+        if conversation_id in conversations
+    ]
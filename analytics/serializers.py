@@ -9,7 +9,7 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'timestamp', 'sequence_number']
 
 class ConversationSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = MessageSerializer(many=True, read_only=True, source='transcript')
     message_count = serializers.IntegerField(read_only=True)
     
     class Meta:
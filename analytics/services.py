@@ -1,202 +1,428 @@
-import re
+from datetime import timedelta
+from functools import reduce, partial
+from itertools import groupby
+from operator import add
+from time import perf_counter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, F, FloatField, Q, Value, When
+from django.db.models.functions import Least, Round
 from django.utils import timezone
-from .models import Conversation, Message, ConversationAnalysis
+from . import archive, events, instrumentation, search, similarity
+from .models import (
+    AnalysisEvent, ArchivedTranscript, Conversation, Message, ConversationAnalysis, ConversationSimilarityBand,
+)
+from .scoring import (
+    ANALYZER_VERSION, MESSAGE_ROW_FIELDS, SCORE_WEIGHTS, MessageRow,
+    MetricAccumulator, TranscriptScorer, merge_weights, score_rows,
+)
 
-class ConversationAnalyzer:
-    FALLBACK_PHRASES = [
-        "i don't know", "i'm not sure", "i can't help", "unable to assist",
-        "don't have information", "not certain", "apologize"
+ANALYSIS_FIELDS = [
+    'clarity_score', 'relevance_score', 'accuracy_score', 'completeness_score',
+    'sentiment', 'empathy_score', 'avg_response_time', 'resolution',
+    'escalation_needed', 'fallback_count', 'coherence_score',
+    'professionalism_score', 'overall_score', 'analyzer_version',
+    'score_weights_version', 'minhash',
+]
+
+def get_score_weights():
+    """Return the active weights: ``SCORE_WEIGHTS`` with ``ANALYTICS_SCORE_WEIGHTS`` applied."""
+    overrides = getattr(settings, 'ANALYTICS_SCORE_WEIGHTS', None)
+    if not overrides:
+        return SCORE_WEIGHTS
+    try:
+        weights = merge_weights(overrides)
+    except ValueError as e:
+        raise ImproperlyConfigured(f"ANALYTICS_SCORE_WEIGHTS: {e}")
+    if weights != SCORE_WEIGHTS and weights['version'] == SCORE_WEIGHTS['version']:
+        raise ImproperlyConfigured(
+            "ANALYTICS_SCORE_WEIGHTS changes the default weights but keeps version "
+            f"{SCORE_WEIGHTS['version']}; give it a new 'version'"
+        )
+    return weights
+
+def overall_score_expression(weights):
+    """SQL expression computing ``overall_score`` from the stored component columns.
+
+    Mirrors :func:`analytics.scoring.overall_score` term for term. The one
+    difference is rounding: SQL ``ROUND`` rounds a value that prints as
+    ``x.xx5`` upwards, while Python's ``round()`` follows the underlying
+    binary value, so such ties can come out 0.01 higher than a fresh analysis.
+    """
+    total = reduce(add, [F(field) * Value(weight) for field, weight in weights['components'].items()])
+    total = (
+        total
+        + Case(When(resolution=True, then=Value(weights['resolution_bonus'])), default=Value(0.0))
+        - Case(When(escalation_needed=True, then=Value(weights['escalation_penalty'])), default=Value(0.0))
+        - Case(When(fallback_count__gt=weights['fallback_threshold'],
+                    then=Value(weights['fallback_penalty'])), default=Value(0.0))
+    )
+    return Round(Least(total * Value(10.0), Value(10.0), output_field=FloatField()), 2)
+
+def recompute_overall_scores(queryset=None, weights=None):
+    """Re-derive ``overall_score`` for ``queryset`` with one set-based UPDATE.
+
+    No messages are loaded; only the component columns already stored on
+    each analysis are used. Returns the number of rows updated.
+    """
+    weights = weights or get_score_weights()
+    if queryset is None:
+        queryset = ConversationAnalysis.objects.all()
+    return queryset.update(
+        overall_score=overall_score_expression(weights),
+        score_weights_version=weights['version'],
+        updated_at=timezone.now(),
+    )
+
+def settled_due(loaded_at):
+    """``analysis_due_at`` value for conversations analyzed from a transcript read at ``loaded_at``.
+
+    A change pushes the deadline ``quiet_seconds()`` past itself, so
+    deadlines up to ``loaded_at`` plus that came from changes the analysis
+    already saw and are cleared; later ones are kept for the scheduler.
+    """
+    from .scheduling import quiet_seconds
+    cutoff = loaded_at + timedelta(seconds=quiet_seconds())
+    return Case(When(analysis_due_at__lte=cutoff, then=Value(None)), default=F('analysis_due_at'),
+                output_field=DateTimeField())
+
+def load_message_rows(conversation):
+    if conversation.archived:
+        return [MessageRow(m.sender, m.text, m.timestamp) for m in conversation.archive.get_messages()]
+    qs = conversation.messages.order_by('sequence_number').values_list(*MESSAGE_ROW_FIELDS)
+    return list(map(MessageRow._make, qs))
+
+def load_message_rows_bulk(conversation_ids):
+    """Return ``{conversation_id: [MessageRow, ...]}`` using a single query.
+
+    Conversations with no live messages are looked up in the archive with
+    one extra query, so archived transcripts are scored like any other.
+    """
+    qs = (Message.objects.filter(conversation_id__in=conversation_ids)
+          .order_by('conversation_id', 'sequence_number')
+          .values_list('conversation_id', *MESSAGE_ROW_FIELDS))
+    rows = {
+        conversation_id: [MessageRow(*row[1:]) for row in group]
+        for conversation_id, group in groupby(qs.iterator(), key=lambda row: row[0])
+    }
+    missing = [cid for cid in conversation_ids if cid not in rows]
+    if missing:
+        for cid, codec, data in ArchivedTranscript.objects.filter(conversation_id__in=missing).values_list(
+                'conversation_id', 'codec', 'data'):
+            rows[cid] = [MessageRow(m.sender, m.text, m.timestamp)
+                         for m in archive.decode(archive.decompress(bytes(data), codec))]
+    return rows
+
+def add_conversation_message(conversation_id, sender, text):
+    """Add a message at the end of a conversation and mark it for re-analysis.
+
+    The status update runs first, so the conversation row is write-locked
+    (on SQLite, the database write lock is taken) before ``Message.save``
+    reads the next sequence number; concurrent appends queue instead of
+    sharing a number. Returns the new ``Message``, or ``None`` if the
+    conversation does not exist.
+    """
+    with transaction.atomic():
+        if not Conversation.objects.filter(pk=conversation_id).update(status='pending', updated_at=timezone.now()):
+            return None
+        conversation = Conversation.objects.get(pk=conversation_id)
+        return Message.objects.create(conversation=conversation, sender=sender, text=text)
+
+# Ids per DELETE ... IN, under SQLite's 999 host-parameter limit on older builds
+MESSAGE_DELETE_BATCH = 900
+
+def archive_conversations(conversation_ids, codec='zlib'):
+    """Move the messages of ``conversation_ids`` into compressed archives.
+
+    Each conversation's messages are packed into one ``ArchivedTranscript``
+    row and deleted from the message table in the same transaction; their
+    text moves to the archive search index (see :mod:`analytics.search`),
+    so search keeps finding the conversation. The conversations are
+    locked while their messages are read, and only the messages actually
+    packed are deleted, so a concurrent append is never lost. Conversations
+    already archived or without messages are skipped. Returns
+    ``(archived_count, raw_bytes, compressed_bytes)``.
+    """
+    archives = []
+    message_ids = []
+    texts = {}
+    raw_bytes = compressed_bytes = 0
+    with transaction.atomic():
+        locked = list(Conversation.objects.select_for_update()
+                      .filter(id__in=conversation_ids, archived=False).values_list('id', flat=True))
+        qs = (Message.objects.filter(conversation_id__in=locked)
+              .order_by('conversation_id', 'sequence_number')
+              .values_list('conversation_id', 'id', 'sender', 'text', 'timestamp', 'sequence_number'))
+        for conversation_id, group in groupby(qs.iterator(), key=lambda row: row[0]):
+            messages = [archive.ArchivedMessage(*row[1:]) for row in group]
+            raw = archive.encode(messages)
+            data = archive.compress(raw, codec)
+            raw_bytes += len(raw)
+            compressed_bytes += len(data)
+            user_count = sum(1 for m in messages if m.sender == 'user')
+            archives.append(ArchivedTranscript(
+                conversation_id=conversation_id, codec=codec, data=data, raw_size=len(raw),
+                message_count=len(messages), user_message_count=user_count,
+                ai_message_count=sum(1 for m in messages if m.sender == 'ai'),
+            ))
+            message_ids.extend(m.id for m in messages)
+            texts[conversation_id] = [m.text for m in messages]
+        ids = [a.conversation_id for a in archives]
+        if ids:
+            ArchivedTranscript.objects.bulk_create(archives)
+            search.index_archived(texts)
+            for start in range(0, len(message_ids), MESSAGE_DELETE_BATCH):
+                Message.objects.filter(id__in=message_ids[start:start + MESSAGE_DELETE_BATCH]).delete()
+            Conversation.objects.filter(id__in=ids).update(archived=True)
+    return len(ids), raw_bytes, compressed_bytes
+
+def rehydrate_conversations(conversation_ids):
+    """Restore archived messages to the message table, keeping their ids.
+
+    Returns the number of conversations rehydrated.
+    """
+    archives = list(ArchivedTranscript.objects.filter(conversation_id__in=conversation_ids))
+    if not archives:
+        return 0
+    transcripts = {a.conversation_id: archive.decode(archive.decompress(bytes(a.data), a.codec)) for a in archives}
+    with transaction.atomic():
+        Message.objects.bulk_create([
+            Message(id=m.id, conversation_id=cid, sender=m.sender, text=m.text,
+                    timestamp=m.timestamp, sequence_number=m.sequence_number)
+            for cid, messages in transcripts.items() for m in messages
+        ], batch_size=1000)
+        search.unindex_archived({cid: [m.text for m in messages] for cid, messages in transcripts.items()})
+        ids = list(transcripts)
+        ArchivedTranscript.objects.filter(conversation_id__in=ids).delete()
+        Conversation.objects.filter(id__in=ids).update(archived=False)
+    return len(archives)
+
+PURGE_TABLES = [
+    (Message, 'conversation_id'),
+    (ConversationSimilarityBand, 'conversation_id'),
+    (ConversationAnalysis, 'conversation_id'),
+    (AnalysisEvent, 'conversation_id'),
+    (ArchivedTranscript, 'conversation_id'),
+    (Conversation, 'id'),
+]
+
+
+def purge_conversations(conversation_ids):
+    """Delete ``conversation_ids`` and everything hanging off them.
+
+    Issues one set-based ``DELETE ... WHERE ... IN`` per table, children
+    first, inside a single short transaction, instead of going through the
+    ORM collector which loads every related row into memory. Full-text
+    index rows are removed by the message table triggers, and archived
+    text is dropped from the archive index first. Returns
+    ``{table_name: rows_deleted}``.
+    """
+    conversation_ids = list(conversation_ids)
+    if not conversation_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(conversation_ids))
+    deleted = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        search.unindex_archived({
+            cid: [m.text for m in archive.decode(archive.decompress(bytes(data), codec))]
+            for cid, codec, data in ArchivedTranscript.objects.filter(conversation_id__in=conversation_ids)
+            .values_list('conversation_id', 'codec', 'data')
+        })
+        for model, column in PURGE_TABLES:
+            table = model._meta.db_table
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(table)} "
+                f"WHERE {connection.ops.quote_name(column)} IN ({placeholders})",
+                conversation_ids,
+            )
+            deleted[table] = cursor.rowcount
+    return deleted
+
+def analyze_conversations(conversation_ids, map_fn=map):
+    """Analyze many conversations with a fixed number of queries.
+
+    Messages for all ``conversation_ids`` are loaded in one query, scored
+    through ``map_fn`` (pass ``executor.map`` to fan out over processes) and
+    written back with one upsert plus one status update. Returns the same
+    ``{'success': [...], 'failed': [...]}`` shape as the bulk views, with an
+    extra ``'skipped'`` list for conversations without messages.
+    """
+    weights = get_score_weights()
+    versions = {'analyzer_version': ANALYZER_VERSION, 'score_weights_version': weights['version']}
+    instrumented = instrumentation.is_enabled()
+    loaded_at = timezone.now()
+    start = perf_counter()
+    rows_by_conversation = load_message_rows_bulk(conversation_ids)
+    if instrumented:
+        instrumentation.DB_SECONDS.observe(perf_counter() - start, operation='load')
+        instrumentation.BATCH_SIZE.observe(len(conversation_ids))
+    ids = [cid for cid in conversation_ids if cid in rows_by_conversation]
+    results = {
+        'success': [], 'failed': [],
+        'skipped': [cid for cid in conversation_ids if cid not in rows_by_conversation],
+    }
+    analyses = []
+    for cid, (metrics, error) in zip(ids, map_fn(partial(score_rows, weights=weights), [rows_by_conversation[cid] for cid in ids])):
+        if error is not None:
+            results['failed'].append({'id': cid, 'error': error})
+            continue
+        analyses.append(ConversationAnalysis(conversation_id=cid, **versions, **metrics))
+        results['success'].append(cid)
+    if analyses:
+        start = perf_counter()
+        with transaction.atomic():
+            ConversationAnalysis.objects.bulk_create(
+                analyses, update_conflicts=True, unique_fields=['conversation'],
+                update_fields=ANALYSIS_FIELDS + ['updated_at'],
+            )
+            Conversation.objects.filter(id__in=results['success']).update(
+                status='analyzed', updated_at=timezone.now(), analysis_due_at=settled_due(loaded_at)
+            )
+            index_signatures({a.conversation_id: a.minhash for a in analyses})
+            events.record_analyses(analyses)
+        if instrumented:
+            instrumentation.DB_SECONDS.observe(perf_counter() - start, operation='write')
+    if instrumented:
+        instrumentation.ANALYSES.inc(len(results['success']))
+        if results['failed']:
+            instrumentation.FAILURES.inc(len(results['failed']))
+    return results
+
+def index_signatures(signatures):
+    """Replace the LSH band rows for ``{conversation_id: packed_minhash_or_None}``."""
+    ConversationSimilarityBand.objects.filter(conversation_id__in=list(signatures)).delete()
+    ConversationSimilarityBand.objects.bulk_create([
+        ConversationSimilarityBand(conversation_id=cid, band=band, bucket=bucket)
+        for cid, packed in signatures.items() if packed
+        for band, bucket in similarity.band_buckets(similarity.unpack(packed))
+    ], batch_size=1000)
+
+def find_similar(conversation_id, threshold=0.5, limit=20, max_candidates=1000):
+    """Return ``[(conversation_id, estimated_jaccard), ...]`` most similar first.
+
+    Candidates come from the indexed ``(band, bucket)`` lookup, so the cost
+    depends on the number of near neighbours rather than on table size.
+    Raises ``ConversationAnalysis.DoesNotExist`` if the conversation has no
+    analysis; returns ``[]`` if it has no signature.
+    """
+    packed = ConversationAnalysis.objects.values_list('minhash', flat=True).get(conversation_id=conversation_id)
+    if not packed:
+        return []
+    signature = similarity.unpack(packed)
+    match = Q()
+    for band, bucket in similarity.band_buckets(signature):
+        match |= Q(band=band, bucket=bucket)
+    candidates = list(
+        ConversationSimilarityBand.objects.filter(match).exclude(conversation_id=conversation_id)
+        .values_list('conversation_id', flat=True).distinct()[:max_candidates]
+    )
+    scored = [
+        (cid, similarity.jaccard(signature, similarity.unpack(other)))
+        for cid, other in ConversationAnalysis.objects.filter(conversation_id__in=candidates)
+        .exclude(minhash=None).values_list('conversation_id', 'minhash')
     ]
-    NEGATIVE_WORDS = ["bad","terrible","worst","horrible","awful","disappointed","frustrated","angry","upset","annoyed","useless","waste"]
-    POSITIVE_WORDS = ["good","great","excellent","amazing","perfect","wonderful","thanks","thank you","helpful","appreciate","love","best"]
-    EMPATHY_INDICATORS = ["understand","sorry","apologize","appreciate","frustrating","help you","here for you","i see","that must"]
-    
-    def __init__(self, conversation):
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
+
+def save_analysis(conversation, metrics, weights, loaded_at=None):
+    """Persist scored ``metrics`` (including the packed ``minhash``) for ``conversation``.
+
+    ``loaded_at`` is when the transcript was read; a debounced analysis
+    already due for those messages is then cancelled (see :func:`settled_due`).
+    """
+    metrics['analyzer_version'] = ANALYZER_VERSION
+    metrics['score_weights_version'] = weights['version']
+    changes = {'status': 'analyzed', 'updated_at': timezone.now()}
+    if loaded_at is not None:
+        changes['analysis_due_at'] = settled_due(loaded_at)
+    with transaction.atomic():
+        analysis, created = ConversationAnalysis.objects.update_or_create(
+            conversation=conversation, defaults=metrics
+        )
+        index_signatures({conversation.id: metrics['minhash']})
+        Conversation.objects.filter(pk=conversation.pk).update(**changes)
+        conversation.status = 'analyzed'
+        events.record_analyses([analysis])
+    return analysis
+
+class ConversationAnalyzer(TranscriptScorer):
+    def __init__(self, conversation=None, rows=None, weights=None):
+        """Analyze ``conversation``, or a transcript given directly as ``rows``.
+
+        When ``rows`` is omitted they are loaded for ``conversation`` with
+        ``values_list``. A conversation is only needed by :meth:`analyze`,
+        which persists the result.
+        """
         self.conversation = conversation
-        self.messages = list(conversation.messages.all().order_by('sequence_number'))
-        self.user_messages = [m for m in self.messages if m.sender == 'user']
-        self.ai_messages = [m for m in self.messages if m.sender == 'ai']
+        self.load_seconds = 0.0
+        self.loaded_at = timezone.now()
+        if rows is None:
+            start = perf_counter()
+            rows = load_message_rows(conversation)
+            self.load_seconds = perf_counter() - start
+        super().__init__(rows, weights or get_score_weights())
     
     def analyze(self):
-        metrics = {
-            'clarity_score': self._calc_clarity(),
-            'relevance_score': self._calc_relevance(),
-            'accuracy_score': self._calc_accuracy(),
-            'completeness_score': self._calc_completeness(),
-            'sentiment': self._determine_sentiment(),
-            'empathy_score': self._calc_empathy(),
-            'avg_response_time': self._calc_avg_response_time(),
-            'resolution': self._check_resolution(),
-            'escalation_needed': self._check_escalation(),
-            'fallback_count': self._count_fallbacks(),
-            'coherence_score': self._calc_coherence(),
-            'professionalism_score': self._calc_professionalism(),
-        }
-        metrics['overall_score'] = self._calc_overall_score(metrics)
-        analysis, created = ConversationAnalysis.objects.update_or_create(
-            conversation=self.conversation, defaults=metrics
-        )
-        self.conversation.status = 'analyzed'
-        self.conversation.save()
+        if not instrumentation.is_enabled():
+            return self._save(self.score())
+        timings = {}
+        start = perf_counter()
+        try:
+            metrics = self.score(timings)
+            write_start = perf_counter()
+            analysis = self._save(metrics)
+        except Exception:
+            instrumentation.FAILURES.inc()
+            raise
+        end = perf_counter()
+        for metric, seconds in timings.items():
+            instrumentation.METRIC_SECONDS.observe(seconds, metric=metric)
+        if self.load_seconds:
+            instrumentation.DB_SECONDS.observe(self.load_seconds, operation='load')
+        instrumentation.DB_SECONDS.observe(end - write_start, operation='write')
+        instrumentation.ANALYSIS_SECONDS.observe(self.load_seconds + end - start)
+        instrumentation.ANALYSES.inc()
         return analysis
     
-    def _calc_clarity(self):
-        if not self.ai_messages:
-            return 0.5
-        total_score = 0.0
-        for msg in self.ai_messages:
-            text = msg.text.lower()
-            word_count = len(text.split())
-            score = 0.8
-            if word_count < 5:
-                score -= 0.05
-            elif word_count > 150:
-                score -= 0.05
-            if '?' in text:
-                score += 0.02
-            if text and text[0].isupper():
-                score += 0.01
-            total_score += max(0.0, min(1.0, score))
-        return max(0.0, min(1.0, total_score / len(self.ai_messages)))
-    
-    def _calc_relevance(self):
-        if len(self.messages) < 2:
-            return 0.7
-        relevance_sum = 0
-        pairs = 0
-        for i in range(len(self.messages)-1):
-            if self.messages[i].sender == 'user' and self.messages[i+1].sender == 'ai':
-                user_text = self.messages[i].text.lower()
-                ai_text = self.messages[i+1].text.lower()
-                user_words = set(re.findall(r'\b\w{4,}\b', user_text))
-                ai_words = set(re.findall(r'\b\w{4,}\b', ai_text))
-                if user_words:
-                    overlap = len(user_words & ai_words)/len(user_words)
-                    relevance_sum += min(overlap*2,1.0)
-                    pairs +=1
-        return relevance_sum/pairs if pairs>0 else 0.7
-    
-    def _calc_accuracy(self):
-        score = 0.75
-        for msg in self.ai_messages:
-            text = msg.text.lower()
-            if any(word in text for word in ['maybe','might','possibly','perhaps']):
-                score -= 0.03
-            if any(word in text for word in ['definitely','certainly','absolutely']):
-                score += 0.02
-        return max(0.0, min(1.0, score))
+    def _save(self, metrics):
+        signature = self.signature()
+        metrics['minhash'] = similarity.pack(signature) if signature else None
+        return save_analysis(self.conversation, metrics, self.weights, loaded_at=self.loaded_at)
+
+
+class StreamingConversationAnalyzer(ConversationAnalyzer):
+    """Analyzer that never holds the whole transcript in memory.
+
+    Messages are read with ``values_list(...).iterator()`` and folded into a
+    :class:`MetricAccumulator`, so worker memory stays flat even for
+    conversations with tens of thousands of turns. Results are identical to
+    :class:`ConversationAnalyzer`.
+    """
     
-    def _calc_completeness(self):
-        if not self.user_messages:
-            return 0.5
-        question_count = sum(1 for m in self.user_messages if '?' in m.text)
-        if question_count == 0:
-            return 0.8
-        avg_len = sum(len(m.text.split()) for m in self.ai_messages)/len(self.ai_messages) if self.ai_messages else 0
-        if avg_len < 10:
-            return 0.4
-        elif avg_len < 30:
-            return 0.6
-        else:
-            return 0.85
+    def __init__(self, conversation, chunk_size=None, weights=None):
+        self.conversation = conversation
+        self.load_seconds = 0.0
+        self._signature = None
+        self.weights = weights or get_score_weights()
+        self.chunk_size = chunk_size or getattr(settings, 'ANALYTICS_STREAM_CHUNK_SIZE', 2000)
     
-    def _determine_sentiment(self):
-        pos = neg = 0
-        for msg in self.user_messages:
-            text = msg.text.lower()
-            pos += sum(1 for w in self.POSITIVE_WORDS if w in text)
-            neg += sum(1 for w in self.NEGATIVE_WORDS if w in text)
-        if pos > neg * 1.5:
-            return 'positive'
-        elif neg > pos * 1.5:
-            return 'negative'
-        elif pos>0 and neg>0:
-            return 'mixed'
+    def compute_metrics(self, timings=None):
+        # Loading and scoring are interleaved, so per-metric timings do not
+        # apply; the whole pass is still covered by analysis latency.
+        accumulator = MetricAccumulator()
+        self.loaded_at = timezone.now()
+        if self.conversation.archived:
+            rows = load_message_rows(self.conversation)
         else:
-            return 'neutral'
-    
-    def _calc_empathy(self):
-        if not self.ai_messages:
-            return 0.5
-        count = 0
-        for msg in self.ai_messages:
-            text = msg.text.lower()
-            count += sum(1 for phrase in self.EMPATHY_INDICATORS if phrase in text)
-        score = min(count/len(self.ai_messages)*0.5,1.0)
-        return max(0.3, score)
-    
-    def _calc_avg_response_time(self):
-        times = []
-        for i in range(len(self.messages)-1):
-            if self.messages[i].sender=='user' and self.messages[i+1].sender=='ai':
-                diff = (self.messages[i+1].timestamp - self.messages[i].timestamp).total_seconds()
-                times.append(diff)
-        return sum(times)/len(times) if times else 3.5
-    
-    def _check_resolution(self):
-        if not self.user_messages:
-            return False
-        last = self.user_messages[-1].text.lower()
-        indicators = ['thank','thanks','solved','fixed','resolved','perfect','worked','got it','understood']
-        return any(ind in last for ind in indicators)
-    
-    def _check_escalation(self):
-        if not self._check_resolution() and len(self.user_messages)>5:
-            return True
-        if self._determine_sentiment() == 'negative':
-            return True
-        for m in self.user_messages:
-            text = m.text.lower()
-            if any(word in text for word in ['manager','supervisor','human','agent','speak to']):
-                return True
-        return False
-    
-    def _count_fallbacks(self):
-        count = 0
-        for msg in self.ai_messages:
-            text = msg.text.lower()
-            count += sum(1 for phrase in self.FALLBACK_PHRASES if phrase in text)
-        return count
-    
-    def _calc_coherence(self):
-        if len(self.messages)<3:
-            return 0.7
-        proper = 0
-        for i in range(len(self.messages)-1):
-            if self.messages[i].sender != self.messages[i+1].sender:
-                proper +=1
-        return proper/(len(self.messages)-1)
-    
-    def _calc_professionalism(self):
-        if not self.ai_messages:
-            return 0.85
-        score = 0.85
-        for msg in self.ai_messages:
-            text = msg.text or ""
-            if text and text[0].isupper():
-                score += 0.01
-            if text.count('!') > 2 or text.count('?') > 3:
-                score -= 0.05
-            informal = ['gonna','wanna','yeah','nope','dunno']
-            if any(word in text.lower() for word in informal):
-                score -= 0.1
-        return max(0.0, min(1.0, score))
+            rows = (self.conversation.messages.order_by('sequence_number')
+                    .values_list(*MESSAGE_ROW_FIELDS)
+                    .iterator(chunk_size=self.chunk_size))
+        for sender, text, timestamp in rows:
+            accumulator.add(sender, text, timestamp)
+        self._signature = accumulator.signature()
+        return accumulator.metrics()
     
-    def _calc_overall_score(self, m):
-        weights = {
-            'clarity_score':0.15,
-            'relevance_score':0.15,
-            'accuracy_score':0.15,
-            'completeness_score':0.15,
-            'empathy_score':0.10,
-            'coherence_score':0.10,
-            'professionalism_score':0.10,
-        }
-        total = sum(m[k]*weights[k] for k in weights)
-        if m['resolution']:
-            total += 0.05
-        if m['escalation_needed']:
-            total -= 0.05
-        if m['fallback_count']>2:
-            total -= 0.05
-        return round(min(total * 10, 10.0), 2)
+    def signature(self):
+        return self._signature
@@ -0,0 +1,76 @@
+"""MinHash signatures and LSH banding for near-duplicate transcripts.
+
+A conversation's token set (the same ``\\b\\w{4,}\\b`` words relevance scoring
+uses) is reduced to ``NUM_PERM`` minimum hashes. Two signatures agree in a
+given position with probability equal to the Jaccard similarity of the
+underlying sets. Signatures are split into ``BANDS`` bands; conversations
+sharing any band bucket become candidates, which puts the similarity
+threshold around ``(1 / BANDS) ** (1 / ROWS_PER_BAND)`` (about 0.5).
+Changing any constant here invalidates stored signatures. No Django imports.
+"""
+import random
+import struct
+from hashlib import blake2b
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_PACK = struct.Struct(f'<{NUM_PERM}Q')
+
+
+def _token_hash(token):
+    # Stable across processes, unlike hash() on str.
+    return int.from_bytes(blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class MinHasher:
+    """Incrementally maintained MinHash signature; memory is ``NUM_PERM`` ints."""
+
+    def __init__(self):
+        self.values = [_PRIME] * NUM_PERM
+        self.empty = True
+
+    def update(self, tokens):
+        values = self.values
+        for token in tokens:
+            x = _token_hash(token)
+            hashes = [(a * x + b) % _PRIME for a, b in _PERMUTATIONS]
+            self.values = values = [h if h < v else v for h, v in zip(hashes, values)]
+            self.empty = False
+
+    def digest(self):
+        """Return the signature tuple, or ``None`` if no tokens were seen."""
+        return None if self.empty else tuple(self.values)
+
+
+def minhash(tokens):
+    hasher = MinHasher()
+    hasher.update(tokens)
+    return hasher.digest()
+
+
+def jaccard(signature_a, signature_b):
+    """Estimate the Jaccard similarity of the sets behind two signatures."""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+
+def band_buckets(signature):
+    """Return ``[(band, bucket), ...]`` with buckets as signed 64-bit ints."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = blake2b(struct.pack(f'<{ROWS_PER_BAND}Q', *rows), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return buckets
+
+
+def pack(signature):
+    return _PACK.pack(*signature)
+
+
+def unpack(blob):
+    return _PACK.unpack(bytes(blob))
@@ -0,0 +1,265 @@
+"""Columnar NumPy snapshot of ``ConversationAnalysis`` scores for ad-hoc analysis.
+
+``manage.py snapshot_scores`` writes one ``<column>.npy`` file per metric
+plus a ``manifest.json`` recording the row count and the ``updated_at``
+watermark, so later runs only fetch rows changed since then (less
+``ANALYTICS_SNAPSHOT_OVERLAP_SECONDS``, for rows stamped before the
+watermark that committed after it).
+:class:`ScoreSnapshot` memory-maps the files, so filters, histograms and
+correlations run vectorized over the whole table without loading it::
+
+    snap = ScoreSnapshot.open()
+    negative = snap.where(sentiment='negative', created_at__gte=datetime(2025, 1, 1))
+    counts, edges = snap.histogram('overall_score', bins=20, mask=negative)
+    snap.correlation(['empathy_score', 'overall_score'])
+
+NumPy is an optional dependency, needed only here.
+"""
+import json
+import os
+from datetime import timedelta, timezone as dt_timezone
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+FORMAT_VERSION = 1
+SENTIMENTS = ['positive', 'neutral', 'negative', 'mixed']
+
+# name -> dtype; order matches the values_list() used to fetch rows
+COLUMNS = {
+    'id': 'int64',
+    'conversation_id': 'int64',
+    'created_at': 'datetime64[us]',
+    'updated_at': 'datetime64[us]',
+    'clarity_score': 'float64',
+    'relevance_score': 'float64',
+    'accuracy_score': 'float64',
+    'completeness_score': 'float64',
+    'empathy_score': 'float64',
+    'avg_response_time': 'float64',
+    'coherence_score': 'float64',
+    'professionalism_score': 'float64',
+    'overall_score': 'float64',
+    'fallback_count': 'int32',
+    'resolution': 'bool',
+    'escalation_needed': 'bool',
+    'sentiment': 'int8',  # index into SENTIMENTS, -1 if unknown
+    'analyzer_version': 'int32',
+    'score_weights_version': 'int32',
+}
+_SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+_LOOKUPS = {
+    'exact': lambda a, v: a == v,
+    'gt': lambda a, v: a > v,
+    'gte': lambda a, v: a >= v,
+    'lt': lambda a, v: a < v,
+    'lte': lambda a, v: a <= v,
+}
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Score snapshots require NumPy; install it with 'pip install numpy'")
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_datetime64(value):
+    return np.datetime64(_naive_utc(value), 'us')
+
+
+def _encode(name, value):
+    if name == 'sentiment':
+        return _SENTIMENT_CODES.get(value, -1)
+    if COLUMNS[name].startswith('datetime64'):
+        return _to_datetime64(value)
+    return value
+
+
+def _load(queryset, chunk_size):
+    """Fetch ``queryset`` into new column arrays, ``chunk_size`` rows at a time."""
+    columns = {name: np.empty(queryset.count(), dtype=dtype) for name, dtype in COLUMNS.items()}
+    rows = queryset.order_by('id').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+    filled = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        if filled + len(chunk) > len(columns['id']):
+            # Rows inserted after the count; the next refresh picks them up.
+            chunk = chunk[:len(columns['id']) - filled]
+        for name, values in zip(COLUMNS, zip(*chunk)):
+            if name == 'sentiment':
+                values = [_SENTIMENT_CODES.get(v, -1) for v in values]
+            elif COLUMNS[name].startswith('datetime64'):
+                values = [_naive_utc(v) for v in values]
+            columns[name][filled:filled + len(chunk)] = values
+        filled += len(chunk)
+    return {name: array[:filled] for name, array in columns.items()}
+
+
+def _watermark(columns):
+    """Latest ``updated_at`` among the rows actually in ``columns`` (aware UTC)."""
+    if not len(columns['updated_at']):
+        return None
+    return columns['updated_at'].max().item().replace(tzinfo=dt_timezone.utc)
+
+
+def _read_manifest(path):
+    try:
+        with open(os.path.join(path, 'manifest.json')) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != FORMAT_VERSION or set(manifest.get('columns', [])) != set(COLUMNS):
+        return None
+    return manifest
+
+
+def _write(path, columns, watermark):
+    """Replace the snapshot atomically per file; the manifest goes last."""
+    os.makedirs(path, exist_ok=True)
+    for name, array in columns.items():
+        tmp_path = os.path.join(path, f'{name}.npy.tmp')
+        with open(tmp_path, 'wb') as fh:
+            np.save(fh, array)
+        os.replace(tmp_path, os.path.join(path, f'{name}.npy'))
+    manifest = {
+        'format': FORMAT_VERSION,
+        'rows': int(len(columns['id'])),
+        'watermark': watermark.isoformat() if watermark else None,
+        'columns': list(COLUMNS),
+    }
+    tmp_path = os.path.join(path, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp_path, os.path.join(path, 'manifest.json'))
+    return manifest
+
+
+def build_snapshot(path, full=False, chunk_size=10000, overlap=None):
+    """Create or incrementally refresh the snapshot at ``path``.
+
+    The watermark is the newest ``updated_at`` among the rows written.
+    ``updated_at`` is stamped before a transaction commits, so a row can
+    become visible with a stamp below a watermark already taken; refreshes
+    therefore re-fetch from ``overlap`` seconds (default
+    ``ANALYTICS_SNAPSHOT_OVERLAP_SECONDS``) before it and merge by analysis
+    id. Rows committed later than that after their stamp are only picked
+    up by the next ``full`` rebuild. Deleted analyses cannot be seen that
+    way either, so if the merged row count disagrees with the table the
+    snapshot is rebuilt in full. Returns ``(manifest, rows_fetched, rebuilt)``.
+    """
+    from django.conf import settings
+    from django.utils.dateparse import parse_datetime
+    from .models import ConversationAnalysis
+    require_numpy()
+    queryset = ConversationAnalysis.objects.all()
+    manifest = None if full else _read_manifest(path)
+    if overlap is None:
+        overlap = getattr(settings, 'ANALYTICS_SNAPSHOT_OVERLAP_SECONDS', 300)
+
+    if manifest is not None and manifest['watermark']:
+        since = parse_datetime(manifest['watermark']) - timedelta(seconds=overlap)
+        fetched = _load(queryset.filter(updated_at__gte=since), chunk_size)
+        current = {name: np.load(os.path.join(path, f'{name}.npy')) for name in COLUMNS}
+        if len(current['id']):
+            positions = np.minimum(np.searchsorted(current['id'], fetched['id']), len(current['id']) - 1)
+            existing = current['id'][positions] == fetched['id']
+        else:
+            positions = existing = np.zeros(len(fetched['id']), dtype=bool)
+        merged = {}
+        for name in COLUMNS:
+            column = current[name]
+            column[positions[existing]] = fetched[name][existing]
+            merged[name] = np.concatenate([column, fetched[name][~existing]])
+        order = np.argsort(merged['id'], kind='stable')
+        merged = {name: array[order] for name, array in merged.items()}
+        if len(merged['id']) == queryset.count():
+            return _write(path, merged, _watermark(merged)), len(fetched['id']), False
+
+    columns = _load(queryset, chunk_size)
+    return _write(path, columns, _watermark(columns)), len(columns['id']), True
+
+
+class ScoreSnapshot:
+    """Read-only, memory-mapped view over a snapshot directory."""
+
+    def __init__(self, path):
+        require_numpy()
+        self.path = path
+        self.manifest = _read_manifest(path)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No score snapshot at {path}; run 'manage.py snapshot_scores'")
+        self._columns = {}
+
+    @classmethod
+    def open(cls, path=None):
+        from django.conf import settings
+        return cls(path or str(settings.ANALYTICS_SNAPSHOT_DIR))
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def __getitem__(self, name):
+        if name not in COLUMNS:
+            raise KeyError(f"Unknown column '{name}'")
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def where(self, **conditions):
+        """Boolean mask for Django-style lookups, e.g. ``overall_score__lt=5``.
+
+        Supports ``exact``, ``gt``, ``gte``, ``lt``, ``lte`` and ``in``;
+        ``sentiment`` takes names, datetime columns take datetimes.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in conditions.items():
+            name, _, lookup = key.partition('__')
+            lookup = lookup or 'exact'
+            column = self[name]
+            if lookup == 'in':
+                mask &= np.isin(column, [_encode(name, v) for v in value])
+            elif lookup in _LOOKUPS:
+                mask &= _LOOKUPS[lookup](column, _encode(name, value))
+            else:
+                raise ValueError(f"Unsupported lookup '{lookup}'")
+        return mask
+
+    def _values(self, name, mask):
+        column = self[name]
+        return column if mask is None else column[mask]
+
+    def aggregate(self, name, mask=None, percentiles=(50, 95, 99)):
+        values = self._values(name, mask)
+        if not len(values):
+            return {'count': 0}
+        values = values.astype('float64')
+        result = {
+            'count': int(len(values)), 'mean': float(values.mean()), 'std': float(values.std()),
+            'min': float(values.min()), 'max': float(values.max()),
+        }
+        for pct, value in zip(percentiles, np.percentile(values, percentiles)):
+            result[f'p{pct}'] = float(value)
+        return result
+
+    def histogram(self, name, bins=10, range=None, mask=None):
+        """Return ``(counts, edges)`` as from :func:`numpy.histogram`."""
+        return np.histogram(self._values(name, mask), bins=bins, range=range)
+
+    def correlation(self, names, mask=None):
+        """Pearson correlation matrix as ``{a: {b: r}}``."""
+        matrix = np.corrcoef(np.vstack([self._values(name, mask).astype('float64') for name in names]))
+        return {a: {b: float(matrix[i][j]) for j, b in enumerate(names)} for i, a in enumerate(names)}
+
+    def compare(self, name, mask_a, mask_b):
+        """Aggregate ``name`` for two cohorts side by side."""
+        return {'a': self.aggregate(name, mask_a), 'b': self.aggregate(name, mask_b)}
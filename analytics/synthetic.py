@@ -0,0 +1,120 @@
+"""Seeded synthetic transcripts for benchmarks and load tests.
+
+Transcripts come out in the REST API create shape (``{"title", "messages":
+[{"sender", "message", "timestamp"}]}``) so they can be POSTed, written to
+JSONL for ``analyze_file`` or turned into ``MessageRow`` tuples. The same
+seed and settings always yield the same transcripts. No Django imports.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from .scoring import MessageRow, TranscriptScorer
+
+FILLER_WORDS = (
+    "order account delivery payment refund shipping password update invoice "
+    "subscription tracking address billing product warranty support request "
+    "status number email login reset replacement package week today please"
+).split()
+
+# Lexicon categories whose phrases can be sprinkled in, keyed by the sender
+# that would plausibly say them.
+LEXICONS = {
+    'positive': ('user', TranscriptScorer.POSITIVE_WORDS),
+    'negative': ('user', TranscriptScorer.NEGATIVE_WORDS),
+    'escalation': ('user', TranscriptScorer.ESCALATION_WORDS),
+    'resolution': ('user', TranscriptScorer.RESOLUTION_INDICATORS),
+    'empathy': ('ai', TranscriptScorer.EMPATHY_INDICATORS),
+    'fallback': ('ai', TranscriptScorer.FALLBACK_PHRASES),
+    'hedge': ('ai', TranscriptScorer.HEDGE_WORDS),
+    'confident': ('ai', TranscriptScorer.CONFIDENT_WORDS),
+    'informal': ('ai', TranscriptScorer.INFORMAL_WORDS),
+}
+
+DEFAULT_DENSITIES = {
+    'positive': 0.15, 'negative': 0.1, 'escalation': 0.03, 'resolution': 0.2,
+    'empathy': 0.3, 'fallback': 0.05, 'hedge': 0.1, 'confident': 0.1, 'informal': 0.02,
+}
+
+SENDER_PATTERNS = ('alternating', 'random', 'user_heavy', 'bursty')
+
+
+class TranscriptGenerator:
+    """Generate reproducible transcripts.
+
+    ``turns`` is a fixed message count or a ``(min, max)`` range.
+    ``densities`` maps a ``LEXICONS`` category to the probability that a
+    message from the matching sender contains one of its phrases.
+    ``sender_pattern`` is one of ``SENDER_PATTERNS``.
+    """
+
+    def __init__(self, seed=0, turns=(4, 40), densities=None, sender_pattern='alternating',
+                 words_per_message=(4, 40), question_rate=0.3, response_seconds=(1, 30)):
+        if sender_pattern not in SENDER_PATTERNS:
+            raise ValueError(f"sender_pattern must be one of {', '.join(SENDER_PATTERNS)}")
+        unknown = set(densities or {}) - set(LEXICONS)
+        if unknown:
+            raise ValueError(f"Unknown lexicon categories: {', '.join(sorted(unknown))}")
+        self.rng = random.Random(seed)
+        self.turns = turns
+        self.densities = {**DEFAULT_DENSITIES, **(densities or {})}
+        self.sender_pattern = sender_pattern
+        self.words_per_message = words_per_message
+        self.question_rate = question_rate
+        self.response_seconds = response_seconds
+        self.start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.count = 0
+
+    def _turn_count(self):
+        if isinstance(self.turns, int):
+            return self.turns
+        return self.rng.randint(*self.turns)
+
+    def _senders(self, n):
+        rng = self.rng
+        if self.sender_pattern == 'alternating':
+            return ['user' if i % 2 == 0 else 'ai' for i in range(n)]
+        if self.sender_pattern == 'random':
+            return [rng.choice(('user', 'ai')) for _ in range(n)]
+        if self.sender_pattern == 'user_heavy':
+            return ['user' if rng.random() < 0.7 else 'ai' for _ in range(n)]
+        senders, current = [], 'user'
+        while len(senders) < n:
+            senders.extend([current] * rng.randint(1, 4))
+            current = 'ai' if current == 'user' else 'user'
+        return senders[:n]
+
+    def _text(self, sender):
+        rng = self.rng
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(*self.words_per_message))]
+        for category, (category_sender, phrases) in LEXICONS.items():
+            if category_sender == sender and rng.random() < self.densities[category]:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+        text = ' '.join(words)
+        text = text[0].upper() + text[1:]
+        return text + ('?' if rng.random() < self.question_rate else '.')
+
+    def transcript(self):
+        """Return the next transcript dict."""
+        self.count += 1
+        n = self._turn_count()
+        timestamp = self.start + timedelta(minutes=self.count)
+        messages = []
+        for sender in self._senders(n):
+            timestamp += timedelta(seconds=self.rng.randint(*self.response_seconds))
+            messages.append({
+                'sender': sender,
+                'message': self._text(sender),
+                'timestamp': timestamp.isoformat().replace('+00:00', 'Z'),
+            })
+        return {'id': self.count, 'title': f'Synthetic conversation {self.count}', 'messages': messages}
+
+    def transcripts(self, n):
+        return [self.transcript() for _ in range(n)]
+
+
+def to_rows(transcript):
+    """Convert a generated transcript into ``MessageRow`` tuples."""
+    return [
+        MessageRow(m['sender'], m['message'], datetime.fromisoformat(m['timestamp'].replace('Z', '+00:00')))
+        for m in transcript['messages']
+    ]
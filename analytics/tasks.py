@@ -1,18 +1,25 @@
 from celery import shared_task
+from celery.signals import task_postrun
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from .models import Conversation
-from .services import ConversationAnalyzer
+from . import dispatch, instrumentation
+from .models import AnalysisJob, Conversation
+from .services import StreamingConversationAnalyzer, analyze_conversations
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Worker processes never finish a request, so flush their metrics per task
+task_postrun.connect(instrumentation.flush_after_work, dispatch_uid='analytics.tasks.flush_metrics')
+
 @shared_task(name='analytics.tasks.analyze_single_conversation')
 def analyze_single_conversation(conversation_id):
     try:
         conversation = Conversation.objects.get(id=conversation_id)
-        if conversation.messages.count() == 0:
+        if conversation.message_count == 0:
             return {'status':'skipped','conversation_id':conversation_id,'reason':'No messages'}
-        analyzer = ConversationAnalyzer(conversation)
+        analyzer = StreamingConversationAnalyzer(conversation)
         analysis = analyzer.analyze()
         return {'status':'success','conversation_id':conversation_id,'overall_score':analysis.overall_score}
     except Conversation.DoesNotExist:
@@ -22,11 +29,30 @@ def analyze_single_conversation(conversation_id):
         logger.error(f"Error analyzing conversation {conversation_id}: {str(e)}")
         return {'status':'error','conversation_id':conversation_id,'error':str(e)}
 
+@shared_task(name='analytics.tasks.analyze_due_conversations')
+def analyze_due_conversations(token=None):
+    from .scheduling import analyze_due
+    results = analyze_due(token=token)
+    return {'status':'success','analyzed':len(results['success']),
+            'failed':len(results['failed']),'skipped':len(results['skipped'])}
+
+@shared_task(name='analytics.tasks.ensure_due_drain')
+def ensure_due_drain():
+    from .scheduling import ensure_drain
+    return {'status':'success','scheduled':ensure_drain()}
+
 @shared_task(name='analytics.tasks.analyze_pending_conversations')
 def analyze_pending_conversations():
+    # Daily sweeper: the debounced scheduler handles new activity; this
+    # catches anything it missed, leaving conversations still in their
+    # quiet period to the scheduler.
     logger.info(f"Starting batch analysis at {timezone.now()}")
-    pending = Conversation.objects.filter(status='pending').exclude(messages__isnull=True)
+    dispatch.fail_stale_jobs()
+    pending = (Conversation.objects.filter(status='pending').exclude(messages__isnull=True, archived=False)
+               .exclude(analysis_due_at__gt=timezone.now()))
     results = {'total': pending.count(),'success':0,'errors':0,'skipped':0,'timestamp':str(timezone.now())}
+    if instrumentation.is_enabled():
+        instrumentation.BATCH_SIZE.observe(results['total'])
     for conversation in pending:
         res = analyze_single_conversation(conversation.id)
         if res['status']=='success':
@@ -38,6 +64,39 @@ def analyze_pending_conversations():
     logger.info(f"Batch analysis complete: {results['success']} successful, {results['errors']} errors, {results['skipped']} skipped")
     return results
 
+@shared_task(name='analytics.tasks.analyze_job_chunk')
+def analyze_job_chunk(job_id, conversation_ids):
+    """Analyze one chunk of an ``AnalysisJob`` with the bulk path and record progress."""
+    AnalysisJob.objects.filter(id=job_id, status='queued').update(status='running', started_at=timezone.now())
+    try:
+        results = analyze_conversations(conversation_ids)
+    except Exception as e:
+        logger.error(f"Analysis job {job_id} chunk failed: {str(e)}")
+        results = {'success': [], 'skipped': [], 'failed': [{'id': cid, 'error': str(e)} for cid in conversation_ids]}
+    if results['failed']:
+        Conversation.objects.filter(id__in=[f['id'] for f in results['failed']]).update(status='error')
+    with transaction.atomic():
+        # The counter update locks the job row until commit, so the errors
+        # read-modify-write below cannot interleave with another chunk's.
+        AnalysisJob.objects.filter(id=job_id).update(
+            processed=F('processed') + len(conversation_ids),
+            succeeded=F('succeeded') + len(results['success']),
+            failed=F('failed') + len(results['failed']),
+            skipped=F('skipped') + len(results['skipped']),
+            updated_at=timezone.now(),
+        )
+        job = AnalysisJob.objects.select_for_update().filter(id=job_id).first()
+        if job is not None:
+            if results['failed'] and len(job.errors) < 100:
+                job.errors = (job.errors + results['failed'])[:100]
+                job.save(update_fields=['errors'])
+            if job.processed >= job.total:
+                AnalysisJob.objects.filter(id=job_id, status__in=['queued', 'running']).update(
+                    status='failed' if job.failed == job.total else 'completed', finished_at=timezone.now()
+                )
+    return {'status':'success','job_id':job_id,'analyzed':len(results['success']),
+            'failed':len(results['failed']),'skipped':len(results['skipped'])}
+
 @shared_task(name='analytics.tasks.generate_daily_report')
 def generate_daily_report():
     from django.db.models import Avg
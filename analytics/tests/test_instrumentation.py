@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from analytics import instrumentation
+from analytics.models import Conversation, Message, MetricTotal
+from analytics.services import analyze_conversations
+
+
+def other_process():
+    """Metrics with the same names in a separate registry, as a worker process has."""
+    registry = instrumentation.Registry()
+    analyses = instrumentation.Counter('analytics_analyses_total', 'doc', registry=registry)
+    batches = instrumentation.Histogram('analytics_batch_size', 'doc', buckets=instrumentation.SIZE_BUCKETS,
+                                        registry=registry)
+    return registry, analyses, batches
+
+
+class SharedMetricsTests(TestCase):
+    def setUp(self):
+        instrumentation.REGISTRY.discard()
+        self.addCleanup(instrumentation.REGISTRY.discard)
+
+    def scrape(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_scrape_includes_other_processes(self):
+        registry, analyses, batches = other_process()
+        analyses.inc(3)
+        batches.observe(7)
+        registry.flush()
+        self.assertFalse(registry.dirty)
+        instrumentation.ANALYSES.inc(2)
+
+        lines = self.scrape()
+        self.assertIn('analytics_analyses_total 5', lines)
+        self.assertIn('analytics_batch_size_count 1', lines)
+        self.assertIn('analytics_batch_size_bucket{le="10.0"} 1', lines)
+        self.assertFalse(instrumentation.REGISTRY.dirty)
+
+    def test_work_in_a_transaction_flushes_after_commit(self):
+        conversation = Conversation.objects.create(title='t')
+        Message.objects.create(conversation=conversation, sender='user', text='My order is late')
+        analyze_conversations([conversation.id])
+        self.assertTrue(instrumentation.REGISTRY.dirty)
+        with self.captureOnCommitCallbacks(execute=True):
+            instrumentation.flush_after_work()
+            self.assertFalse(MetricTotal.objects.filter(name='analytics_analyses_total').exists())
+        self.assertFalse(instrumentation.REGISTRY.dirty)
+        self.assertEqual(instrumentation.ANALYSES.value(), 1)
+
+    def test_failed_flush_is_retried(self):
+        registry, analyses, _ = other_process()
+        analyses.inc(4)
+        with mock.patch.object(MetricTotal.objects, 'bulk_update', side_effect=DatabaseError), \
+                self.assertLogs('analytics.instrumentation', 'WARNING'):
+            registry.flush()
+        self.assertTrue(registry.dirty)
+        self.assertFalse(MetricTotal.objects.exists())
+        analyses.inc()
+        registry.flush()
+        self.assertEqual(analyses.value(), 5)
+
+
+class MetricsAccessTests(TestCase):
+    def get(self, **headers):
+        return self.client.get(reverse('metrics'), headers=headers)
+
+    def test_requires_staff(self):
+        self.assertEqual(self.get().status_code, 302)
+        self.client.force_login(User.objects.create_user('user', 'user@example.com', 'pw'))
+        self.assertEqual(self.get().status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+        self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(ANALYTICS_METRICS_TOKEN='s3cret')
+    def test_bearer_token(self):
+        self.assertEqual(self.get(Authorization='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.get(Authorization='Bearer wrong').status_code, 302)
+
+    @override_settings(ANALYTICS_METRICS_ENABLED=False, ANALYTICS_METRICS_TOKEN='s3cret')
+    def test_disabled(self):
+        self.assertEqual(self.get(Authorization='Bearer s3cret').status_code, 404)
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from analytics.middleware import PROFILE_STORE
+
+
+@override_settings(ANALYTICS_PROFILING_ENABLED=True, ANALYTICS_PROFILING_SAMPLE_RATE=1.0)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        PROFILE_STORE.clear()
+        self.addCleanup(PROFILE_STORE.clear)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+
+    def report(self, **params):
+        return self.client.get(reverse('profiling-report'), params)
+
+    def endpoints(self):
+        return {row['endpoint']: row for row in self.report().json()['slowest_endpoints']}
+
+    def test_rejects_non_positive_or_non_integer_n(self):
+        for n in ('0', '-3', 'x'):
+            with self.subTest(n=n):
+                self.assertEqual(self.report(n=n).status_code, 400)
+        self.client.get('/api/conversations/')
+        self.client.get(reverse('dashboard'), HTTP_ACCEPT='application/json')
+        self.assertEqual(len(self.report(n=1).json()['slowest_endpoints']), 1)
+
+    def test_serialize_time_only_for_rendered_responses(self):
+        response = self.client.get('/api/conversations/')
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        response = self.client.get(reverse('dashboard'), HTTP_ACCEPT='application/json')
+        self.assertNotIn('serialize;dur=', response['Server-Timing'])
+        endpoints = self.endpoints()
+        self.assertIsInstance(endpoints['GET conversation-list']['mean_serialize_ms'], float)
+        self.assertIsNone(endpoints['GET dashboard']['mean_serialize_ms'])
+
+    def test_unresolved_paths_share_one_entry(self):
+        for i in range(5):
+            self.client.get(f'/no-such-page-{i}/')
+        unresolved = [name for name in self.endpoints() if '<unresolved>' in name]
+        self.assertEqual(unresolved, ['GET <unresolved>'])
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from analytics.offline import analyze_files, score_line
+
+GOOD = {'id': 'ok', 'messages': [
+    {'sender': 'user', 'message': 'My order is late', 'timestamp': 1700000000},
+    {'sender': 'ai', 'message': 'Sorry, I understand. It ships today.', 'timestamp': '2023-11-14T22:14:00'},
+]}
+
+
+class ScoreLineTests(SimpleTestCase):
+    def test_scores_valid_line(self):
+        result = score_line(json.dumps(GOOD))
+        self.assertEqual(result['id'], 'ok')
+        self.assertNotIn('error', result)
+        self.assertIn('overall_score', result)
+
+    def test_naive_and_epoch_timestamps_mix(self):
+        # Epoch seconds are aware UTC; a naive ISO string is taken as UTC too.
+        self.assertEqual(score_line(json.dumps(GOOD))['avg_response_time'], 40.0)
+
+    def test_malformed_lines_are_reported(self):
+        lines = [
+            '{not json',
+            json.dumps({'id': 'empty', 'messages': []}),
+            json.dumps({'id': 'nosender', 'messages': [{'message': 'hi'}]}),
+            json.dumps({'id': 'badts', 'messages': [{'sender': 'user', 'message': 'hi', 'timestamp': 'yesterday'}]}),
+            json.dumps(['not', 'an', 'object']),
+        ]
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertIn('error', score_line(line))
+
+    def test_out_of_range_epoch_is_reported(self):
+        for timestamp in (1e20, -1e20, '1e400'):
+            line = json.dumps({'id': 'far', 'messages': [{'sender': 'user', 'message': 'hi'}]})
+            line = line.replace('"hi"}', '"hi", "timestamp": %s}' % timestamp)
+            with self.subTest(timestamp=timestamp):
+                result = score_line(line)
+                self.assertEqual(result['id'], 'far')
+                self.assertIn('error', result)
+
+
+class AnalyzeFilesTests(SimpleTestCase):
+    def _run(self, workers):
+        lines = [json.dumps(GOOD),
+                 json.dumps({'id': 'far', 'messages': [{'sender': 'user', 'message': 'hi', 'timestamp': 1e20}]}),
+                 json.dumps(dict(GOOD, id='ok2'))]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.unlink, handle.name)
+        out = io.StringIO()
+        counts = analyze_files([handle.name], out, workers=workers)
+        return counts, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_bad_line_does_not_stop_the_run(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                counts, results = self._run(workers)
+                self.assertEqual(counts, (2, 1))
+                self.assertEqual([r['id'] for r in results], ['ok', 'far', 'ok2'])
+                self.assertIn('error', results[1])
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from analytics import routers
+from analytics.middleware import ReplicaPinningMiddleware
+from analytics.models import Conversation
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(routers, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routers.ReplicaRouter()
+
+    def read(self):
+        with routers.use_replica():
+            return self.router.db_for_read(Conversation)
+
+    def request(self, write=False, **cookies):
+        seen = []
+
+        def view(request):
+            seen.append(self.read())
+            if write:
+                self.assertEqual(self.router.db_for_write(Conversation), DEFAULT_DB_ALIAS)
+                seen.append(self.read())
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaPinningMiddleware(view)(request), seen
+
+    def test_only_opted_in_reads_use_the_replica(self):
+        tokens = routers.begin_request()
+        self.addCleanup(routers.end_request, tokens)
+        self.assertIsNone(self.router.db_for_read(Conversation))
+        self.assertEqual(self.read(), 'replica')
+
+    def test_write_pins_the_rest_of_the_request_and_the_next_ones(self):
+        response, seen = self.request(write=True)
+        self.assertEqual(seen, ['replica', None])
+        cookie = response.cookies[ReplicaPinningMiddleware.cookie_name]
+
+        _, seen = self.request(**{cookie.key: cookie.value})
+        self.assertEqual(seen, [None])
+        response, seen = self.request()
+        self.assertEqual(seen, ['replica'])
+        self.assertNotIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
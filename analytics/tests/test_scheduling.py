@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from analytics import dispatch, scheduling
+from analytics.models import Conversation, Message
+from analytics.services import ConversationAnalyzer, analyze_conversations
+
+
+def make_conversations(count):
+    ids = []
+    for i in range(count):
+        conversation = Conversation.objects.create(title=f't{i}')
+        Message.objects.create(conversation=conversation, sender='user', text='My order is late, please help')
+        Message.objects.create(conversation=conversation, sender='ai', text='Sorry, I understand. It ships today.')
+        ids.append(conversation.id)
+    return ids
+
+
+@override_settings(ANALYTICS_AUTO_ANALYZE=True, ANALYTICS_ANALYSIS_DEBOUNCE_SECONDS=300)
+class ExplicitAnalysisTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dispatch, 'runs_inline', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.enqueued = []
+        patcher = mock.patch.object(dispatch, 'enqueue', lambda *args, **kwargs: self.enqueued.append(args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        scheduling.cache.delete(scheduling.DRAIN_LOCK_KEY)
+
+    def due(self, conversation_id):
+        return Conversation.objects.values_list('analysis_due_at', flat=True).get(pk=conversation_id)
+
+    def test_bulk_analysis_clears_due_marker(self):
+        ids = make_conversations(2)
+        scheduling.schedule_analysis(ids)
+        self.assertIsNotNone(self.due(ids[0]))
+        analyze_conversations(ids)
+        self.assertEqual([self.due(cid) for cid in ids], [None, None])
+
+    def test_single_analysis_clears_due_marker(self):
+        cid = make_conversations(1)[0]
+        scheduling.schedule_analysis([cid])
+        ConversationAnalyzer(Conversation.objects.get(pk=cid)).analyze()
+        self.assertIsNone(self.due(cid))
+
+    def test_change_after_load_keeps_due_marker(self):
+        cid = make_conversations(1)[0]
+        analyzer = ConversationAnalyzer(Conversation.objects.get(pk=cid))
+        # A message arriving while the analysis runs, which it did not see.
+        with mock.patch.object(timezone, 'now', return_value=timezone.now() + timedelta(seconds=5)):
+            scheduling.schedule_analysis([cid])
+        due = self.due(cid)
+        analyzer.analyze()
+        self.assertEqual(self.due(cid), due)
+
+    def test_bulk_views_use_a_fixed_number_of_queries(self):
+        def count(path, ids):
+            Conversation.objects.filter(id__in=ids).update(status='pending')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(path)
+            self.assertIn(response.status_code, (200, 302))
+            return len(queries)
+
+        few = make_conversations(2)
+        for path in ('/api/conversations/bulk_analyze/', reverse('trigger-analysis')):
+            with self.subTest(path=path):
+                baseline = count(path, few)
+                more = make_conversations(8)
+                self.assertEqual(count(path, few + more), baseline)
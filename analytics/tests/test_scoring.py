@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from analytics import scoring
+from analytics.scoring import MessageRow, MetricAccumulator, TranscriptScorer
+from analytics.similarity import minhash
+
+WORDS = [
+    'order', 'late', 'sorry', 'understand', 'thanks', 'refund', 'manager', 'help',
+    'please', 'account', 'password', 'shipping', 'resolved', 'frustrated', 'escalate',
+    'happy', 'great', 'terrible', 'appreciate', 'tracking', 'package', 'delivered',
+]
+
+
+def transcript(seed, length=40):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(length):
+        sender = 'user' if i % 2 == 0 or rng.random() < 0.1 else 'ai'
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        if rng.random() < 0.3:
+            text += '?'
+        timestamp = start + timedelta(seconds=30 * i + rng.randint(0, 20)) if rng.random() < 0.9 else None
+        rows.append(MessageRow(sender, text, timestamp))
+    return rows
+
+
+def accumulate(rows):
+    accumulator = MetricAccumulator()
+    for row in rows:
+        accumulator.add(*row)
+    return accumulator
+
+
+class MetricAccumulatorTests(SimpleTestCase):
+    def test_matches_transcript_scorer(self):
+        for seed in range(25):
+            rows = transcript(seed, length=1 + seed * 3)
+            with self.subTest(seed=seed):
+                scorer = TranscriptScorer(rows)
+                accumulator = accumulate(rows)
+                self.assertEqual(accumulator.score(), scorer.score())
+                self.assertEqual(accumulator.signature(), scorer.signature())
+
+    def test_signature_matches_when_word_cache_overflows(self):
+        rows = transcript(7, length=200)
+        expected = TranscriptScorer(rows).signature()
+        with mock.patch.object(scoring, 'SIGNATURE_WORD_CACHE', 5):
+            accumulator = accumulate(rows)
+        self.assertLessEqual(len(accumulator.hashed_words), 5 + 12)
+        self.assertEqual(accumulator.signature(), expected)
+
+    def test_word_cache_is_bounded(self):
+        accumulator = MetricAccumulator()
+        for i in range(scoring.SIGNATURE_WORD_CACHE * 2):
+            accumulator.add('user', f'word{i:06d}', None)
+        self.assertLessEqual(len(accumulator.hashed_words), scoring.SIGNATURE_WORD_CACHE)
+        self.assertEqual(accumulator.signature(), minhash({f'word{i:06d}' for i in range(scoring.SIGNATURE_WORD_CACHE * 2)}))
+
+    def test_no_content_words(self):
+        self.assertIsNone(accumulate([MessageRow('user', 'hi ok', None)]).signature())
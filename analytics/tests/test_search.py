@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from analytics import search
+from analytics.models import Conversation, Message
+from analytics.services import archive_conversations, purge_conversations, rehydrate_conversations
+
+
+def make_conversation(title, *texts):
+    conversation = Conversation.objects.create(title=title)
+    for i, text in enumerate(texts):
+        Message.objects.create(conversation=conversation, sender='user' if i % 2 == 0 else 'ai', text=text)
+    return conversation
+
+
+class ArchivedSearchTests(TestCase):
+    def setUp(self):
+        self.archived = make_conversation('old', 'My parcel never arrived', 'Sorry, the parcel is lost', 'ok')
+        self.live = make_conversation('new', 'Where is my parcel?', 'It ships tomorrow')
+        self.other = make_conversation('other', 'Password reset please', 'Done')
+        archive_conversations([self.archived.id])
+
+    def api_hits(self, term):
+        response = self.client.get('/api/search/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return {hit['conversation_id']: hit['matching_messages'] for hit in response.json()['results']}
+
+    def test_archived_conversation_is_still_found(self):
+        self.assertFalse(Message.objects.filter(conversation=self.archived).exists())
+        self.assertEqual(self.api_hits('parcel'), {self.archived.id: 2, self.live.id: 1})
+        self.assertEqual(self.api_hits('arrived'), {self.archived.id: 1})
+
+    def test_rehydrate_and_archive_again_keep_results(self):
+        rehydrate_conversations([self.archived.id])
+        self.assertEqual(self.api_hits('parcel'), {self.archived.id: 2, self.live.id: 1})
+        archive_conversations([self.archived.id])
+        self.assertEqual(self.api_hits('parcel'), {self.archived.id: 2, self.live.id: 1})
+
+    def test_purge_drops_archived_text(self):
+        purge_conversations([self.archived.id])
+        self.assertEqual(self.api_hits('parcel'), {self.live.id: 1})
+        if search.backend() == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {search.ARCHIVE_FTS_TABLE} WHERE {search.ARCHIVE_FTS_TABLE} MATCH 'parcel'")
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_without_index_archives_are_scanned(self):
+        with mock.patch.object(search, 'backend', return_value=None):
+            self.assertEqual(self.api_hits('parcel'), {self.archived.id: 2, self.live.id: 1})
+
+    def test_admin_search_finds_archived_conversation(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('admin:analytics_conversation_changelist'), {'q': 'arrived'})
+        self.assertEqual([c.id for c in response.context['cl'].result_list], [self.archived.id])
+        with mock.patch.object(search, 'backend', return_value=None):
+            response = self.client.get(reverse('admin:analytics_conversation_changelist'), {'q': 'arrived'})
+        self.assertEqual([c.id for c in response.context['cl'].result_list], [self.archived.id])
+
+        response = self.client.get(reverse('admin:analytics_message_changelist'), {'q': 'parcel'})
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        self.assertIn('1 archived conversations also match', response.content.decode())
+
+
+class MessageIndexSyncTests(TestCase):
+    def hits(self, term):
+        response = self.client.get('/api/search/', {'q': term})
+        return {hit['conversation_id']: hit['matching_messages'] for hit in response.json()['results']}
+
+    def test_index_follows_insert_update_and_delete(self):
+        conversation = make_conversation('t', 'Where is my parcel?')
+        message = Message.objects.create(conversation=conversation, sender='ai', text='The parcel left today')
+        self.assertEqual(self.hits('parcel'), {conversation.id: 2})
+
+        message.text = 'The courier left today'
+        message.save()
+        self.assertEqual(self.hits('parcel'), {conversation.id: 1})
+        self.assertEqual(self.hits('courier'), {conversation.id: 1})
+
+        Message.objects.filter(pk=message.pk).update(text='Refund issued')
+        self.assertEqual(self.hits('courier'), {})
+        self.assertEqual(self.hits('refund'), {conversation.id: 1})
+
+        message.delete()
+        self.assertEqual(self.hits('refund'), {})
+        conversation.delete()
+        self.assertEqual(self.hits('parcel'), {})
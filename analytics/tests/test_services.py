@@ -0,0 +1,139 @@
+import random
+import threading
+import unittest
+
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+
+from analytics.models import Conversation, ConversationAnalysis, Message
+from analytics.scoring import SCORE_WEIGHTS, merge_weights, overall_score
+from analytics.services import (
+    ANALYSIS_FIELDS, add_conversation_message, analyze_conversations, archive_conversations,
+    recompute_overall_scores, rehydrate_conversations,
+)
+
+TEXTS = [
+    'My order is late, please help', 'Sorry, I understand. It ships today.', "I don't know",
+    'This is terrible, I want a manager', 'Thanks, that resolved it!', 'Can you reset my password?',
+    'I apologize, I am not certain', 'Great, appreciate the help', 'Where is my refund?',
+]
+
+
+def make_conversations(count, seed=0):
+    rng = random.Random(seed)
+    ids = []
+    for i in range(count):
+        conversation = Conversation.objects.create(title=f't{i}')
+        for j in range(rng.randint(2, 9)):
+            Message.objects.create(conversation=conversation, sender='user' if j % 2 == 0 else 'ai',
+                                   text=rng.choice(TEXTS))
+        ids.append(conversation.id)
+    return ids
+
+
+class RecomputeOverallScoresTests(TestCase):
+    def python_scores(self, weights):
+        return {
+            row['id']: overall_score(row, weights)
+            for row in ConversationAnalysis.objects.values('id', *weights['components'], 'resolution',
+                                                           'escalation_needed', 'fallback_count')
+        }
+
+    def assertScoresMatch(self, weights):
+        expected = self.python_scores(weights)
+        ConversationAnalysis.objects.update(overall_score=-1)
+        self.assertEqual(recompute_overall_scores(weights=weights), len(expected))
+        actual = dict(ConversationAnalysis.objects.values_list('id', 'overall_score'))
+        for pk, score in expected.items():
+            # SQL ROUND and Python round() may differ by one cent on x.xx5 ties
+            self.assertAlmostEqual(actual[pk], score, delta=0.0100001, msg=f'analysis {pk}')
+
+    def test_sql_matches_python_scorer(self):
+        ids = make_conversations(30)
+        analyze_conversations(ids)
+        analyzed = dict(ConversationAnalysis.objects.values_list('id', 'overall_score'))
+        self.assertEqual(self.python_scores(SCORE_WEIGHTS), analyzed)
+        self.assertScoresMatch(SCORE_WEIGHTS)
+
+    def test_sql_matches_python_scorer_with_custom_weights(self):
+        analyze_conversations(make_conversations(30, seed=1))
+        weights = merge_weights({'version': 99, 'resolution_bonus': 0.2, 'fallback_threshold': 0,
+                                 'components': {'empathy_score': 0.3}})
+        self.assertScoresMatch(weights)
+        self.assertEqual(set(ConversationAnalysis.objects.values_list('score_weights_version', flat=True)), {99})
+
+
+class ArchiveRoundTripTests(TestCase):
+    def setUp(self):
+        self.ids = make_conversations(3)
+        analyze_conversations(self.ids)
+
+    def responses(self, conversation_id):
+        return [self.client.get(f'/api/conversations/{conversation_id}/{suffix}').json()
+                for suffix in ('', 'report/')]
+
+    def without_timestamps(self, responses):
+        # Re-analysis legitimately moves updated_at; everything else must match
+        detail, report = (dict(response) for response in responses)
+        report['conversation'] = dict(report['conversation'])
+        report['analysis'] = dict(report['analysis'])
+        for data in (detail, report['conversation'], report['analysis']):
+            data.pop('updated_at', None)
+        return detail, report
+
+    def test_archive_is_transparent(self):
+        cid = self.ids[0]
+        before = self.responses(cid)
+        analysis = list(ConversationAnalysis.objects.filter(conversation_id=cid).values(*ANALYSIS_FIELDS))
+        messages = list(Message.objects.filter(conversation_id=cid).order_by('sequence_number')
+                        .values_list('id', 'sender', 'text', 'timestamp', 'sequence_number'))
+
+        archive_conversations([cid])
+        self.assertFalse(Message.objects.filter(conversation_id=cid).exists())
+        self.assertEqual(self.responses(cid), before)
+
+        # Re-analyzing the archived transcript scores exactly as the live one did
+        analyze_conversations([cid])
+        self.assertEqual(list(ConversationAnalysis.objects.filter(conversation_id=cid).values(*ANALYSIS_FIELDS)),
+                         analysis)
+
+        rehydrate_conversations([cid])
+        self.assertEqual(list(Message.objects.filter(conversation_id=cid).order_by('sequence_number')
+                              .values_list('id', 'sender', 'text', 'timestamp', 'sequence_number')), messages)
+        self.assertEqual(self.without_timestamps(self.responses(cid)), self.without_timestamps(before))
+
+
+class AddConversationMessageTests(TransactionTestCase):
+    def test_concurrent_appends_get_distinct_sequence_numbers(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise unittest.SkipTest('threads need a file-backed or server database')
+        conversation = Conversation.objects.create(title='t')
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def append(i):
+            try:
+                barrier.wait()
+                for j in range(5):
+                    add_conversation_message(conversation.id, 'user', f'message {i}.{j}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=append, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        numbers = list(Message.objects.filter(conversation=conversation).values_list('sequence_number', flat=True))
+        self.assertEqual(sorted(numbers), list(range(min(numbers), min(numbers) + 40)))
+
+    def test_appends_continue_the_sequence(self):
+        conversation = Conversation.objects.create(title='t')
+        first = add_conversation_message(conversation.id, 'user', 'hello')
+        second = add_conversation_message(conversation.id, 'ai', 'hi')
+        self.assertEqual(second.sequence_number, first.sequence_number + 1)
+        self.assertEqual(Conversation.objects.get(pk=conversation.id).status, 'pending')
+        self.assertIsNone(add_conversation_message(conversation.id + 1, 'user', 'missing'))
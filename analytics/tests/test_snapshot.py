@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from analytics import snapshot
+from analytics.models import Conversation, ConversationAnalysis, Message
+from analytics.services import analyze_conversations
+
+
+@unittest.skipIf(snapshot.np is None, 'requires numpy')
+class BuildSnapshotTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        ids = []
+        for i in range(5):
+            conversation = Conversation.objects.create(title=f't{i}')
+            Message.objects.create(conversation=conversation, sender='user', text='My order is late, please help')
+            Message.objects.create(conversation=conversation, sender='ai', text='Sorry, I understand. Thanks!')
+            ids.append(conversation.id)
+        analyze_conversations(ids)
+
+    def scores(self):
+        snap = snapshot.ScoreSnapshot(self.path)
+        return dict(zip(snap['id'].tolist(), snap['overall_score'].tolist()))
+
+    def test_refresh_picks_up_late_committing_update(self):
+        manifest, _, rebuilt = snapshot.build_snapshot(self.path)
+        self.assertTrue(rebuilt)
+        watermark = parse_datetime(manifest['watermark'])
+        # Stamped before the snapshot's watermark but committed after it.
+        analysis = ConversationAnalysis.objects.order_by('id').first()
+        ConversationAnalysis.objects.filter(pk=analysis.pk).update(
+            overall_score=1.23, updated_at=watermark - timedelta(seconds=10))
+
+        manifest, fetched, rebuilt = snapshot.build_snapshot(self.path)
+        self.assertFalse(rebuilt)
+        self.assertGreaterEqual(fetched, 1)
+        self.assertEqual(self.scores()[analysis.pk], 1.23)
+        self.assertEqual(parse_datetime(manifest['watermark']), watermark)
+
+    def test_refresh_matches_full_rebuild(self):
+        snapshot.build_snapshot(self.path)
+        ConversationAnalysis.objects.filter(pk__in=ConversationAnalysis.objects.order_by('id').values('pk')[:2]).update(
+            overall_score=9.5, updated_at=timezone.now())
+        snapshot.build_snapshot(self.path)
+        refreshed = self.scores()
+        snapshot.build_snapshot(self.path, full=True)
+        self.assertEqual(refreshed, self.scores())
+        self.assertEqual(refreshed, dict(ConversationAnalysis.objects.values_list('id', 'overall_score')))
@@ -0,0 +1,55 @@
+from django.test import TestCase, override_settings
+
+from analytics.models import Conversation, Message
+from analytics.services import analyze_conversations, archive_conversations
+
+
+def make_conversations(count):
+    ids = []
+    for i in range(count):
+        conversation = Conversation.objects.create(title=f't{i}')
+        Message.objects.create(conversation=conversation, sender='user', text='My order is late, please help?')
+        Message.objects.create(conversation=conversation, sender='ai', text='Sorry, I understand. It ships today.')
+        ids.append(conversation.id)
+    return ids
+
+
+class FastSerializationTests(TestCase):
+    def setUp(self):
+        self.ids = make_conversations(3)
+        analyze_conversations(self.ids[:2])
+
+    def content(self, path, fast):
+        with override_settings(ANALYTICS_FAST_SERIALIZATION=fast):
+            response = self.client.get(path)
+        return response.status_code, response.content
+
+    def test_output_is_byte_identical_to_drf(self):
+        paths = ['/api/conversations/', '/api/conversations/?page=2', f'/api/conversations/{self.ids[0]}/',
+                 f'/api/conversations/{self.ids[0]}/report/', f'/api/conversations/{self.ids[2]}/report/',
+                 '/api/conversations/999999/']
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(self.content(path, fast=True), self.content(path, fast=False))
+
+
+class BatchReportTests(TestCase):
+    def post(self, ids, **extra):
+        return self.client.post('/api/reports/batch/', {'ids': ids, **extra}, content_type='application/json')
+
+    def test_fixed_number_of_queries(self):
+        ids = make_conversations(12)
+        analyze_conversations(ids)
+        for count in (1, 12):
+            with self.subTest(count=count), self.assertNumQueries(3):
+                response = self.post(ids[:count])
+            self.assertEqual(response.status_code, 200)
+        for count in (1, 12):
+            with self.subTest(count=count), self.assertNumQueries(3):
+                self.post(ids[:count], include_messages=True)
+        # Archived transcripts cost one more query, however many there are
+        archive_conversations(ids[:2])
+        for count in (1, 12):
+            with self.subTest(count=count, archived=True), self.assertNumQueries(4):
+                response = self.post(ids[:count], include_messages=True)
+            self.assertEqual(response.status_code, 200)
@@ -1,16 +1,28 @@
 from django.urls import path, include
 from django.shortcuts import redirect
 from rest_framework.routers import DefaultRouter
-from .views import ConversationViewSet, analytics_dashboard, trigger_analysis, home
+from . import async_views
+from .views import (
+    ConversationViewSet, analytics_dashboard, trigger_analysis, home, metrics,
+    profiling_report, search_conversations, stream_analyses,
+)
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
 
 urlpatterns = [
     path('', home, name='home'),  
+    path('api/search/', search_conversations, name='search'),
+    path('api/stream/analyses/', stream_analyses, name='analysis-stream'),
+    path('api/reports/batch/', ConversationViewSet.as_view({'post': 'batch_report'}), name='report-batch'),
+    path('api/async/conversations/', async_views.create_conversation, name='async-conversation-create'),
+    path('api/async/conversations/<int:pk>/messages/', async_views.append_message, name='async-message-append'),
+    path('api/async/conversations/<int:pk>/analyze/', async_views.analyze_conversation, name='async-conversation-analyze'),
     path('api/', include(router.urls)),
     path('analyse/', trigger_analysis, name='trigger-analysis'),
     path('dashboard/', analytics_dashboard, name='dashboard'),
+    path('metrics', metrics, name='metrics'),
+    path('debug/profiling/', profiling_report, name='profiling-report'),
     # Add alias for conversation list - redirects to API endpoint
     path('conversations/', lambda request: redirect('/api/conversations/'), name='conversation-list'),
 ]
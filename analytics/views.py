@@ -1,16 +1,32 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from django.db.models import Avg, Count, Q
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .models import Conversation, ConversationAnalysis
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from . import events, fast_serializers, instrumentation, search
+from .middleware import PROFILE_STORE
+from .routers import use_replica
+from .scheduling import schedule_analysis
+from .models import ArchivedTranscript, Conversation, ConversationAnalysis, Message
 from .serializers import (
     ConversationSerializer, ConversationCreateSerializer,
-    ConversationAnalysisSerializer
+    ConversationAnalysisSerializer, MessageSerializer
 )
-from .services import ConversationAnalyzer
+from .services import ConversationAnalyzer, add_conversation_message, analyze_conversations, find_similar
+
+def _analyzable_pending_ids():
+    """Conversations pending or never analyzed that have messages, live or archived."""
+    return list(Conversation.objects.filter(Q(status='pending') | Q(analysis__isnull=True))
+                .exclude(messages__isnull=True, archived=False).order_by('id').values_list('id', flat=True))
 
 class ConversationViewSet(viewsets.ModelViewSet):
     queryset = Conversation.objects.prefetch_related('messages').all()
@@ -21,17 +37,42 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return ConversationCreateSerializer
         return ConversationSerializer
     
+    @use_replica()
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'ANALYTICS_FAST_SERIALIZATION', False):
+            return super().list(request, *args, **kwargs)
+        rows = self._values_queryset()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast_serializers.serialize_conversation_rows(page))
+        return Response(fast_serializers.serialize_conversation_rows(rows))
+    
+    def retrieve(self, request, *args, **kwargs):
+        if not getattr(settings, 'ANALYTICS_FAST_SERIALIZATION', False):
+            return super().retrieve(request, *args, **kwargs)
+        return Response(fast_serializers.serialize_conversation_rows([self._get_object_row()])[0])
+    
+    def _values_queryset(self):
+        return (self.filter_queryset(self.get_queryset()).prefetch_related(None)
+                .values(*fast_serializers.CONVERSATION_COLUMNS))
+    
+    def _get_object_row(self):
+        # get_object() without loading the instance and its prefetched messages
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        return get_object_or_404(self._values_queryset(), **lookup)
+    
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         conv = serializer.save()
+        schedule_analysis([conv.id])
         out = ConversationSerializer(conv)
         return Response(out.data, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['post'])
     def analyze(self, request, pk=None):
         conversation = self.get_object()
-        if conversation.messages.count() == 0:
+        if conversation.message_count == 0:
             return Response({'error':'Cannot analyze conversation with no messages'},
                              status=status.HTTP_400_BAD_REQUEST)
         try:
@@ -43,17 +84,24 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return Response({'error':f'Analysis failed: {str(e)}'},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=True, methods=['post'], url_path='messages')
+    def add_message(self, request, pk=None):
+        conversation = self.get_object()
+        sender, text = request.data.get('sender'), request.data.get('message')
+        if sender not in ('user', 'ai'):
+            return Response({'sender':["sender must be 'user' or 'ai'"]}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(text, str) or not text.strip():
+            return Response({'message':["'message' must be a non-empty string"]}, status=status.HTTP_400_BAD_REQUEST)
+        message = add_conversation_message(conversation.pk, sender, text)
+        if message is None:
+            raise Http404
+        schedule_analysis([conversation.pk])
+        return Response(MessageSerializer(message).data, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['post'])
     def bulk_analyze(self, request):
-        pending = Conversation.objects.filter(Q(status='pending') | Q(analysis__isnull=True)).exclude(messages__isnull=True)
-        results = {'success':[], 'failed':[]}
-        for conv in pending:
-            try:
-                analyzer = ConversationAnalyzer(conv)
-                analyzer.analyze()
-                results['success'].append(conv.id)
-            except Exception as e:
-                results['failed'].append({'id':conv.id, 'error':str(e)})
+        results = analyze_conversations(_analyzable_pending_ids())
+        results = {'success': results['success'], 'failed': results['failed']}
         return Response({
             'total_processed': len(results['success']) + len(results['failed']),
             'successful': len(results['success']),
@@ -62,16 +110,99 @@ class ConversationViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=True, methods=['get'])
+    @use_replica()
     def report(self, request, pk=None):
+        if getattr(settings, 'ANALYTICS_FAST_SERIALIZATION', False):
+            return self._fast_report()
         conversation = self.get_object()
         try:
             analysis = conversation.analysis
         except ConversationAnalysis.DoesNotExist:
             return Response({'error':'No analysis available. Please analyze first.'}, status=status.HTTP_404_NOT_FOUND)
-        insights = {
-            'total_messages': conversation.message_count,
-            'user_messages': conversation.user_message_count,
-            'ai_messages': conversation.ai_message_count,
+        insights = self._get_insights(analysis, conversation.message_count,
+                                      conversation.user_message_count, conversation.ai_message_count)
+        data = {
+            'conversation': ConversationSerializer(conversation).data,
+            'analysis': ConversationAnalysisSerializer(analysis).data,
+            'insights': insights
+        }
+        return Response(data)
+    
+    def _fast_report(self):
+        row = self._get_object_row()
+        analysis = fast_serializers.analysis_values([row['id']]).get(row['id'])
+        if analysis is None:
+            return Response({'error':'No analysis available. Please analyze first.'}, status=status.HTTP_404_NOT_FOUND)
+        conversation = fast_serializers.serialize_conversation_rows([row])[0]
+        senders = [m['sender'] for m in conversation['messages']]
+        return Response({
+            'conversation': conversation,
+            'analysis': fast_serializers.serialize_analysis(analysis),
+            'insights': self._get_insights(analysis, len(senders), senders.count('user'), senders.count('ai')),
+        })
+    
+    @use_replica()
+    def batch_report(self, request):
+        """Reports for up to ANALYTICS_BATCH_REPORT_MAX_IDS conversations in a fixed number of queries.
+
+        Body: ``{"ids": [...], "include_messages": false}``. Without messages
+        this is three queries (analyses, message counts, archive counts)
+        however many ids are given; with them, three or four.
+        """
+        if not isinstance(request.data, dict):
+            return Response({'error':'Body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = request.data.get('ids')
+        limit = getattr(settings, 'ANALYTICS_BATCH_REPORT_MAX_IDS', 500)
+        # Bounded to the signed 64-bit range the database accepts for ids
+        if not isinstance(ids, list) or not all(
+                isinstance(i, int) and not isinstance(i, bool) and -2**63 <= i < 2**63 for i in ids):
+            return Response({'error':"'ids' must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > limit:
+            return Response({'error':f'At most {limit} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+        include_messages = request.data.get('include_messages') is True
+
+        analyses = fast_serializers.analysis_values(ids)
+        found = [cid for cid in ids if cid in analyses]
+        if include_messages:
+            conversations = {c['id']: c for c in fast_serializers.serialize_conversations(found)}
+            counts = {}
+            for cid, conversation in conversations.items():
+                senders = [m['sender'] for m in conversation['messages']]
+                counts[cid] = (len(senders), senders.count('user'), senders.count('ai'))
+        else:
+            counts = {
+                row['conversation_id']: (row['total'], row['user'], row['ai'])
+                for row in Message.objects.filter(conversation_id__in=found).values('conversation_id').annotate(
+                    total=Count('id'), user=Count('id', filter=Q(sender='user')), ai=Count('id', filter=Q(sender='ai')))
+            }
+            counts.update(
+                (row[0], row[1:]) for row in ArchivedTranscript.objects.filter(conversation_id__in=found).values_list(
+                    'conversation_id', 'message_count', 'user_message_count', 'ai_message_count')
+            )
+
+        results = []
+        for cid in found:
+            analysis = analyses[cid]
+            report = {
+                'conversation_id': cid,
+                'analysis': fast_serializers.serialize_analysis(analysis),
+                'insights': self._get_insights(analysis, *counts.get(cid, (0, 0, 0))),
+            }
+            if include_messages:
+                report['conversation'] = conversations[cid]
+            results.append(report)
+        return Response({
+            'count': len(results),
+            'results': results,
+            'missing': [cid for cid in ids if cid not in analyses],
+        })
+    
+    def _get_insights(self, analysis, total_messages, user_messages, ai_messages):
+        return {
+            'total_messages': total_messages,
+            'user_messages': user_messages,
+            'ai_messages': ai_messages,
             'conversation_quality': 'Excellent' if analysis.overall_score>=8 else
                                     'Good' if analysis.overall_score>=6 else
                                     'Fair' if analysis.overall_score>=4 else
@@ -79,12 +210,29 @@ class ConversationViewSet(viewsets.ModelViewSet):
             'key_strengths': self._get_strengths(analysis),
             'areas_for_improvement': self._get_improvements(analysis),
         }
-        data = {
-            'conversation': ConversationSerializer(conversation).data,
-            'analysis': ConversationAnalysisSerializer(analysis).data,
-            'insights': insights
-        }
-        return Response(data)
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        conversation_id = self._get_object_row()['id']
+        try:
+            threshold = float(request.query_params.get('threshold', 0.5))
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({'error':"'threshold' must be a number and 'limit' an integer"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            matches = find_similar(conversation_id, threshold=threshold, limit=limit)
+        except ConversationAnalysis.DoesNotExist:
+            return Response({'error':'No analysis available. Please analyze first.'}, status=status.HTTP_404_NOT_FOUND)
+        titles = Conversation.objects.in_bulk([cid for cid, _ in matches])
+        return Response({
+            'conversation_id': conversation_id,
+            'threshold': threshold,
+            'results': [
+                {'conversation_id': cid, 'title': titles[cid].title, 'similarity': round(score, 4)}
+                for cid, score in matches if cid in titles
+            ],
+        })
     
     def _get_strengths(self, analysis):
         strengths = []
@@ -112,7 +260,10 @@ class ConversationViewSet(viewsets.ModelViewSet):
             improvements.append('Consider human handoff')
         return improvements or ['Continue maintaining quality']
 
-def analytics_dashboard(request):
+DASHBOARD_CACHE_KEY = 'analytics:dashboard-summary'
+
+@use_replica()
+def dashboard_summary():
     total_conversations = Conversation.objects.count()
     analyzed = ConversationAnalysis.objects.count()
     pending = Conversation.objects.filter(status='pending').count()
@@ -147,7 +298,7 @@ def analytics_dashboard(request):
         escalation_rate = 0
         resolution_rate = 0
     
-    context = {
+    return {
         'overview': {
             'total_conversations': total_conversations,
             'analyzed': analyzed,
@@ -160,6 +311,16 @@ def analytics_dashboard(request):
             'escalation_rate': round(escalation_rate, 2),
         }
     }
+
+def cached_dashboard_summary():
+    """:func:`dashboard_summary`, shared by all streams in the process for one push interval."""
+    return cache.get_or_set(
+        DASHBOARD_CACHE_KEY, dashboard_summary, getattr(settings, 'ANALYTICS_STREAM_DASHBOARD_SECONDS', 30)
+    )
+
+@use_replica()
+def analytics_dashboard(request):
+    context = dashboard_summary()
     
     # Check if request wants JSON (API call)
     if request.META.get('HTTP_ACCEPT', '').find('application/json') != -1:
@@ -167,33 +328,49 @@ def analytics_dashboard(request):
     
     return render(request, 'analytics/dashboard.html', context)
 
+@require_GET
+def stream_analyses(request):
+    """Server-Sent Events: ``analysis`` events as analyses complete, plus ``dashboard`` deltas.
+
+    ``?conversation=1,2`` limits analysis events to those conversations and
+    ``?dashboard=0`` turns the dashboard deltas off. Resumes after the
+    ``Last-Event-ID`` header (or ``?last_event_id=``).
+    """
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+        conversation_ids = [int(i) for i in request.GET.get('conversation', '').split(',') if i.strip()]
+    except ValueError:
+        return JsonResponse({'error':"'Last-Event-ID' and 'conversation' must be integers"}, status=400)
+    dashboard = cached_dashboard_summary if request.GET.get('dashboard') != '0' else None
+    stream = events.astream if isinstance(request, ASGIRequest) else events.stream
+    response = StreamingHttpResponse(
+        stream(last_event_id, conversation_ids, dashboard), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def trigger_analysis(request):
     if request.method == 'POST':
         conversation_id = request.POST.get('conversation_id')
         if conversation_id:
             try:
                 conversation = Conversation.objects.get(id=conversation_id)
-                analyzer = ConversationAnalyzer(conversation)
-                analysis = analyzer.analyze()
-                messages.success(request, f'Analysis completed for conversation {conversation_id}')
-                return redirect('trigger-analysis')
-            except Conversation.DoesNotExist:
+            except (Conversation.DoesNotExist, ValueError):
                 messages.error(request, 'Conversation not found')
                 return redirect('trigger-analysis')
-            except Exception as e:
-                messages.error(request, f'Analysis failed: {str(e)}')
-                return redirect('trigger-analysis')
+            results = analyze_conversations([conversation.id])
+            if results['success']:
+                messages.success(request, f'Analysis completed for conversation {conversation_id}')
+            elif results['failed']:
+                messages.error(request, f"Analysis failed: {results['failed'][0]['error']}")
+            else:
+                messages.error(request, 'Cannot analyze conversation with no messages')
+            return redirect('trigger-analysis')
         else:
             # Trigger bulk analysis
-            pending = Conversation.objects.filter(Q(status='pending') | Q(analysis__isnull=True)).exclude(messages__isnull=True)
-            results = {'success':[], 'failed':[]}
-            for conv in pending:
-                try:
-                    analyzer = ConversationAnalyzer(conv)
-                    analyzer.analyze()
-                    results['success'].append(conv.id)
-                except Exception as e:
-                    results['failed'].append({'id':conv.id, 'error':str(e)})
+            results = analyze_conversations(_analyzable_pending_ids())
             
             total = len(results['success']) + len(results['failed'])
             successful = len(results['success'])
@@ -215,3 +392,44 @@ def trigger_analysis(request):
 def home(request):
     return render(request, 'analytics/home.html')
 
+
+def _metrics_response(request):
+    return HttpResponse(instrumentation.REGISTRY.render(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def metrics(request):
+    if not instrumentation.is_enabled():
+        raise Http404('Metrics are disabled')
+    # Staff only, like the other internal endpoints; scrapers that cannot log
+    # in send ANALYTICS_METRICS_TOKEN as a bearer token instead
+    token = getattr(settings, 'ANALYTICS_METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return _metrics_response(request)
+    return staff_member_required(_metrics_response)(request)
+
+
+@staff_member_required
+def profiling_report(request):
+    if not getattr(settings, 'ANALYTICS_PROFILING_ENABLED', False):
+        raise Http404('Profiling is disabled')
+    try:
+        top_n = int(request.GET.get('n', getattr(settings, 'ANALYTICS_PROFILING_TOP_N', 20)))
+    except ValueError:
+        top_n = 0
+    if top_n < 1:
+        return JsonResponse({'error':"'n' must be a positive integer"}, status=400)
+    return JsonResponse({'slowest_endpoints': PROFILE_STORE.top(top_n)})
+
+
+@api_view(['GET'])
+def search_conversations(request):
+    query = request.query_params.get('q', '').strip()
+    if not search.tokens(query):
+        return Response({'error':"Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+    except ValueError:
+        return Response({'error':"'limit' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    results = search.search_conversations(query, limit=limit)
+    return Response({'query': query, 'count': len(results), 'results': results})
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the analytics app.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root. Benchmarks run against a throwaway SQLite database and never touch
+``db.sqlite3``.
+"""
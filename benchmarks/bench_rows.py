@@ -0,0 +1,55 @@
+"""Compare loading a transcript as ORM objects versus ``MessageRow`` tuples.
+
+    python -m benchmarks.bench_rows --turns 500 --conversations 20
+"""
+import argparse
+import json
+
+from benchmarks.common import create_conversation, measure, setup_django
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--conversations', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from analytics.services import ConversationAnalyzer, load_message_rows
+    conversations = [create_conversation(args.turns, title=f'bench {i}') for i in range(args.conversations)]
+
+    def load_models():
+        for conv in conversations:
+            list(conv.messages.all().order_by('sequence_number'))
+
+    def load_rows():
+        for conv in conversations:
+            load_message_rows(conv)
+
+    def analyze_models():
+        for conv in conversations:
+            rows = list(conv.messages.all().order_by('sequence_number'))
+            ConversationAnalyzer(conv, rows=rows).compute_metrics()
+
+    def analyze_rows():
+        for conv in conversations:
+            ConversationAnalyzer(conv).compute_metrics()
+
+    results = {}
+    for name, fn in [('load_models', load_models), ('load_rows', load_rows),
+                     ('analyze_models', analyze_models), ('analyze_rows', analyze_rows)]:
+        seconds, peak = measure(fn, repeat=args.repeat)
+        results[name] = {
+            'seconds_per_conversation': seconds / args.conversations,
+            # conversations are processed one at a time, so the peak is per transcript
+            'peak_bytes': peak,
+        }
+    results['load_speedup'] = (results['load_models']['seconds_per_conversation']
+                               / results['load_rows']['seconds_per_conversation'])
+    results['load_memory_ratio'] = results['load_models']['peak_bytes'] / results['load_rows']['peak_bytes']
+    print(json.dumps({'turns': args.turns, 'conversations': args.conversations, **results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
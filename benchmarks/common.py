@@ -0,0 +1,96 @@
+import atexit
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(db_name=None):
+    """Configure Django against a fresh SQLite file and apply migrations."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conversation_Analytics.settings')
+    import django
+    from django.conf import settings
+    if db_name is None:
+        fd, db_name = tempfile.mkstemp(prefix='analytics-bench-', suffix='.sqlite3')
+        os.close(fd)
+        atexit.register(os.remove, db_name)
+    from analytics.loadtest import sqlite_concurrency_options
+    settings.DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': db_name,
+        'OPTIONS': {**settings.DATABASES['default'].get('OPTIONS', {}), **sqlite_concurrency_options()},
+    }
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_name
+
+
+def create_conversation(turns, title='bench'):
+    """Insert an alternating user/ai conversation with ``turns`` messages."""
+    from django.utils import timezone
+    from analytics.models import Conversation, Message
+    conv = Conversation.objects.create(title=title)
+    start = timezone.now()
+    Message.objects.bulk_create([
+        Message(
+            conversation=conv,
+            sender='user' if i % 2 == 0 else 'ai',
+            text=(f"Message {i}: could you help me with order {i}?" if i % 2 == 0
+                  else f"Sure, I understand. Order {i} has shipped and should arrive soon."),
+            timestamp=start + timedelta(seconds=i * 3),
+            sequence_number=i + 1,
+        )
+        for i in range(turns)
+    ], batch_size=1000)
+    return conv
+
+
+def insert_transcript(transcript):
+    """Insert a generated transcript (``analytics.synthetic`` shape) directly."""
+    from datetime import datetime
+    from analytics.models import Conversation, Message
+    conv = Conversation.objects.create(title=transcript.get('title', ''))
+    Message.objects.bulk_create([
+        Message(
+            conversation=conv,
+            sender=m['sender'],
+            text=m['message'],
+            timestamp=datetime.fromisoformat(m['timestamp'].replace('Z', '+00:00')),
+            sequence_number=i,
+        )
+        for i, m in enumerate(transcript['messages'], start=1)
+    ], batch_size=1000)
+    return conv
+
+
+def best_time(fn, repeat=5, setup=None):
+    """Return the best wall time (s) of ``fn()`` over ``repeat`` runs.
+
+    With ``setup``, each run calls ``fn(setup())`` and only ``fn`` is timed,
+    so per-run state (e.g. fresh scorers with empty caches) is not reused.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(fn, repeat=5):
+    """Return best wall time (s) and peak traced allocation (bytes) of ``fn()``."""
+    best = best_time(fn, repeat)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
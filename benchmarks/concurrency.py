@@ -0,0 +1,171 @@
+"""Concurrent-connection benchmark: sync endpoints under WSGI vs async under ASGI.
+
+Both applications are driven in-process, so no server is needed. The WSGI
+side models a fixed pool of sync workers (``--wsgi-workers`` threads) that
+``--concurrency`` clients queue for; the ASGI side serves every client
+from one event loop. Each client creates a conversation, appends messages
+and analyzes it. Reports throughput and latency percentiles per path.
+
+    python -m benchmarks.concurrency --concurrency 64 --wsgi-workers 4 --conversations 200
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _summary(latencies, seconds, errors):
+    from analytics.loadtest import percentile
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def _session(payload, extra_messages):
+    """The request sequence one client sends: ``[(path_template, body), ...]``."""
+    steps = [('{base}/', payload)]
+    steps += [('{base}/{id}/messages/', message) for message in extra_messages]
+    steps.append(('{base}/{id}/analyze/', None))
+    return steps
+
+
+def run_wsgi(sessions, concurrency, workers):
+    from django.core.wsgi import get_wsgi_application
+    app = get_wsgi_application()
+
+    def request(path, body):
+        raw = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': path, 'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(raw)),
+            'wsgi.input': io.BytesIO(raw), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        status = []
+        chunks = app(environ, lambda s, headers, exc_info=None: status.append(int(s[:3])))
+        content = b''.join(chunks)
+        return status[0], content
+
+    # Clients hold one request at a time; the pool caps how many are served.
+    pool = ThreadPoolExecutor(workers)
+    latencies, errors = [], 0
+
+    def client(session):
+        nonlocal errors
+        conversation_id = None
+        for template, body in session:
+            # A request waits for a free worker, which is part of its latency.
+            start = time.perf_counter()
+            status, content = pool.submit(request, template.format(base='/api/conversations', id=conversation_id), body).result()
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+                return
+            if conversation_id is None:
+                conversation_id = json.loads(content)['id']
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        list(clients.map(client, sessions))
+    seconds = time.perf_counter() - start
+    pool.shutdown()
+    return _summary(latencies, seconds, errors)
+
+
+def run_asgi(sessions, concurrency):
+    from django.core.asgi import get_asgi_application
+    app = get_asgi_application()
+
+    async def request(path, body):
+        raw = json.dumps(body).encode() if body is not None else b''
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'POST', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(raw)).encode())],
+        }
+        pending = [{'type': 'http.request', 'body': raw, 'more_body': False}]
+        disconnected = asyncio.Event()
+        response = {'body': b''}
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+
+        await app(scope, receive, send)
+        disconnected.set()
+        return response['status'], response['body']
+
+    async def main():
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def client(session):
+            nonlocal errors
+            async with semaphore:
+                conversation_id = None
+                for template, body in session:
+                    start = time.perf_counter()
+                    status, content = await request(template.format(base='/api/async/conversations', id=conversation_id), body)
+                    latencies.append(time.perf_counter() - start)
+                    if status >= 400:
+                        errors += 1
+                        return
+                    if conversation_id is None:
+                        conversation_id = json.loads(content)['id']
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for session in sessions))
+        return _summary(latencies, time.perf_counter() - start, errors)
+
+    return asyncio.run(main())
+
+
+def main(argv=None):
+    from analytics.synthetic import TranscriptGenerator
+    from benchmarks.common import setup_django
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--appends', type=int, default=3,
+                        help='Messages appended to each conversation after creating it')
+    parser.add_argument('--concurrency', type=int, default=64, help='Simultaneous clients')
+    parser.add_argument('--wsgi-workers', type=int, default=4, help='Sync workers serving the WSGI path')
+    args = parser.parse_args(argv)
+    setup_django()
+    generator = TranscriptGenerator(seed=args.seed, turns=args.turns + args.appends)
+    sessions = []
+    for transcript in generator.transcripts(args.conversations):
+        messages = [{'sender': m['sender'], 'message': m['message']} for m in transcript['messages']]
+        sessions.append(_session({'title': transcript['title'], 'messages': messages[:args.turns]},
+                                 messages[args.turns:]))
+    results = {
+        'config': vars(args),
+        'wsgi': run_wsgi(sessions, args.concurrency, args.wsgi_workers),
+        'asgi': run_asgi(sessions, args.concurrency),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Macrobenchmarks: API create, bulk_analyze, dashboard, list and report.
+
+Each scenario goes through the Django test client against SQLite and
+records wall time and the number of SQL queries issued.
+
+    python -m benchmarks.macro --conversations 50 --turns 40
+"""
+import argparse
+import json
+import time
+
+
+def _timed(client_call, count=1):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(count):
+            response = client_call()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{response.status_code}: {response.content[:200]!r}")
+        seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'requests': count,
+        'per_request_ms': seconds / count * 1000,
+        'queries': len(queries),
+        'queries_per_request': len(queries) / count,
+    }
+
+
+def run(generator, conversations=50):
+    """Return ``{name: {...timings and query counts...}}`` for each scenario.
+
+    Requires ``benchmarks.common.setup_django()`` to have been called.
+    """
+    from django.test import Client
+    client = Client()
+    payloads = [
+        {'title': t['title'], 'messages': [{'sender': m['sender'], 'message': m['message']}
+                                           for m in t['messages']]}
+        for t in generator.transcripts(conversations)
+    ]
+    created = []
+
+    def create():
+        response = client.post('/api/conversations/', payloads[len(created)], content_type='application/json')
+        created.append(response.json()['id'])
+        return response
+
+    results = {'macro.create': _timed(create, conversations)}
+    results['macro.bulk_analyze'] = _timed(lambda: client.post('/api/conversations/bulk_analyze/'))
+    results['macro.dashboard'] = _timed(
+        lambda: client.get('/dashboard/', HTTP_ACCEPT='application/json'), 20)
+    results['macro.list'] = _timed(lambda: client.get('/api/conversations/'), 20)
+    report_ids = iter(created)
+    results['macro.report'] = _timed(
+        lambda: client.get(f'/api/conversations/{next(report_ids)}/report/'), len(created))
+    return results
+
+
+def main(argv=None):
+    from analytics.synthetic import TranscriptGenerator
+    from benchmarks.common import setup_django
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--conversations', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=40)
+    args = parser.parse_args(argv)
+    setup_django()
+    generator = TranscriptGenerator(seed=args.seed, turns=args.turns)
+    print(json.dumps(run(generator, args.conversations), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Microbenchmarks: each metric, the one-pass accumulator and ``analyze()``.
+
+    python -m benchmarks.micro --transcripts 200 --turns 40
+"""
+import argparse
+import json
+
+from benchmarks.common import best_time
+
+
+def run(generator, transcripts=200, repeat=5, analyze_conversations=20):
+    """Return ``{name: {'seconds': ..., 'per_transcript_us': ...}}``.
+
+    Pure-Python metrics run without Django; ``analyze`` needs
+    ``benchmarks.common.setup_django()`` to have been called first.
+    """
+    from analytics.scoring import MetricAccumulator, TranscriptScorer
+    from analytics.synthetic import to_rows
+
+    corpus = [to_rows(t) for t in generator.transcripts(transcripts)]
+    results = {}
+
+    def record(name, seconds, count):
+        results[name] = {'seconds': seconds, 'per_transcript_us': seconds / count * 1e6}
+
+    def fresh_scorers():
+        # New scorers per run: word sets cached by an earlier run would
+        # leave tokenization out of the timings.
+        return [TranscriptScorer(rows) for rows in corpus]
+
+    for _, metric in TranscriptScorer.METRICS:
+        record(f'micro.{metric.lstrip("_")}',
+               best_time(lambda scorers: [getattr(s, metric)() for s in scorers], repeat, setup=fresh_scorers),
+               len(corpus))
+
+    record('micro.score', best_time(lambda: [TranscriptScorer(rows).score() for rows in corpus], repeat), len(corpus))
+
+    def accumulate():
+        for rows in corpus:
+            accumulator = MetricAccumulator()
+            for row in rows:
+                accumulator.add(*row)
+            accumulator.score()
+    record('micro.accumulator', best_time(accumulate, repeat), len(corpus))
+
+    if analyze_conversations:
+        from analytics.services import ConversationAnalyzer
+        from benchmarks.common import insert_transcript
+        conversations = [insert_transcript(t) for t in generator.transcripts(analyze_conversations)]
+        record('micro.analyze',
+               best_time(lambda: [ConversationAnalyzer(c).analyze() for c in conversations], repeat),
+               len(conversations))
+    return results
+
+
+def main(argv=None):
+    from analytics.synthetic import TranscriptGenerator
+    from benchmarks.common import setup_django
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--transcripts', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    setup_django()
+    generator = TranscriptGenerator(seed=args.seed, turns=args.turns)
+    print(json.dumps(run(generator, args.transcripts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
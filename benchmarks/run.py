@@ -0,0 +1,98 @@
+"""Run the micro and macro benchmark suites and emit JSON.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline baseline.json --max-regression 0.2
+
+With ``--baseline`` every timing is compared with the stored run and the
+command exits non-zero if any got slower by more than ``--max-regression``
+or issued more queries. ``--save-baseline`` writes the current run as the
+new baseline.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import macro, micro
+from benchmarks.common import setup_django
+
+
+def compare(current, baseline, max_regression):
+    """Return ``(report_lines, regressed)`` comparing two ``results`` dicts."""
+    lines, regressed = [], False
+    for name in sorted(current):
+        if name not in baseline:
+            lines.append(f"{name:32} new")
+            continue
+        now, then = current[name], baseline[name]
+        ratio = now['seconds'] / then['seconds'] if then['seconds'] else 1.0
+        flag = ''
+        if ratio > 1 + max_regression:
+            flag, regressed = ' SLOWER', True
+        if now.get('queries', 0) > then.get('queries', 0):
+            flag, regressed = flag + ' MORE-QUERIES', True
+        queries = f" queries {then['queries']}->{now['queries']}" if 'queries' in now else ''
+        lines.append(f"{name:32} {ratio:6.2f}x{queries}{flag}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--turns', type=int, default=40, help='Messages per synthetic transcript')
+    parser.add_argument('--sender-pattern', default='alternating')
+    parser.add_argument('--transcripts', type=int, default=200, help='Corpus size for microbenchmarks')
+    parser.add_argument('--conversations', type=int, default=50, help='Conversations for macrobenchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='Compare against this results JSON')
+    parser.add_argument('--save-baseline', help='Also write the results to this path')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed slowdown ratio before failing (default: 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    import django
+    from analytics.synthetic import TranscriptGenerator
+
+    def generator():
+        return TranscriptGenerator(seed=args.seed, turns=args.turns, sender_pattern=args.sender_pattern)
+
+    results = {}
+    results.update(micro.run(generator(), args.transcripts, args.repeat))
+    results.update(macro.run(generator(), args.conversations))
+    run = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'config': {k: v for k, v in vars(args).items()
+                       if k not in ('output', 'baseline', 'save_baseline', 'max_regression')},
+        },
+        'results': results,
+    }
+    payload = json.dumps(run, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload + '\n')
+    else:
+        print(payload)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as fh:
+            fh.write(payload + '\n')
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline['meta']['config'] != run['meta']['config']:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+        lines, regressed = compare(results, baseline['results'], args.max_regression)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
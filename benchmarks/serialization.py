@@ -0,0 +1,75 @@
+"""Serialization throughput: DRF serializers vs the values()-based fast path.
+
+Builds report-shaped payloads (conversation with messages plus analysis)
+for ``--conversations`` transcripts of ``--turns`` messages each, then
+renders them with DRF's ``JSONRenderer`` and ``FastJSONRenderer``. Payloads
+are checked to be identical before timing.
+
+    python -m benchmarks.serialization --conversations 20 --turns 500
+"""
+import argparse
+import json
+import time
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(ids, repeat=5):
+    from analytics import fast_serializers
+    from analytics.models import Conversation
+    from analytics.renderers import FastJSONRenderer, orjson
+    from analytics.serializers import ConversationAnalysisSerializer, ConversationSerializer
+    from rest_framework.renderers import JSONRenderer
+
+    def drf():
+        conversations = Conversation.objects.filter(id__in=ids).prefetch_related('messages').select_related('analysis')
+        return [{'conversation': ConversationSerializer(c).data,
+                 'analysis': ConversationAnalysisSerializer(c.analysis).data} for c in conversations.order_by('id')]
+
+    def fast():
+        analyses = fast_serializers.analysis_values(ids)
+        return [{'conversation': conversation, 'analysis': fast_serializers.serialize_analysis(analyses[conversation['id']])}
+                for conversation in fast_serializers.serialize_conversations(sorted(ids))]
+
+    expected, actual = JSONRenderer().render(drf()), JSONRenderer().render(fast())
+    if expected != actual:
+        raise RuntimeError('fast serialization output differs from DRF serializers')
+    messages = sum(len(item['conversation']['messages']) for item in fast())
+    payload = fast()
+    results = {}
+    for name, fn in (('drf_serializers', drf), ('fast_serializers', fast)):
+        seconds = _best(fn, repeat)
+        results[f'serialize.{name}_ms'] = seconds * 1000
+        results[f'serialize.{name}_messages_per_s'] = messages / seconds
+    for name, renderer in (('json_renderer', JSONRenderer()), ('fast_json_renderer', FastJSONRenderer())):
+        seconds = _best(lambda: renderer.render(payload), repeat)
+        results[f'render.{name}_ms'] = seconds * 1000
+        results[f'render.{name}_mb_per_s'] = len(actual) / seconds / 1e6
+    results['render.orjson_available'] = orjson is not None
+    results['payload_bytes'] = len(actual)
+    return results
+
+
+def main(argv=None):
+    from benchmarks.common import create_conversation, setup_django
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=20)
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    setup_django()
+    from analytics.services import analyze_conversations
+    ids = [create_conversation(args.turns, title=f'serialize {i}').id for i in range(args.conversations)]
+    analyze_conversations(ids)
+    print(json.dumps(run(ids, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
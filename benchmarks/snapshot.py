@@ -0,0 +1,91 @@
+"""Query latency over a synthetic score snapshot (analytics.snapshot).
+
+Writes ``--rows`` random analyses straight to .npy columns (no database),
+then times memory-mapped filter + histogram, correlation and aggregate
+queries, taking the best of ``--repeat`` runs. Needs NumPy.
+
+    python -m benchmarks.snapshot --rows 10000000
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+
+def synthesize(path, rows, seed=0):
+    import numpy as np
+    from analytics import snapshot
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2024-01-01T00:00:00', 'us')
+    created = start + np.sort(rng.integers(0, 365 * 86400 * 10**6, rows)).astype('timedelta64[us]')
+    columns = {
+        'id': np.arange(1, rows + 1, dtype='int64'),
+        'conversation_id': np.arange(1, rows + 1, dtype='int64'),
+        'created_at': created,
+        'updated_at': created,
+        'fallback_count': rng.poisson(0.5, rows).astype('int32'),
+        'resolution': rng.random(rows) < 0.6,
+        'escalation_needed': rng.random(rows) < 0.1,
+        'sentiment': rng.integers(0, len(snapshot.SENTIMENTS), rows).astype('int8'),
+        'analyzer_version': np.full(rows, 2, dtype='int32'),
+        'score_weights_version': np.ones(rows, dtype='int32'),
+        'avg_response_time': rng.exponential(4.0, rows),
+    }
+    for name in ('clarity_score', 'relevance_score', 'accuracy_score', 'completeness_score',
+                 'empathy_score', 'coherence_score', 'professionalism_score'):
+        columns[name] = rng.beta(5, 2, rows)
+    columns['overall_score'] = np.minimum(10.0, 10 * (columns['clarity_score'] + columns['empathy_score']) / 2)
+    snapshot._write(path, {name: columns[name] for name in snapshot.COLUMNS}, None)
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(path, repeat=5):
+    from datetime import datetime, timezone
+    from analytics.snapshot import ScoreSnapshot
+    snap = ScoreSnapshot(path)
+    since = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    queries = {
+        'histogram_all': lambda: snap.histogram('overall_score', bins=50, range=(0, 10)),
+        'filter_histogram': lambda: snap.histogram(
+            'overall_score', bins=50, range=(0, 10),
+            mask=snap.where(sentiment='negative', created_at__gte=since, resolution=False)),
+        'correlation_4': lambda: snap.correlation(
+            ['clarity_score', 'empathy_score', 'avg_response_time', 'overall_score']),
+        'cohort_compare': lambda: snap.compare(
+            'overall_score', snap.where(escalation_needed=True), snap.where(escalation_needed=False)),
+    }
+    return {f'snapshot.{name}_ms': _best(fn, repeat) for name, fn in queries.items()}
+
+
+def main(argv=None):
+    from benchmarks.common import ROOT
+    import sys
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    path = tempfile.mkdtemp(prefix='analytics-snapshot-')
+    try:
+        start = time.perf_counter()
+        synthesize(path, args.rows, args.seed)
+        results = {'rows': args.rows, 'synthesize_seconds': time.perf_counter() - start}
+        results.update(run(path, args.repeat))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
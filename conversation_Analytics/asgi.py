@@ -0,0 +1,18 @@
+"""
+ASGI config for conversation_Analytics project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with any ASGI server, e.g. ``uvicorn conversation_Analytics.asgi:application``;
+the async ingestion endpoints under /api/async/ then run on the event loop.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conversation_Analytics.settings')
+
+application = get_asgi_application()
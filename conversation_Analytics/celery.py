@@ -2,7 +2,7 @@ import os
 from celery import Celery
 from celery.schedules import crontab
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conversation_analytics.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conversation_Analytics.settings')
 
 app = Celery('conversation_analytics')
 app.config_from_object('django.conf:settings', namespace='CELERY')
@@ -13,6 +13,12 @@ def debug_task(self):
     print(f'Request: {self.request!r}')
 
 app.conf.beat_schedule = {
+    # Safety net for the self-chaining debounced scheduler: re-arms a lost
+    # chain, never runs a drain itself
+    'ensure-due-drain': {
+        'task': 'analytics.tasks.ensure_due_drain',
+        'schedule': 60.0,
+    },
     'analyze-pending-daily': {
         'task': 'analytics.tasks.analyze_pending_conversations',
         'schedule': crontab(hour=0, minute=0),
@@ -23,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'analytics.middleware.QueryProfilingMiddleware',
+    'analytics.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,6 +54,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'conversation_Analytics.wsgi.application'
+ASGI_APPLICATION = 'conversation_Analytics.asgi.application'
 
 DATABASES = {
     'default': {
@@ -60,6 +63,21 @@ DATABASES = {
     }
 }
 
+# Optional read replica for dashboard, report and listing reads (see
+# analytics.routers). ANALYTICS_REPLICA_DB names its SQLite file, which is
+# enough to try the routing locally; point it at a real replica elsewhere.
+if os.environ.get('ANALYTICS_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['ANALYTICS_REPLICA_DB'],
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        'TEST': {'MIRROR': 'default'},
+    }
+ANALYTICS_REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+# Seconds a client's reads stay on the primary after it writes
+ANALYTICS_REPLICA_PIN_SECONDS = int(os.environ.get('ANALYTICS_REPLICA_PIN_SECONDS', 5))
+DATABASE_ROUTERS = ['analytics.routers.ReplicaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -82,11 +100,32 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Build conversation list/detail/report responses from values() rows instead
+# of nested DRF serializers; the JSON is identical
+ANALYTICS_FAST_SERIALIZATION = os.environ.get('ANALYTICS_FAST_SERIALIZATION', 'False') == 'True'
+# Render API JSON with orjson when installed (see analytics.renderers)
+ANALYTICS_FAST_JSON = os.environ.get('ANALYTICS_FAST_JSON', 'False') == 'True'
+
+# Maximum conversation ids accepted by POST /api/reports/batch/
+ANALYTICS_BATCH_REPORT_MAX_IDS = int(os.environ.get('ANALYTICS_BATCH_REPORT_MAX_IDS', 500))
+
+# Analysis event stream (GET /api/stream/analyses/, see analytics.events):
+# events kept for Last-Event-ID resume, how often open streams check the log
+# for events from other processes, dashboard delta interval, and how long one
+# response lasts before the client reconnects. Each open stream holds a
+# thread for that long, so serve streams over ASGI; under WSGI it is a whole
+# worker, hence the short default
+ANALYTICS_EVENT_LOG_SIZE = int(os.environ.get('ANALYTICS_EVENT_LOG_SIZE', 10000))
+ANALYTICS_STREAM_POLL_SECONDS = float(os.environ.get('ANALYTICS_STREAM_POLL_SECONDS', 5))
+ANALYTICS_STREAM_DASHBOARD_SECONDS = float(os.environ.get('ANALYTICS_STREAM_DASHBOARD_SECONDS', 30))
+ANALYTICS_STREAM_MAX_SECONDS = float(os.environ.get('ANALYTICS_STREAM_MAX_SECONDS', 60))
+ANALYTICS_STREAM_RETRY_MS = int(os.environ.get('ANALYTICS_STREAM_RETRY_MS', 3000))
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'analytics.renderers.FastJSONRenderer' if ANALYTICS_FAST_JSON else 'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
@@ -97,11 +136,80 @@ CRONJOBS = [
     ('0 0 * * *', 'analytics.cron.run_daily_analysis', '>> /tmp/cron_analysis.log 2>&1')
 ]
 
+# Where background analysis runs: 'celery' (a worker, or inline when
+# CELERY_TASK_ALWAYS_EAGER) or 'local' (a thread in the web process; no broker
+# needed, queued work is lost on restart)
+ANALYTICS_TASK_QUEUE = os.environ.get('ANALYTICS_TASK_QUEUE', 'local')
+# Debounced analysis: new conversations and messages are analyzed once the
+# conversation has been quiet for DEBOUNCE_SECONDS, at most BATCH_SIZE every
+# INTERVAL seconds; the daily job only sweeps up what this misses. Off by
+# default: with the 'local' queue it runs a scheduler thread in every web process
+ANALYTICS_AUTO_ANALYZE = os.environ.get('ANALYTICS_AUTO_ANALYZE', 'False') == 'True'
+ANALYTICS_ANALYSIS_DEBOUNCE_SECONDS = int(os.environ.get('ANALYTICS_ANALYSIS_DEBOUNCE_SECONDS', 300))
+ANALYTICS_SCHEDULER_BATCH_SIZE = 100
+ANALYTICS_SCHEDULER_INTERVAL = 10
+# Conversations analyzed per background task by admin-triggered jobs
+ANALYTICS_JOB_CHUNK_SIZE = 200
+# Jobs with no finished chunk for this long are failed as stale (lost chunks)
+ANALYTICS_JOB_STALE_SECONDS = int(os.environ.get('ANALYTICS_JOB_STALE_SECONDS', 1800))
+# Whether the admin "Mark as pending" action also queues an analysis job
+ANALYTICS_ENQUEUE_ON_MARK_PENDING = os.environ.get('ANALYTICS_ENQUEUE_ON_MARK_PENDING', 'False') == 'True'
+
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+# The debounced scheduler's drain lock (analytics.scheduling) must be shared
+# by web and worker processes, so Celery deployments (unless eager) cache in Redis
+if ANALYTICS_TASK_QUEUE == 'celery' and not CELERY_TASK_ALWAYS_EAGER:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('ANALYTICS_CACHE_URL', CELERY_BROKER_URL),
+        }
+    }
+
 CELERY_BEAT_SCHEDULE = {
     'daily-conversation-analysis': {
         'task': 'analytics.tasks.analyze_pending_conversations',
         'schedule': timedelta(hours=24),
     },
 }
+
+# Messages fetched per round trip by the streaming analyzer used in background jobs
+ANALYTICS_STREAM_CHUNK_SIZE = int(os.environ.get('ANALYTICS_STREAM_CHUNK_SIZE', 2000))
+
+# Cold storage: `manage.py archive_messages` compresses the messages of analyzed
+# conversations older than this many days. 'zstd' needs the zstandard package.
+ANALYTICS_ARCHIVE_AFTER_DAYS = int(os.environ.get('ANALYTICS_ARCHIVE_AFTER_DAYS', 90))
+ANALYTICS_ARCHIVE_CODEC = os.environ.get('ANALYTICS_ARCHIVE_CODEC', 'zlib')
+
+# Partial overrides of analytics.scoring.SCORE_WEIGHTS. Any change must come
+# with a new 'version'; then run `manage.py recompute_scores --stale`.
+ANALYTICS_SCORE_WEIGHTS = {}
+
+# Directory of NumPy column files written by `manage.py snapshot_scores` and
+# read by analytics.snapshot.ScoreSnapshot (needs numpy)
+ANALYTICS_SNAPSHOT_DIR = Path(os.environ.get('ANALYTICS_SNAPSHOT_DIR', BASE_DIR / 'snapshots' / 'scores'))
+# Refreshes re-fetch rows updated this long before the last watermark, to catch
+# analyses stamped earlier than it but committed after the previous refresh
+ANALYTICS_SNAPSHOT_OVERLAP_SECONDS = int(os.environ.get('ANALYTICS_SNAPSHOT_OVERLAP_SECONDS', 300))
+
+# Pool used by the async views (analytics.async_views) to score off the event
+# loop; set PROCESSES to True to sidestep the GIL for very long transcripts
+ANALYTICS_ASYNC_SCORING_WORKERS = int(os.environ.get('ANALYTICS_ASYNC_SCORING_WORKERS', 4))
+ANALYTICS_ASYNC_SCORING_PROCESSES = os.environ.get('ANALYTICS_ASYNC_SCORING_PROCESSES', 'False') == 'True'
+
+# Prometheus metrics at /metrics (staff only); when False no timings are
+# recorded at all. Every process flushes into the database, so one scrape
+# covers Celery, cron and all web workers. Scrapers can send the token as
+# "Authorization: Bearer <token>" instead of logging in
+ANALYTICS_METRICS_ENABLED = os.environ.get('ANALYTICS_METRICS_ENABLED', 'True') == 'True'
+ANALYTICS_METRICS_TOKEN = os.environ.get('ANALYTICS_METRICS_TOKEN', '')
+
+# Opt-in request profiling (query counts, SQL time, Server-Timing headers);
+# the slowest endpoints are listed at /debug/profiling/ for staff users.
+# Serialization time is only measured for DRF and template responses
+ANALYTICS_PROFILING_ENABLED = os.environ.get('ANALYTICS_PROFILING_ENABLED', 'False') == 'True'
+ANALYTICS_PROFILING_SAMPLE_RATE = float(os.environ.get('ANALYTICS_PROFILING_SAMPLE_RATE', 1.0))
+ANALYTICS_PROFILING_TOP_N = 20
+ANALYTICS_PROFILING_WINDOW = 100